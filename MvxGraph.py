@@ -1,5 +1,7 @@
 import ctypes
 import os
+import logging
+import threading
 from enum import IntEnum
 import platform
 
@@ -9,6 +11,8 @@ if platform.system() == "Windows":
 else:
     MVX_GRAPH_CORE__LIBRARY_NAME = 'libMvxGraphCore.so'
 
+logger = logging.getLogger(__name__)
+
 
 class GraphState(IntEnum):
     NOT_BUILT = 0,
@@ -28,36 +32,115 @@ class GraphPlaybackMode(IntEnum):
     RPM_REALTIME = 255
 
 
+# restype / argtypes of every symbol exported by MvxGraphCore
+MVX_GRAPH_CORE__PROTOTYPES = {
+    'Init'                 : (ctypes.c_int, [ctypes.c_char_p, ctypes.c_int]),
+    'GetAvailableFilters'  : (ctypes.c_int, []),
+    'GetFilterGuidByName'  : (ctypes.c_int, [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]),
+    'GetFilterNameByGuid'  : (ctypes.c_int, [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]),
+    'GetLastGraphError'    : (ctypes.c_int, [ctypes.c_int, ctypes.c_char_p]),
+    'GetGraphState'        : (ctypes.c_int, [ctypes.POINTER(ctypes.c_int)]),
+    'CreateGraph'          : (ctypes.c_int, []),
+    'CreateFilterFromGuid' : (ctypes.c_int, [ctypes.c_char_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]),
+    'CreateFilterFromName' : (ctypes.c_int, [ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]),
+    'DestroyFilter'        : (ctypes.c_int, [ctypes.c_int]),
+    'SetFilterParameter'   : (ctypes.c_int, [ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p]),
+    'GetFilterParameter'   : (ctypes.c_int, [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]),
+    'GetFilterParameters'  : (ctypes.c_int, [ctypes.c_int, ctypes.c_int, ctypes.c_char_p]),
+    'AddFilterToGraph'     : (ctypes.c_int, [ctypes.c_int]),
+    'BuildGraph'           : (ctypes.c_int, []),
+    'GraphSourceInfo'      : (ctypes.c_int, [ctypes.c_int, ctypes.c_char_p]),
+    'PlayGraph'            : (ctypes.c_int, [ctypes.c_int]),
+    'StopGraph'            : (ctypes.c_int, []),
+    'PauseGraph'           : (ctypes.c_int, []),
+    'ResumeGraph'          : (ctypes.c_int, []),
+    'DestroyGraph'         : (ctypes.c_int, []),
+}
+
+
 class MvxGraphCoreWrapper:
     _library = None
     _max_error_str_buf_len = (8*1024)
     _max_return_buff_len   = (8*1024)
+    _max_return_buff_limit = (16*1024*1024)
+    _max_retained_buff_len = (64*1024)
+    _max_encoded_names     = 4096
 
-    def __init__(self, graphapi_plugins_path: str, memory_pool_frequency: int = 1000):
+    def __init__(self, graphapi_plugins_path: str, memory_pool_frequency: int = 1000, tracer=None):
         try:
+            self._tracer = tracer
             bin_path = os.path.join(graphapi_plugins_path)
             # os.chdir(bin_path)
             self._library = ctypes.cdll.LoadLibrary(os.path.join(bin_path, MVX_GRAPH_CORE__LIBRARY_NAME))
+            self._bind_prototypes()
 
-            ctypes_wrapper = self._library.Init
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_char_p, ctypes.c_int]
-
-            rc = ctypes_wrapper(graphapi_plugins_path.encode('ascii'), memory_pool_frequency)
+            rc = self._symbols['Init'](graphapi_plugins_path.encode('ascii'), memory_pool_frequency)
 
             if rc == 1:
-                print('MvxGraphCore object created successfully')
+                logger.info('MvxGraphCore object created successfully')
             else:
                 raise ValueError(self.get_last_error())
 
         except Exception as e:
             raise ValueError('Failed to init MvxGraphCore, due to exception:', e)
 
+    def _bind_prototypes(self):
+        # Resolve and type every exported symbol once, instead of on every call
+        self._symbols = {}
+        self._encoded_names = {}
+        self._return_buffers = threading.local()
+
+        for symbol_name, (restype, argtypes) in MVX_GRAPH_CORE__PROTOTYPES.items():
+            ctypes_wrapper = getattr(self._library, symbol_name)
+            ctypes_wrapper.restype = restype
+            ctypes_wrapper.argtypes = argtypes
+            if self._tracer is not None:
+                ctypes_wrapper = self._tracer.wrap(symbol_name, ctypes_wrapper)
+            self._symbols[symbol_name] = ctypes_wrapper
+
+    def _encode_name(self, name: str) -> bytes:
+        # Filter / parameter names repeat on every call, keep their encoded form around
+        try:
+            return self._encoded_names[name]
+        except KeyError:
+            if len(self._encoded_names) >= self._max_encoded_names:
+                self._encoded_names.clear()
+            encoded_name = self._encoded_names[name] = name.encode()
+            return encoded_name
+
+    def _get_return_buffer(self, min_size: int):
+        # Each thread keeps its largest return buffer up to _max_retained_buff_len and reuses it across calls,
+        # a larger one is only allocated for the call needing it
+        ret_str = getattr(self._return_buffers, 'ret_str', None)
+        if ret_str is not None and len(ret_str) >= min_size:
+            return ret_str
+
+        ret_str = ctypes.create_string_buffer(min_size)
+        if min_size <= self._max_retained_buff_len:
+            self._return_buffers.ret_str = ret_str
+        return ret_str
+
+    def _call_returning_str(self, ctypes_wrapper, *args, max_ret_buff_size: int):
+        # String returning symbols take (..., max_len, ret_str) as last arguments.
+        # A value filling the whole buffer may have been truncated, retry with a larger one.
+        buff_size = max_ret_buff_size
+        while True:
+            ret_str = self._get_return_buffer(buff_size)
+            buff_size = len(ret_str)
+
+            rc = ctypes_wrapper(*args, buff_size, ret_str)
+            if rc != 1:
+                return rc, None
+
+            value = ret_str.value
+            if len(value) < buff_size - 1 or buff_size >= self._max_return_buff_limit:
+                return rc, value.decode('ascii')
+
+            buff_size = min(buff_size * 2, self._max_return_buff_limit)
+
     def get_available_filters(self):
         try:
-            ctypes_wrapper = self._library.GetAvailableFilters
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = []
+            ctypes_wrapper = self._symbols['GetAvailableFilters']
 
             rc = ctypes_wrapper()
 
@@ -70,16 +153,12 @@ class MvxGraphCoreWrapper:
 
     def get_filter_guid_by_name(self, filter_name: str, max_ret_buff_size: int = _max_return_buff_len) -> str:
         try:
-            ctypes_wrapper = self._library.GetFilterGuidByName
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]
+            ctypes_wrapper = self._symbols['GetFilterGuidByName']
 
-            ret_str = ctypes.create_string_buffer(max_ret_buff_size)
-            # TODO - check if not allocated
-            rc = ctypes_wrapper(filter_name.encode(), max_ret_buff_size, ret_str)
+            rc, ret_value = self._call_returning_str(ctypes_wrapper, self._encode_name(filter_name), max_ret_buff_size=max_ret_buff_size)
 
             if rc == 1:
-                return ret_str.value.decode('ascii')
+                return ret_value
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -87,16 +166,12 @@ class MvxGraphCoreWrapper:
 
     def get_filter_name_by_guid(self, filter_guid: str, max_ret_buff_size: int = _max_return_buff_len) -> str:
         try:
-            ctypes_wrapper = self._library.GetFilterNameByGuid
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]
+            ctypes_wrapper = self._symbols['GetFilterNameByGuid']
 
-            ret_str = ctypes.create_string_buffer(max_ret_buff_size)
-            # TODO - check if not allocated
-            rc = ctypes_wrapper(filter_guid.encode(), max_ret_buff_size, ret_str)
+            rc, ret_value = self._call_returning_str(ctypes_wrapper, self._encode_name(filter_guid), max_ret_buff_size=max_ret_buff_size)
 
             if rc == 1:
-                return ret_str.value.decode('ascii')
+                return ret_value
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -104,15 +179,11 @@ class MvxGraphCoreWrapper:
 
     def get_last_error(self, max_ret_buff_size: int = _max_return_buff_len) -> str:
         try:
-            ctypes_wrapper = self._library.GetLastGraphError
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int, ctypes.c_char_p]
-            ret_str = ctypes.create_string_buffer(max_ret_buff_size)
-
-            rc = ctypes_wrapper(max_ret_buff_size, ret_str)
+            ctypes_wrapper = self._symbols['GetLastGraphError']
+            rc, ret_value = self._call_returning_str(ctypes_wrapper, max_ret_buff_size=max_ret_buff_size)
 
             if rc == 1:
-                return str(ret_str.value.decode('ascii'))
+                return ret_value
             else:
                 raise ValueError('rc=', rc)
         except Exception as e:
@@ -120,9 +191,7 @@ class MvxGraphCoreWrapper:
 
     def get_graph_state(self) -> GraphState:
         try:
-            ctypes_wrapper = self._library.GetGraphState
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.POINTER(ctypes.c_int)]
+            ctypes_wrapper = self._symbols['GetGraphState']
 
             return_enum = ctypes.c_int(0)
             rc = ctypes_wrapper(ctypes.byref(return_enum))
@@ -136,13 +205,12 @@ class MvxGraphCoreWrapper:
 
     def create_graph(self):
         try:
-            ctypes_wrapper = self._library.CreateGraph
-            ctypes_wrapper.restype = ctypes.c_int
+            ctypes_wrapper = self._symbols['CreateGraph']
 
             rc = ctypes_wrapper()
 
             if rc == 1:
-                print('Graph object created successfully')
+                logger.info('Graph object created successfully')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -150,13 +218,11 @@ class MvxGraphCoreWrapper:
 
     def create_filter_from_guid(self, guid: str, filter_name: str) -> int:
         try:
-            ctypes_wrapper = self._library.CreateFilterFromGuid
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+            ctypes_wrapper = self._symbols['CreateFilterFromGuid']
 
             filter_instance_id = ctypes.c_int(0)
-            rc = ctypes_wrapper(guid.encode('ascii'),
-                                filter_name.encode('ascii'),
+            rc = ctypes_wrapper(self._encode_name(guid),
+                                self._encode_name(filter_name),
                                 ctypes.byref(filter_instance_id))
             if rc == 1:
                 return filter_instance_id.value
@@ -167,12 +233,10 @@ class MvxGraphCoreWrapper:
             
     def create_filter_from_name(self, filter_name: str) -> int:
         try:
-            ctypes_wrapper = self._library.CreateFilterFromName
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+            ctypes_wrapper = self._symbols['CreateFilterFromName']
 
             filter_instance_id = ctypes.c_int(0)
-            rc = ctypes_wrapper(filter_name.encode('ascii'),
+            rc = ctypes_wrapper(self._encode_name(filter_name),
                                 ctypes.byref(filter_instance_id))
             if rc == 1:
                 return filter_instance_id.value
@@ -183,9 +247,7 @@ class MvxGraphCoreWrapper:
 
     def destroy_filter(self, filter_instance_id: int):
         try:
-            ctypes_wrapper = self._library.DestroyFilter
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int]
+            ctypes_wrapper = self._symbols['DestroyFilter']
 
             rc = ctypes_wrapper(filter_instance_id)
             if rc == 1:
@@ -197,34 +259,44 @@ class MvxGraphCoreWrapper:
 
     def set_filter_parameter(self, filter_instance_id: int, param_name: str, param_value: str):
         try:
-            ctypes_wrapper = self._library.SetFilterParameter
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p]
+            ctypes_wrapper = self._symbols['SetFilterParameter']
 
             param_value_as_str = str(param_value)
 
             rc = ctypes_wrapper(filter_instance_id,
-                                param_name.encode('ascii'),
+                                self._encode_name(param_name),
                                 param_value_as_str.encode('ascii'))
             if rc == 1:
-                print('Filter instance ' + str(filter_instance_id) + ':\t' + param_name + '=' + param_value_as_str)
+                logger.debug('Filter instance %s:\t%s=%s', filter_instance_id, param_name, param_value_as_str)
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
             raise ValueError('Failed to set MVX filter parameter:', param_name, 'to', param_value, 'due to error: ', e)
 
+    def set_filter_parameters(self, parameters: list, read_back: bool = True) -> list:
+        # Apply (filter_instance_id, param_name, param_value) entries in one go,
+        # a failing entry is reported in its result and does not stop the others
+        results = []
+        for filter_instance_id, param_name, param_value in parameters:
+            try:
+                self.set_filter_parameter(filter_instance_id, param_name, param_value)
+                if read_back:
+                    results.append((self.get_filter_parameter(filter_instance_id, param_name), None))
+                else:
+                    results.append((str(param_value), None))
+            except Exception as e:
+                results.append((None, str(e)))
+
+        return results
+
     def get_filter_parameter(self, filter_instance_id: int, param_name: str, max_ret_buff_size: int = _max_return_buff_len) -> str:
         try:
-            ctypes_wrapper = self._library.GetFilterParameter
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]
+            ctypes_wrapper = self._symbols['GetFilterParameter']
 
-            ret_str = ctypes.create_string_buffer(max_ret_buff_size)
-            # TODO - check if not allocated
-            rc = ctypes_wrapper(filter_instance_id, param_name.encode(), max_ret_buff_size, ret_str)
+            rc, ret_value = self._call_returning_str(ctypes_wrapper, filter_instance_id, self._encode_name(param_name), max_ret_buff_size=max_ret_buff_size)
 
             if rc == 1:
-                return ret_str.value.decode('ascii')
+                return ret_value
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -232,16 +304,12 @@ class MvxGraphCoreWrapper:
 
     def get_filter_parameters(self, filter_instance_id: int, max_ret_buff_size: int = _max_return_buff_len) -> str:
         try:
-            ctypes_wrapper = self._library.GetFilterParameters
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p]
+            ctypes_wrapper = self._symbols['GetFilterParameters']
 
-            ret_str = ctypes.create_string_buffer(max_ret_buff_size)
-            # TODO - check if not allocated
-            rc = ctypes_wrapper(filter_instance_id, max_ret_buff_size, ret_str)
+            rc, ret_value = self._call_returning_str(ctypes_wrapper, filter_instance_id, max_ret_buff_size=max_ret_buff_size)
 
             if rc == 1:
-                return ret_str.value.decode('ascii')
+                return ret_value
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -249,14 +317,12 @@ class MvxGraphCoreWrapper:
 
     def add_filter_to_graph(self, filter_instance_id: int):
         try:
-            ctypes_wrapper = self._library.AddFilterToGraph
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int]
+            ctypes_wrapper = self._symbols['AddFilterToGraph']
 
             rc = ctypes_wrapper(filter_instance_id)
 
             if rc == 1:
-                print('Add filter to graph successful')
+                logger.info('Add filter to graph successful')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -264,13 +330,12 @@ class MvxGraphCoreWrapper:
 
     def build_graph(self):
         try:
-            ctypes_wrapper = self._library.BuildGraph
-            ctypes_wrapper.restype = ctypes.c_int
+            ctypes_wrapper = self._symbols['BuildGraph']
 
             rc = ctypes_wrapper()
 
             if rc == 1:
-                print('Graph built successfully')
+                logger.info('Graph built successfully')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -278,16 +343,12 @@ class MvxGraphCoreWrapper:
 
     def graph_source_info(self, max_ret_buff_size: int = _max_return_buff_len) -> str:
         try:
-            ctypes_wrapper = self._library.GraphSourceInfo
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int, ctypes.c_char_p]
+            ctypes_wrapper = self._symbols['GraphSourceInfo']
 
-            ret_str = ctypes.create_string_buffer(max_ret_buff_size)
-            # TODO - check if not allocated
-            rc = ctypes_wrapper(max_ret_buff_size, ret_str)
+            rc, ret_value = self._call_returning_str(ctypes_wrapper, max_ret_buff_size=max_ret_buff_size)
 
             if rc == 1:
-                return ret_str.value.decode('ascii')
+                return ret_value
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -295,14 +356,12 @@ class MvxGraphCoreWrapper:
 
     def play_graph(self, playback_mode: GraphPlaybackMode):
         try:
-            ctypes_wrapper = self._library.PlayGraph
-            ctypes_wrapper.restype = ctypes.c_int
-            ctypes_wrapper.argtypes = [ctypes.c_int]
+            ctypes_wrapper = self._symbols['PlayGraph']
 
             rc = ctypes_wrapper(playback_mode)
 
             if rc == 1:
-                print('Graph play sent')
+                logger.info('Graph play sent')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -317,13 +376,12 @@ class MvxGraphCoreWrapper:
 
     def stop_graph(self):
         try:
-            ctypes_wrapper = self._library.StopGraph
-            ctypes_wrapper.restype = ctypes.c_int
+            ctypes_wrapper = self._symbols['StopGraph']
 
             rc = ctypes_wrapper()
 
             if rc == 1:
-                print('Graph stop sent')
+                logger.info('Graph stop sent')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -331,13 +389,12 @@ class MvxGraphCoreWrapper:
 
     def pause_graph(self):
         try:
-            ctypes_wrapper = self._library.PauseGraph
-            ctypes_wrapper.restype = ctypes.c_int
+            ctypes_wrapper = self._symbols['PauseGraph']
 
             rc = ctypes_wrapper()
 
             if rc == 1:
-                print('Graph pause sent')
+                logger.info('Graph pause sent')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -345,13 +402,12 @@ class MvxGraphCoreWrapper:
 
     def resume_graph(self):
         try:
-            ctypes_wrapper = self._library.ResumeGraph
-            ctypes_wrapper.restype = ctypes.c_int
+            ctypes_wrapper = self._symbols['ResumeGraph']
 
             rc = ctypes_wrapper()
 
             if rc == 1:
-                print('Graph resume sent')
+                logger.info('Graph resume sent')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -360,13 +416,12 @@ class MvxGraphCoreWrapper:
 
     def destroy_graph(self):
         try:
-            ctypes_wrapper = self._library.DestroyGraph
-            ctypes_wrapper.restype = ctypes.c_int
+            ctypes_wrapper = self._symbols['DestroyGraph']
 
             rc = ctypes_wrapper()
 
             if rc == 1:
-                print('Graph destroy sent')
+                logger.info('Graph destroy sent')
             else:
                 raise ValueError(self.get_last_error())
         except Exception as e:
@@ -0,0 +1,267 @@
+import io
+import re
+import sys
+import asyncio
+import threading
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+# Routes that block on long native calls (build, stop, teardown), served one at a time on their own executor
+NATIVE_ROUTES = {
+    '/graph/upload',
+    '/graph/upload_run',
+    '/graph/build',
+    '/graph/build_run',
+    '/graph/build_remote',
+    '/graph/build_run_remote',
+    '/graph/run',
+    '/graph/stop',
+    '/graph/pause',
+    '/graph/resume',
+    '/graph/terminate',
+    '/graph/set_params',
+    '/filters/refresh',
+}
+
+# Routes that never call into the native core, served on their own executor so they are never queued behind it
+LOCAL_ROUTES = {
+    '/',
+    '/server_status',
+    '/ready',
+    '/get_cli_params',
+    '/graph/get_play_mode',
+    '/graph/param_cache',
+    '/graph/plan_cache',
+    '/native/dispatcher',
+    '/log_sampling',
+    '/native/core',
+    '/graph/source',
+    '/graph/snapshot',
+}
+
+# Long lived streaming responses, each one holds a worker of their own executor while open
+STREAM_ROUTES = {
+    '/graph/events',
+}
+
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE   = 64 * 1024 * 1024
+
+
+class AsyncRestServer():
+    """
+    asyncio HTTP/1.1 front end for the NucRestRunner Flask app.
+    Requests to NATIVE_ROUTES run on a dedicated single worker executor, LOCAL_ROUTES and every other
+    route on two separate pools, so status polls and cached reads are answered while a graph builds.
+    STREAM_ROUTES are written out chunk by chunk as the app yields them and close the connection when done.
+    Request bodies larger than max_body_size are refused with 413 before they are read.
+    """
+    def __init__(self, app, host: str, port: int, workers: int = 8, max_body_size: int = MAX_BODY_SIZE):
+        self.app = app
+        self.host = host
+        self.port = int(port)
+        self.max_body_size = max_body_size
+        self.native_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mvpy_native')
+        self.request_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mvpy_request')
+        self.local_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mvpy_local')
+        self.stream_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix='mvpy_stream')
+        self._loop = None
+        self._server = None
+        self.started = threading.Event()
+        self._shutdown_requested = False
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.native_executor.shutdown(wait=False)
+            self.request_executor.shutdown(wait=False)
+            self.local_executor.shutdown(wait=False)
+            self.stream_executor.shutdown(wait=False)
+
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEADER_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.started.set()
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def shutdown(self):
+        # Called from a request thread, mirrors werkzeug.server.shutdown.
+        # The server is closed once the response of that request has been sent.
+        self._shutdown_requested = True
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._write_error(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                    break
+
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                except ValueError:
+                    await self._write_error(writer, HTTPStatus.BAD_REQUEST)
+                    break
+
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    await self._write_error(writer, HTTPStatus.LENGTH_REQUIRED)
+                    break
+
+                content_length = headers.get('content-length', '0').strip()
+                if not re.fullmatch(r'[0-9]+', content_length):  # Negative, not an ASCII number, or repeated with different values
+                    await self._write_error(writer, HTTPStatus.BAD_REQUEST)
+                    break
+                if int(content_length) > self.max_body_size:
+                    await self._write_error(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                    break
+
+                try:
+                    body = await reader.readexactly(int(content_length))
+                except asyncio.IncompleteReadError:
+                    await self._write_error(writer, HTTPStatus.BAD_REQUEST)
+                    break
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close' \
+                    or version == 'HTTP/1.0' and headers.get('connection', '').lower() == 'keep-alive'
+
+                environ = self._make_environ(method, target, version, headers, body, writer)
+                path = environ['PATH_INFO']
+                if path in STREAM_ROUTES:
+                    await self._stream_app(environ, writer, version)
+                    break
+
+                if path in NATIVE_ROUTES:
+                    executor = self.native_executor
+                elif path in LOCAL_ROUTES:
+                    executor = self.local_executor
+                else:
+                    executor = self.request_executor
+                status, response_headers, response_body = await self._loop.run_in_executor(executor, self._call_app, environ)
+
+                self._write_response(writer, version, status, response_headers, response_body, keep_alive)
+                await writer.drain()
+
+                if self._shutdown_requested:
+                    self._server.close()
+                    break
+
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes):
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, version = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, value = line.split(':', 1)
+            name, value = name.strip().lower(), value.strip()
+            if name in headers:  # Repeated headers are joined, as in the WSGI environ of any other server
+                value = headers[name] + ('; ' if name == 'cookie' else ', ') + value
+            headers[name] = value
+        return method, target, version, headers
+
+    def _make_environ(self, method, target, version, headers, body, writer):
+        path, _, query = target.partition('?')
+        peer = writer.get_extra_info('peername') or ('', 0)
+        environ = {
+            'REQUEST_METHOD'    : method,
+            'SCRIPT_NAME'       : '',
+            'PATH_INFO'         : unquote(path, 'latin-1'),
+            'QUERY_STRING'      : query,
+            'SERVER_NAME'       : self.host,
+            'SERVER_PORT'       : str(self.port),
+            'SERVER_PROTOCOL'   : version,
+            'REMOTE_ADDR'       : peer[0],
+            'REMOTE_PORT'       : str(peer[1]),
+            'CONTENT_LENGTH'    : str(len(body)),
+            'wsgi.version'      : (1, 0),
+            'wsgi.url_scheme'   : 'http',
+            'wsgi.input'        : io.BytesIO(body),
+            'wsgi.errors'       : sys.stderr,
+            'wsgi.multithread'  : True,
+            'wsgi.multiprocess' : False,
+            'wsgi.run_once'     : False,
+            'werkzeug.server.shutdown': self.shutdown,
+        }
+        for name, value in headers.items():
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'content-length':
+                environ['HTTP_' + name.upper().replace('-', '_')] = value
+        return environ
+
+    def _start_app(self, environ):
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = response_headers
+
+        result = self.app(environ, start_response)
+        return response['status'], response['headers'], result
+
+    def _call_app(self, environ):
+        status, response_headers, result = self._start_app(environ)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        return status, response_headers, body
+
+    async def _stream_app(self, environ, writer, version):
+        # Headers go out first, then every chunk as the app yields it, until either side closes
+        status, response_headers, result = await self._loop.run_in_executor(self.stream_executor, self._start_app, environ)
+        chunks = iter(result)
+        try:
+            head = [f'{version} {status}']
+            head += [f'{name}: {value}' for name, value in response_headers if name.lower() not in ('content-length', 'connection')]
+            head.append('Connection: close')
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+
+            while True:
+                chunk = await self._loop.run_in_executor(self.stream_executor, next, chunks, None)
+                if chunk is None:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            if hasattr(result, 'close'):
+                await self._loop.run_in_executor(self.stream_executor, result.close)
+
+    @staticmethod
+    def _write_response(writer, version, status, response_headers, body, keep_alive):
+        head = [f'{version} {status}']
+        for name, value in response_headers:
+            if name.lower() not in ('content-length', 'connection'):
+                head.append(f'{name}: {value}')
+        head.append(f'Content-Length: {len(body)}')
+        head.append('Connection: ' + ('keep-alive' if keep_alive else 'close'))
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+    @staticmethod
+    async def _write_error(writer, status: HTTPStatus):
+        writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
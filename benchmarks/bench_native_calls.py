@@ -0,0 +1,57 @@
+import sys
+import ctypes
+import timeit
+import argparse
+
+sys.path.append(r".")
+import MvxGraph # noqa
+from benchmarks.stub_core import build_stub_core # noqa
+
+
+def get_graph_state_unbound(library) -> MvxGraph.GraphState:
+    # Call pattern used before prototypes were bound once in __init__
+    ctypes_wrapper = library.GetGraphState
+    ctypes_wrapper.restype = ctypes.c_int
+    ctypes_wrapper.argtypes = [ctypes.POINTER(ctypes.c_int)]
+
+    return_enum = ctypes.c_int(0)
+    ctypes_wrapper(ctypes.byref(return_enum))
+    return MvxGraph.GraphState(return_enum.value)
+
+
+def get_filter_parameter_unbound(library, filter_instance_id: int, param_name: str) -> str:
+    ctypes_wrapper = library.GetFilterParameter
+    ctypes_wrapper.restype = ctypes.c_int
+    ctypes_wrapper.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]
+
+    ret_str = ctypes.create_string_buffer(8 * 1024)
+    ctypes_wrapper(filter_instance_id, param_name.encode(), 8 * 1024, ret_str)
+    return ret_str.value.decode('ascii')
+
+
+def per_call_us(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == '__main__':
+    _arg_parser = argparse.ArgumentParser(description='bench_native_calls',
+                                          epilog='Per-call overhead of MvxGraphCoreWrapper against a stub libMvxGraphCore.so')
+    _arg_parser.add_argument('--number', type=int, default=100000, help='calls per measurement')
+    _parse_results = _arg_parser.parse_args()
+
+    wrapper = MvxGraph.MvxGraphCoreWrapper(build_stub_core())
+    library = wrapper._library
+    n = _parse_results.number
+
+    results = [
+        ('GetGraphState',      lambda: get_graph_state_unbound(library),
+                               lambda: wrapper.get_graph_state()),
+        ('GetFilterParameter', lambda: get_filter_parameter_unbound(library, 1, 'Write XML'),
+                               lambda: wrapper.get_filter_parameter(1, 'Write XML')),
+    ]
+
+    print(f"{'symbol':<22}{'before [us]':>14}{'after [us]':>14}{'speedup':>10}")
+    for symbol_name, before_stmt, after_stmt in results:
+        before = per_call_us(before_stmt, n)
+        after = per_call_us(after_stmt, n)
+        print(f"{symbol_name:<22}{before:>14.3f}{after:>14.3f}{before / after:>9.2f}x")
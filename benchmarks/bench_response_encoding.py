@@ -0,0 +1,77 @@
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.append(r".")
+from graph_parser.xml2txt import xml2lines # noqa
+from response_encoding import BINARY_ENCODERS, COMPRESSORS, DEFAULT_COMPRESS_LEVEL # noqa
+from benchmarks.bench_xml2txt import make_synthetic_xml # noqa
+
+
+def graph_payloads(source_file_name: str) -> dict:
+    # Response bodies of a graph: the filters_dict of a build and the set_filter_params read back of every parameter
+    filters_dict = {}
+    params = []
+    for line in xml2lines(source_file_name):
+        fields = line.split('~')
+        if fields[0] == 'createfilterbyname':
+            filters_dict[fields[2]] = len(filters_dict) + 1
+        elif fields[0] == 'setParams':
+            params.append({"unique_name": fields[1], "param_name": fields[2], "param_value": fields[3]})
+    return {"filters_dict": filters_dict, "set_filter_params": params}
+
+
+def encoders() -> dict:
+    result = {'json': lambda obj: (json.dumps(obj, separators=(",", ":")) + "\n").encode()}
+    for mimetype, dumps in BINARY_ENCODERS.items():
+        if not mimetype.startswith('application/x-'):
+            result[mimetype.split('/')[1]] = lambda obj, dumps=dumps: dumps(obj, str)
+    return result
+
+
+def measure(encode, obj, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode(obj)
+        timings.append(time.perf_counter() - start)
+    return data, statistics.median(timings)
+
+
+if __name__ == '__main__':
+    _arg_parser = argparse.ArgumentParser(description='bench_response_encoding',
+                                          epilog='Payload size and encoding time of graph responses per Accept/Accept-Encoding')
+    _arg_parser.add_argument('--sizes', nargs='+', type=int, default=[20, 200, 2000], help='filters per synthetic graph')
+    _arg_parser.add_argument('--graph', action='append', default=[], help='Genesis XML graph to add to the synthetic ones')
+    _arg_parser.add_argument('--repeat', type=int, default=20, help='encodings per measurement, the median is reported')
+    _arg_parser.add_argument('--level', type=int, default=DEFAULT_COMPRESS_LEVEL, help='gzip/deflate compression level')
+    _parse_results = _arg_parser.parse_args()
+
+    if len(BINARY_ENCODERS) == 0:
+        print("msgpack and cbor2 are not installed, only JSON is measured")
+
+    print(f"{'graph':<18}{'payload':<19}{'encoding':<10}{'compression':<13}{'bytes':>10}{'ratio':>8}{'time [ms]':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graphs = [(Path(graph).name, graph) for graph in _parse_results.graph]
+        for filters_count in _parse_results.sizes:
+            source_file_name = str(Path(tmp_dir).joinpath(f'synthetic_{filters_count}.xml'))
+            make_synthetic_xml(source_file_name, filters_count)
+            graphs.append((f'{filters_count} filters', source_file_name))
+
+        for graph_name, source_file_name in graphs:
+            for payload_name, obj in graph_payloads(source_file_name).items():
+                json_size = None
+                for encoding, encode in encoders().items():
+                    data, encode_time = measure(encode, obj, _parse_results.repeat)
+                    json_size = json_size or len(data)
+                    print(f"{graph_name:<18}{payload_name:<19}{encoding:<10}{'identity':<13}{len(data):>10}"
+                          f"{len(data) / json_size:>8.2f}{encode_time * 1e3:>11.3f}")
+
+                    for compression, compress in COMPRESSORS.items():
+                        compressed, compress_time = measure(lambda data: compress(data, _parse_results.level), data, _parse_results.repeat)
+                        print(f"{'':<18}{'':<19}{'':<10}{compression:<13}{len(compressed):>10}"
+                              f"{len(compressed) / json_size:>8.2f}{(encode_time + compress_time) * 1e3:>11.3f}")
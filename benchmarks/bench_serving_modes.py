@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import urllib.request
+from pathlib import Path
+
+sys.path.append(r".")
+from benchmarks.stub_core import build_stub_core # noqa
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def request(port: int, path: str, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data,
+                                 headers={"Content-Type": "application/json"}, method="POST" if data else "GET")
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return response.read()
+
+
+def start_server(serve_mode: str, port: int, lib_path: str, build_delay_ms: int, work_dir: str):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), MVX_STUB_BUILD_DELAY_MS=str(build_delay_ms))
+    server = subprocess.Popen([sys.executable, str(REPO_ROOT.joinpath('mvpy_rest_server.py')),
+                               '--lib', lib_path, '--port', str(port), '--serve', serve_mode],
+                              cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            request(port, '/server_status')
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"{serve_mode} server did not start")
+
+
+def run_mode(serve_mode: str, port: int, lib_path: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        server = start_server(serve_mode, port, lib_path, args.build_delay_ms, work_dir)
+        stop = threading.Event()
+        latencies = {'/server_status': [], '/graph/get_state': []}
+        builds = []
+        graph = {"remote_graph": str(REPO_ROOT.joinpath('tests', 'read_decomp_write.xml')), "cli_params": {"INPUT": "bench.mvx"}}
+
+        def builder():
+            while not stop.is_set():
+                start = time.perf_counter()
+                request(port, '/graph/terminate', {})
+                request(port, '/graph/build_remote', graph)
+                builds.append(time.perf_counter() - start)
+
+        def poller(path):
+            while not stop.is_set():
+                start = time.perf_counter()
+                request(port, path)
+                latencies[path].append(time.perf_counter() - start)
+
+        try:
+            request(port, '/graph/build_remote', graph)
+            threads = [threading.Thread(target=builder)]
+            threads += [threading.Thread(target=poller, args=[path])
+                        for path in list(latencies.keys()) * (args.pollers // 2)]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    results = {}
+    for path, path_latencies in latencies.items():
+        path_latencies.sort()
+        results[path] = {
+            "polls/s": len(path_latencies) / args.duration,
+            "p50 [ms]": statistics.median(path_latencies) * 1e3,
+            "p99 [ms]": path_latencies[int(len(path_latencies) * 0.99) - 1] * 1e3,
+            "max [ms]": path_latencies[-1] * 1e3,
+            "builds": len(builds),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    _arg_parser = argparse.ArgumentParser(description='bench_serving_modes',
+                                          epilog='Status poll latency while graphs are rebuilt, flask vs asyncio serving mode')
+    _arg_parser.add_argument('--duration', type=float, default=10.0, help='seconds per mode')
+    _arg_parser.add_argument('--pollers', type=int, default=16, help='concurrent polling clients')
+    _arg_parser.add_argument('--build-delay-ms', type=int, default=500, help='time the stub BuildGraph blocks')
+    _arg_parser.add_argument('--port', type=int, default=7590)
+    _parse_results = _arg_parser.parse_args()
+
+    lib_path = build_stub_core()
+    results = {mode: run_mode(mode, _parse_results.port + n, lib_path, _parse_results)
+               for n, mode in enumerate(['flask', 'asyncio'])}
+
+    columns = list(results['flask']['/server_status'].keys())
+    print(f"{'mode':<10}{'route':<20}" + ''.join(f"{column:>12}" for column in columns))
+    for mode, mode_results in results.items():
+        for path, result in mode_results.items():
+            print(f"{mode:<10}{path:<20}" + ''.join(f"{result[column]:>12.1f}" for column in columns))
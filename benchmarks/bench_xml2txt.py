@@ -0,0 +1,90 @@
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as xml_elem_tree
+from pathlib import Path
+
+sys.path.append(r".")
+from graph_parser.xml2txt import xml2lines, genesis_play_speeds # noqa
+
+FILTER_NAMES = ['MV4DDevices', 'MVX2FileReader', '#AutoDecompressor', 'MVX2FileWriter', 'FPSAnalyzer']
+
+
+def make_synthetic_xml(target_file_name: str, filters_count: int, params_per_filter: int = 10):
+    with open(target_file_name, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<genesis version="1.0">\n')
+        f.write('    <mvxpipeline playmode="255" playspeed="3">\n')
+        for n in range(filters_count):
+            f.write(f'        <filter guid="{n:08x}-0000-0000-0000-000000000000" name="{FILTER_NAMES[n % len(FILTER_NAMES)]}">\n')
+            f.write('            <parameters>\n')
+            for p in range(params_per_filter):
+                f.write(f'                <parameter name="Param {p}" value="{n}.{p}"/>\n')
+            f.write('            </parameters>\n')
+            f.write('        </filter>\n')
+        f.write('    </mvxpipeline>\n</genesis>\n')
+
+
+def xml2lines_tree(source_file_name: str):
+    # Reference: ElementTree.parse with the list-membership suffix dedupe, as used before iterparse
+    root = xml_elem_tree.parse(source_file_name).getroot()
+    lines = []
+    filters_list = []
+    for mvxpipeline_header in root.iter('mvxpipeline'):
+        play_speed_index = mvxpipeline_header.attrib['playspeed']
+
+    for mvx_filter in root.iter('filter'):
+        if len(filters_list) == 1 and genesis_play_speeds[play_speed_index] not in ('Full', 'Original'):
+            lines.append('createfilterbyname~#BlockFPS~blockfps~b')
+            filters_list.append('blockfps')
+
+        new_filter_name = mvx_filter.attrib['name'].lower() + '_1'
+        while new_filter_name in filters_list:
+            split_filename = new_filter_name.split('_')
+            new_filter_name = split_filename[0] + '_' + str(int(split_filename[1]) + 1)
+        filters_list.append(new_filter_name)
+
+        lines.append('createfilterbyname~' + mvx_filter.attrib['name'] + '~' + new_filter_name + '~b')
+        for mvx_parameter in mvx_filter.iter('parameter'):
+            lines.append('setParams~' + new_filter_name + '~' + mvx_parameter.attrib['name'] + '~' + mvx_parameter.attrib['value'] + '~b')
+
+    for attach_filter_name in filters_list:
+        lines.append('attachFilter~jeffGraph~' + attach_filter_name + '~b')
+    return lines
+
+
+def measure(convert, source_file_name: str):
+    start = time.perf_counter()
+    for _ in convert(source_file_name):
+        pass
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in convert(source_file_name):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    _arg_parser = argparse.ArgumentParser(description='bench_xml2txt',
+                                          epilog='Scaling of the Genesis XML converter on synthetic graphs')
+    _arg_parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 2000, 5000, 10000], help='filters per graph')
+    _arg_parser.add_argument('--tree-max', type=int, default=2000,
+                             help='largest graph to run the quadratic ElementTree reference on')
+    _parse_results = _arg_parser.parse_args()
+
+    print(f"{'filters':>8}{'tree [s]':>12}{'tree peak [MiB]':>18}{'iterparse [s]':>16}{'iterparse peak [MiB]':>23}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for filters_count in _parse_results.sizes:
+            source_file_name = str(Path(tmp_dir).joinpath(f'synthetic_{filters_count}.xml'))
+            make_synthetic_xml(source_file_name, filters_count)
+
+            stream_time, stream_peak = measure(xml2lines, source_file_name)
+            if filters_count <= _parse_results.tree_max:
+                tree_time, tree_peak = measure(xml2lines_tree, source_file_name)
+                print(f"{filters_count:>8}{tree_time:>12.3f}{tree_peak / 2**20:>18.1f}{stream_time:>16.3f}{stream_peak / 2**20:>23.1f}")
+            else:
+                print(f"{filters_count:>8}{'-':>12}{'-':>18}{stream_time:>16.3f}{stream_peak / 2**20:>23.1f}")
@@ -0,0 +1,17 @@
+import subprocess
+import tempfile
+from pathlib import Path
+
+STUB_SOURCE = Path(__file__).with_name('stub_mvx_graph_core.c')
+
+
+def build_stub_core(target_dir: str = None) -> str:
+    """Compile the stub core into target_dir and return the directory to pass as plugins path."""
+    target_dir = target_dir or tempfile.mkdtemp(prefix='mvx_stub_core_')
+    target_lib = Path(target_dir).joinpath('libMvxGraphCore.so')
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+
+    if not target_lib.exists() or target_lib.stat().st_mtime < STUB_SOURCE.stat().st_mtime:
+        subprocess.run(['cc', '-shared', '-fPIC', '-O2', '-o', str(target_lib), str(STUB_SOURCE)], check=True)
+
+    return str(target_dir)
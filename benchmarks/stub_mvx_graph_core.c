@@ -0,0 +1,66 @@
+/*
+ * Minimal stand-in for libMvxGraphCore, exporting the same C API as the
+ * real core so the Python wrapper can be benchmarked without plugins.
+ * MVX_STUB_BUILD_DELAY_MS makes BuildGraph block like a real build.
+ *
+ *   gcc -shared -fPIC -O2 -o libMvxGraphCore.so stub_mvx_graph_core.c
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+enum { NOT_BUILT = 0, ERROR = 1, PLAYING = 2, PAUSED = 3, STOPPED = 4 };
+
+static int graph_state = NOT_BUILT;
+static int next_filter_id = 1;
+static int build_delay_ms = 0;
+
+static int write_str(const char *value, int max_len, char *ret_str)
+{
+    if (max_len <= 0 || ret_str == NULL)
+        return 0;
+    snprintf(ret_str, (size_t)max_len, "%s", value);
+    return 1;
+}
+
+int Init(const char *plugins_path, int memory_pool_frequency)
+{
+    const char *delay = getenv("MVX_STUB_BUILD_DELAY_MS");
+    build_delay_ms = delay ? atoi(delay) : 0;
+    return 1;
+}
+
+int GetAvailableFilters(void) { return 1; }
+int GetFilterGuidByName(const char *name, int max_len, char *ret_str) { return write_str("00000000-0000-0000-0000-000000000000", max_len, ret_str); }
+int GetFilterNameByGuid(const char *guid, int max_len, char *ret_str) { return write_str("StubFilter", max_len, ret_str); }
+int GetLastGraphError(int max_len, char *ret_str) { return write_str("stub error", max_len, ret_str); }
+int GetGraphState(int *state) { *state = graph_state; return 1; }
+int CreateGraph(void) { return 1; }
+int CreateFilterFromGuid(const char *guid, const char *name, int *id) { *id = next_filter_id++; return 1; }
+int CreateFilterFromName(const char *name, int *id) { *id = next_filter_id++; return 1; }
+int DestroyFilter(int id) { return 1; }
+int SetFilterParameter(int id, const char *name, const char *value) { return 1; }
+int GetFilterParameter(int id, const char *name, int max_len, char *ret_str)
+{
+    /* "Large Value" returns a 100000 character value, for the wrapper's buffer regrowth */
+    static char large_value[100001];
+    if (strcmp(name, "Large Value") == 0) {
+        if (large_value[0] == '\0')
+            memset(large_value, 'x', sizeof(large_value) - 1);
+        return write_str(large_value, max_len, ret_str);
+    }
+    return write_str("False", max_len, ret_str);
+}
+int GetFilterParameters(int id, int max_len, char *ret_str) { return write_str("Write XML=False;Enable Recording=False", max_len, ret_str); }
+int AddFilterToGraph(int id) { return 1; }
+int BuildGraph(void) { usleep((useconds_t)build_delay_ms * 1000); graph_state = STOPPED; return 1; }
+int GraphSourceInfo(int max_len, char *ret_str) { return write_str("stub source", max_len, ret_str); }
+int PlayGraph(int mode) { graph_state = PLAYING; return 1; }
+int StopGraph(void) { graph_state = STOPPED; return 1; }
+int PauseGraph(void) { graph_state = PAUSED; return 1; }
+int ResumeGraph(void) { graph_state = PLAYING; return 1; }
+int DestroyGraph(void) { graph_state = NOT_BUILT; next_filter_id = 1; return 1; }
+
+/* Not part of the real C API, lets tests relying on the stub's values tell it is loaded */
+int IsStubCore(void) { return 1; }
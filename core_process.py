@@ -0,0 +1,199 @@
+import os
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+import multiprocessing.connection
+import MvxGraph
+
+logger = logging.getLogger(__name__)
+
+CORE_START_TIMEOUT = 60.0
+
+# Graph state after each successful lifecycle call, tracked to restore it after a restart
+_GRAPH_STATE_AFTER = {
+    'build_graph'   : MvxGraph.GraphState.STOPPED,
+    'play_graph'    : MvxGraph.GraphState.PLAYING,
+    'run_graph'     : MvxGraph.GraphState.PLAYING,
+    'resume_graph'  : MvxGraph.GraphState.PLAYING,
+    'pause_graph'   : MvxGraph.GraphState.PAUSED,
+    'stop_graph'    : MvxGraph.GraphState.STOPPED,
+    'destroy_graph' : MvxGraph.GraphState.NOT_BUILT,
+}
+
+
+class CoreCrashed(Exception):
+    pass
+
+
+def _core_worker_main(conn, mvgraphapi_plugins_path, memory_pool_frequency, log_file):
+    # Runs in the child process, executes MvxGraphCoreWrapper calls received on conn
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the server, which tears the graph down
+    if log_file:
+        from server_logging import setup_logging
+        setup_logging(log_file, console_level=logging.WARNING)
+
+    try:
+        core = MvxGraph.MvxGraphCoreWrapper(mvgraphapi_plugins_path, memory_pool_frequency)
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            name, args, kwargs = conn.recv()
+        except EOFError:
+            break
+
+        try:
+            conn.send(("ok", getattr(core, name)(*args, **kwargs)))
+        except Exception as e:
+            try:
+                conn.send(("error", e))
+            except Exception:  # Not picklable
+                conn.send(("error", ValueError(str(e))))
+
+
+class CoreProcess():
+    """
+    Runs MvxGraphCoreWrapper in a supervised child process, so a crash or hang of MvxGraphCore does not take the server down.
+    Exposes the wrapper methods unchanged (each call is one round trip over a pipe).
+    When the child dies, on_crash is called (by the supervisor thread), restart() starts a new child with the same
+    plugins path and memory pool and calls on_restart(graph_state) to rebuild the graph it ran, in the state it was in.
+    """
+    def __init__(self, mvgraphapi_plugins_path, memory_pool_frequency, call_timeout: float = None, log_file=None,
+                 on_crash=None, on_restart=None):
+        self.build_path         = mvgraphapi_plugins_path
+        self.mempool            = memory_pool_frequency
+        self.call_timeout       = call_timeout
+        self.log_file           = log_file
+        self.on_crash           = on_crash
+        self.on_restart         = on_restart
+        self.restarts           = 0
+        self.last_recovery_time = None
+        self.graph_state        = MvxGraph.GraphState.NOT_BUILT
+        self._crashed_at        = None
+        self._closed            = False
+        self._context           = multiprocessing.get_context('spawn')
+        self._process           = None
+        self._conn              = None
+
+        self._start()
+        self._supervisor = threading.Thread(target=self._supervise, name='mvpy_core_supervisor', daemon=True)
+        self._supervisor.start()
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self._call(name, args, kwargs)
+        return call
+
+    def _start(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_core_worker_main, name='mvpy_core', daemon=True,
+                                        args=(child_conn, self.build_path, self.mempool, self.log_file))
+        process.start()
+        child_conn.close()
+
+        if not parent_conn.poll(CORE_START_TIMEOUT):
+            process.kill()
+            raise ValueError(f'Failed to init MvxGraphCore, the core process did not start in {CORE_START_TIMEOUT} seconds')
+        status, detail = parent_conn.recv()
+        if status != "ready":
+            process.join()
+            raise ValueError('Failed to init MvxGraphCore, due to exception:', detail)
+
+        self._process, self._conn = process, parent_conn
+        logger.info(f'MvxGraphCore process started, pid {process.pid}')
+
+    def _call(self, name, args, kwargs):
+        if not self._process.is_alive():
+            self.restart()
+
+        conn = self._conn
+        try:
+            conn.send((name, args, kwargs))
+            if self.call_timeout is not None and not conn.poll(self.call_timeout):
+                self._crashed(f'{name} did not return in {self.call_timeout} seconds')
+                self._process.kill()
+                raise CoreCrashed(f'MvxGraphCore {name} timed out, the core process is restarted')
+            status, result = conn.recv()
+        except (EOFError, OSError) as e:
+            self._crashed(f'exit code {self._process.exitcode} during {name}')
+            raise CoreCrashed(f'MvxGraphCore crashed during {name}, the core process is restarted') from e
+
+        if status == "error":
+            raise result
+
+        if name in _GRAPH_STATE_AFTER:
+            self.graph_state = _GRAPH_STATE_AFTER[name]
+        return result
+
+    def _crashed(self, reason):
+        if self._crashed_at is None:
+            self._crashed_at = time.perf_counter()
+            logger.error(f'MvxGraphCore process failed: {reason}')
+
+    def restart(self):
+        # Starts a new core process and restores the graph, a no-op while the current one is healthy
+        if self._process.is_alive() and self._crashed_at is None:
+            return
+
+        self._crashed(f'exit code {self._process.exitcode}')
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join()
+        self._conn.close()
+
+        self._start()
+        graph_state, self.graph_state = self.graph_state, MvxGraph.GraphState.NOT_BUILT
+        self.restarts += 1
+
+        try:
+            if self.on_restart is not None:
+                self.on_restart(graph_state)
+        finally:
+            self.last_recovery_time = time.perf_counter() - self._crashed_at
+            self._crashed_at = None
+            logger.info(f'MvxGraphCore process restarted in {self.last_recovery_time:.3f} seconds')
+
+    def _supervise(self):
+        while not self._closed:
+            process = self._process
+            # Wait on the sentinel rather than join(), the process is reaped by whoever restarts it
+            multiprocessing.connection.wait([process.sentinel])
+            if self._closed:
+                return
+
+            if process is self._process:
+                self._crashed(f'exit code {process.exitcode}')
+                if self.on_crash is not None:
+                    self.on_crash()
+                else:
+                    self.restart()
+
+            while process is self._process and not self._closed:
+                time.sleep(0.05)
+
+    def close(self):
+        self._closed = True
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join()
+        self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "pid"                : self._process.pid,
+            "alive"              : self._process.is_alive(),
+            "restarts"           : self.restarts,
+            "last_recovery_time" : self.last_recovery_time,
+        }
@@ -0,0 +1,135 @@
+import time
+import threading
+
+# Graph commands creating a filter, by filter name or by GUID. ARGS are (filter, unique name)
+CREATE_BY_NAME = {'createfilterbyname'}
+CREATE_BY_GUID = {'createfilterbyguid', 'createfilter'}
+
+# Graph commands that fail on a filter not created before, and the position of its unique name in ARGS
+FILTER_REFERENCES = {
+    'setparams'    : 0,
+    'attachfilter' : 1,
+}
+
+
+class FilterCatalog():
+    """
+    Name <-> GUID index of the filters MvxGraphCore can create, so graphs resolve filters without a native round-trip each.
+    GetAvailableFilters loads the filter registry but returns no list, each name (or GUID) is resolved natively
+    the first time it is asked for and kept in both directions. One the core answers empty is kept as unknown,
+    a failed lookup is not kept and resolved again the next time.
+    refresh() reloads the registry and resolves every name known so far again.
+    validate() checks a parsed graph before anything native is created for it.
+    """
+    def __init__(self, graph_core):
+        self._graph_core       = graph_core
+        self._lock             = threading.RLock()
+        self._by_name          = {}
+        self._by_guid          = {}
+        self._unknown          = set()
+        self.lookups           = 0
+        self.hits              = 0
+        self.refreshes         = 0
+        self.last_refresh_time = None
+
+    def refresh(self) -> dict:
+        with self._lock:
+            names = list(self._by_name)
+            self._graph_core.get_available_filters()
+            self._by_name, self._by_guid, self._unknown = {}, {}, set()
+            for name in names:
+                self.guid_of(name)
+            self.refreshes += 1
+            self.last_refresh_time = time.time()
+            return dict(self._by_name)
+
+    def _add(self, name: str, guid: str):
+        self._by_name[name] = guid
+        self._by_guid[guid.lower()] = name
+
+    def guid_of(self, name: str):
+        # GUID of the filter called name, None when the core does not know it or the lookup failed
+        with self._lock:
+            if name in self._by_name:
+                self.hits += 1
+                return self._by_name[name]
+            if name in self._unknown:
+                self.hits += 1
+                return None
+
+            self.lookups += 1
+            try:
+                guid = self._graph_core.get_filter_guid_by_name(name)
+            except ValueError:
+                return None
+            if not guid:
+                self._unknown.add(name)
+                return None
+            self._add(name, guid)
+            return guid
+
+    def name_of(self, guid: str):
+        # Name of the filter with guid, None when the core does not know it or the lookup failed
+        key = guid.lower()
+        with self._lock:
+            if key in self._by_guid:
+                self.hits += 1
+                return self._by_guid[key]
+            if key in self._unknown:
+                self.hits += 1
+                return None
+
+            self.lookups += 1
+            try:
+                name = self._graph_core.get_filter_name_by_guid(guid)
+            except ValueError:
+                return None
+            if not name:
+                self._unknown.add(key)
+                return None
+            self._add(name, guid)
+            return name
+
+    def filters(self) -> dict:
+        with self._lock:
+            return dict(self._by_name)
+
+    def validate(self, graph_commands, known_commands=None) -> list:
+        # Problems of a parsed graph, an empty list when it can be built. Filters are resolved through the catalog,
+        # references must name a filter created earlier in the graph
+        errors = []
+        created = set()
+        for index, line in enumerate(graph_commands):
+            command = str(line['COMMAND']).lower()
+            args = line['ARGS']
+
+            if known_commands is not None and command not in known_commands:
+                errors.append(f'command {index}: unknown command {line["COMMAND"]}')
+            elif command in CREATE_BY_NAME or command in CREATE_BY_GUID:
+                if len(args) < 2:
+                    errors.append(f'command {index}: {line["COMMAND"]} needs a filter and a unique name')
+                    continue
+                if command in CREATE_BY_NAME and self.guid_of(args[0]) is None:
+                    errors.append(f'command {index}: unknown filter {args[0]}')
+                elif command in CREATE_BY_GUID and self.name_of(args[0]) is None:
+                    errors.append(f'command {index}: unknown filter GUID {args[0]}')
+                if args[1] in created:
+                    errors.append(f'command {index}: filter {args[1]} is created twice')
+                created.add(args[1])
+            elif command in FILTER_REFERENCES:
+                position = FILTER_REFERENCES[command]
+                if len(args) <= position or args[position] not in created:
+                    unique_name = args[position] if len(args) > position else ''
+                    errors.append(f'command {index}: {line["COMMAND"]} refers to filter {unique_name}, which is not created before')
+        return errors
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size"              : len(self._by_name),
+                "unknown"           : len(self._unknown),
+                "lookups"           : self.lookups,
+                "hits"              : self.hits,
+                "refreshes"         : self.refreshes,
+                "last_refresh_time" : self.last_refresh_time,
+            }
@@ -0,0 +1,88 @@
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GraphEvents():
+    """
+    Fans graph events out to server-sent event subscribers.
+    A single sampler thread watches the graph state while anybody is subscribed and publishes its transitions,
+    the server publishes build, teardown and play mode events itself.
+    """
+    def __init__(self, get_graph_state, sample_interval: float = 0.2, max_queued_events: int = 256):
+        self._get_graph_state = get_graph_state
+        self.sample_interval = sample_interval
+        self.max_queued_events = max_queued_events
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._sampler = None
+        self.graph_state = None
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(self.max_queued_events)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='mvpy_graph_events', daemon=True)
+                self._sampler.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event: str, data=None):
+        message = {"event": event, "data": data, "time": time.time()}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:  # Slow client, drop rather than block the publisher
+                pass
+
+    def _sample(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._sampler = None
+                    self.graph_state = None
+                    return
+
+            try:
+                state = self._get_graph_state()
+            except Exception as e:
+                logger.error(e)
+                state = None
+
+            if state is not None and state != self.graph_state:
+                previous_state, self.graph_state = self.graph_state, state
+                self.publish("state", {"from": previous_state.name if previous_state is not None else None,
+                                       "to": state.name})
+
+            time.sleep(self.sample_interval)
+
+    def stream(self, keepalive: float = 15.0):
+        # text/event-stream generator for a single subscriber
+        subscriber = self.subscribe()
+        try:
+            if self.graph_state is not None:
+                yield self.format("state", {"from": None, "to": self.graph_state.name})
+
+            while True:
+                try:
+                    message = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield self.format(message["event"], message["data"])
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def format(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
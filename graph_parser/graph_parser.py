@@ -4,67 +4,118 @@ import argparse
 from pathlib import Path
 
 sys.path.append(r".")
-from graph_parser.json2txt import json2txt
-from graph_parser.xml2txt import xml2txt
-# from json2txt import json2txt
-# from xml2txt import xml2txt
+from graph_parser.json2txt import json2lines
+from graph_parser.xml2txt import xml2lines
+# from json2txt import json2lines
+# from xml2txt import xml2lines
 
 
-class GraphParser():
-    def __init__(self, input_file, output_file, cli_params=None):
-        self.input_graph = input_file
-        self.txt_file = output_file
-        self.cli_params = cli_params
+PLACEHOLDER_RE = re.compile(r"\$([A-Z,,a-z,0-9]*)\$")
 
-    def txt_to_dict(self):
-        lines = []
-        graph_data = []
 
-        data_after_parse = []
-        with open(self.input_graph, 'r') as f:
-            lines = f.readlines()
+class GraphTemplate():
+    """
+    A graph parsed once, with the position of every $PARAM$ placeholder recorded.
+    render() produces the command list for a given cli_params in a single pass, without any file I/O.
+    """
+    def __init__(self, lines, source_name=None):
+        self.source_name = source_name
+        self.lines = []  # None for comments and blank lines, else (text, record) or (pieces, None)
+        self.params = set()
 
         for n, line in enumerate(lines):
             if line.startswith((" ", "\t")):
-                raise SyntaxError("Error in file: " + self.txt_file + " in line " + str(n))
+                raise SyntaxError("Error in file: " + str(source_name) + " in line " + str(n))
 
             s_line = line.strip()
             if len(s_line) > 0 and not s_line.startswith("#"):
-                results = re.findall(r"\$([A-Z,,a-z,0-9]*)\$", s_line)
-                for param in results:
-                    try:
-                        s_line = s_line.replace(f"${param}$", self.cli_params[param])
-                    except (KeyError, TypeError):
-                        raise KeyError(f"Parameter {param} is not specified!")
+                pieces = PLACEHOLDER_RE.split(s_line)  # literals at even, parameter names at odd indices
+                if len(pieces) == 1:
+                    args = s_line.split("~")
+                    self.lines.append((s_line, {"COMMAND": args[0], "ARGS": args[1:]}))
+                else:
+                    self.params.update(pieces[1::2])
+                    self.lines.append((pieces, None))
+            else:
+                self.lines.append(None)
+
+    @classmethod
+    def from_file(cls, input_graph):
+        if Path(input_graph).suffix == ".xml":
+            return cls(xml2lines(input_graph), input_graph)
+        elif Path(input_graph).suffix == ".json":
+            return cls(json2lines(input_graph), input_graph)
+        else:
+            with open(input_graph, 'r') as f:
+                return cls(f, input_graph)
+
+    @staticmethod
+    def _render_line(pieces, cli_params):
+        rendered = list(pieces)
+        for i in range(1, len(pieces), 2):
+            try:
+                rendered[i] = str(cli_params[pieces[i]])
+            except (KeyError, TypeError):
+                raise KeyError(f"Parameter {pieces[i]} is not specified!")
+        return "".join(rendered)
+
+    def render(self, cli_params=None):
+        graph_data = []
 
-                args = s_line.split("~")
+        for line in self.lines:
+            if line is None:
+                continue
 
+            text, record = line
+            if record is not None:
+                graph_data.append({"COMMAND": record["COMMAND"], "ARGS": list(record["ARGS"])})
+            else:
+                args = self._render_line(text, cli_params).split("~")
                 graph_data.append({"COMMAND": args[0], "ARGS": args[1:]})
-                data_after_parse.append(s_line)
+
+        return graph_data
+
+    def render_lines(self, cli_params=None):
+        # Rendered TXT lines, comments and blank lines replaced by "##"
+        for line in self.lines:
+            if line is None:
+                yield "##"
+            elif line[1] is not None:
+                yield line[0]
             else:
-                data_after_parse.append("##")
+                yield self._render_line(line[0], cli_params)
+
+
+class GraphParser():
+    def __init__(self, input_file, output_file=None, cli_params=None):
+        self.input_graph = input_file
+        self.txt_file = output_file
+        self.cli_params = cli_params
+
+    def txt_to_dict(self):
+        with open(self.input_graph, 'r') as f:
+            return self.lines_to_dict(f)
+
+    def lines_to_dict(self, lines):
+        template = GraphTemplate(lines, self.input_graph)
+        graph_data = template.render(self.cli_params)
 
-        with open(self.txt_file, 'w') as f:
-            for line in data_after_parse:
-                f.write(line + "\n")
+        # The parsed TXT is only kept when an output file was asked for
+        if self.txt_file:
+            with open(self.txt_file, 'w') as f:
+                for line in template.render_lines(self.cli_params):
+                    f.write(line + "\n")
 
         return graph_data
 
+    def template(self):
+        return GraphTemplate.from_file(self.input_graph)
+
     def xml_parser(self):
-        try:
-            xml2txt(self.input_graph, self.txt_file)
-            self.input_graph = self.txt_file
-        except Exception as e:
-            print(e)
-        return self.txt_to_dict()
+        return self.lines_to_dict(xml2lines(self.input_graph))
 
     def json_parser(self):
-        try:
-            json2txt(self.input_graph, self.txt_file)
-            self.input_graph = self.txt_file
-        except Exception as e:
-            print(e)
-        return self.txt_to_dict()
+        return self.lines_to_dict(json2lines(self.input_graph))
 
     def __call__(self):
         if Path(self.input_graph).suffix == ".xml":
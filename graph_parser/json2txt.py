@@ -11,77 +11,84 @@ class ReturnCodes(enum.IntEnum):
     BAD_CONFIGURATION = 2,
     UNHANDLED_EXCEPTION = 3
 
-def json2txt(source_file_name: str, target_file_name: str):
+def _banner(title: str):
+    yield '###########################################################################'
+    yield '###                         ' + title.ljust(44) + '###'
+    yield '###########################################################################'
+
+
+def json2lines(source_file_name: str):
+    """Returns a generator of the TXT graph lines of a JeffersonPy style JSON file, without line endings"""
     if not Path(source_file_name).exists():
         raise FileNotFoundError('Could not find file ' + source_file_name)
-        
+
     with open(source_file_name, 'r') as f:
         filter_data = json.load(f)
-    
+
+    return _json_lines(filter_data)
+
+
+def _json_lines(filter_data):
+    yield 'SetMemoryPool~1000~b'
+    yield ''
+
+    yield from _banner('Create Filters')
+    graph_name = 'jeffGraph'
+    filters_list = []
+
+    for mvx_filter in filter_data:
+
+        filters_list.append(mvx_filter['Name'])
+
+        yield ''
+        yield 'createfilterbyname~' + mvx_filter['ID'] + '~' + mvx_filter['Name'] + '~b'
+
+        for mvx_parameter, value in mvx_filter['PARAMS'].items():
+            yield ('setParams~' +
+                   mvx_filter['Name'] + '~' +
+                   mvx_parameter + '~' +
+                   value + '~b')
+
+    yield ''
+    yield from _banner('Create Graph')
+    yield ''
+    yield 'createGraph~' + graph_name + '~b'
+
+    yield ''
+    yield from _banner('Attach Filters')
+    yield ''
+    for attach_filter_name in filters_list:
+        yield 'attachFilter~' + graph_name + '~' + attach_filter_name + '~b'
+
+    yield ''
+    yield from _banner('Get Filter Params')
+    yield ''
+    for get_filter_name in filters_list:
+        yield 'getParams~' + graph_name + '~' + get_filter_name + '~b'
+
+    yield ''
+    yield from _banner('Run Graph')
+    yield ''
+    yield 'runGraph~' + graph_name + '~255~b'
+
+    yield ''
+    yield from _banner('Stop Graph')
+    yield '#NOTE: stopGraph may abort your graph prematurely,'
+    yield '#      commenting out cleanup code!'
+    yield ''
+    yield '#stopGraph~' + graph_name + '~b'
+    yield '#deleteGraph~' + graph_name + '~b'
+
+    for delete_filter_name in filters_list:
+        yield '#deleteFilter~' + delete_filter_name + '~b'
+
+
+def json2txt(source_file_name: str, target_file_name: str):
+    lines = json2lines(source_file_name)
+
     with open(target_file_name, 'w') as target_f:
-        target_f.write('SetMemoryPool~1000~b\n\n')
-
-        target_f.write('###########################################################################\n'
-                        '###                         Create Filters                              ###\n'
-                        '###########################################################################\n')
-        graph_name = 'jeffGraph'
-        filters_list = []
-
-        for mvx_filter in filter_data:
-            
-            filters_list.append(mvx_filter['Name'])
-
-            target_f.write('\n')
-            target_f.write('createfilterbyname~' + mvx_filter['ID'] + '~' + mvx_filter['Name'] + '~b\n')
-
-            for mvx_parameter,value in mvx_filter['PARAMS'].items():
-                target_f.write('setParams~' +
-                                mvx_filter['Name'] + '~' +
-                                mvx_parameter + '~' +
-                                value + '~b\n')
-
-        target_f.write('\n'
-                        '###########################################################################\n'
-                        '###                         Create Graph                                ###\n'
-                        '###########################################################################\n'
-                        '\n')
-        target_f.write('createGraph~' + graph_name + '~b\n')
-
-        target_f.write('\n'
-                        '###########################################################################\n'
-                        '###                         Attach Filters                              ###\n'
-                        '###########################################################################\n'
-                        '\n')
-        for attach_filter_name in filters_list:
-            target_f.write('attachFilter~' + graph_name + '~' + attach_filter_name + '~b\n')
-
-        target_f.write('\n'
-                        '###########################################################################\n'
-                        '###                         Get Filter Params                           ###\n'
-                        '###########################################################################\n'
-                        '\n')
-        for get_filter_name in filters_list:
-            target_f.write('getParams~' + graph_name + '~' + get_filter_name + '~b\n')
-
-        target_f.write('\n'
-                        '###########################################################################\n'
-                        '###                         Run Graph                                   ###\n'
-                        '###########################################################################\n'
-                        '\n')
-        target_f.write('runGraph~' + graph_name + '~255~b\n')
-
-        target_f.write('\n'
-                        '###########################################################################\n'
-                        '###                         Stop Graph                                  ###\n'
-                        '###########################################################################\n'
-                        '#NOTE: stopGraph may abort your graph prematurely,\n'
-                        '#      commenting out cleanup code!\n'
-                        '\n')
-        target_f.write('#stopGraph~' + graph_name + '~b\n')
-        target_f.write('#deleteGraph~' + graph_name + '~b\n')
-
-        for delete_filter_name in filters_list:
-            target_f.write('#deleteFilter~' + delete_filter_name + '~b\n')
+        for line in lines:
+            target_f.write(line + '\n')
 
 
 if __name__ == '__main__':
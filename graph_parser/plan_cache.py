@@ -0,0 +1,140 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the parser output changes, so persisted plans are not reused
+PLAN_CACHE_VERSION = 1
+
+
+class PlanCache():
+    """
+    Parsed graph command lists keyed by the graph source content and the cli_params used to render it.
+    Kept in memory with LRU eviction, and optionally persisted as JSON files under cache_dir,
+    where the least recently used files beyond max_disk_entries are removed.
+    Compiled GraphTemplates are kept in memory as well, keyed by the source content only.
+    """
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_entries=256):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._plans = OrderedDict()
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(source_data: bytes, suffix: str, cli_params=None) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{PLAN_CACHE_VERSION}:{suffix}:".encode())
+        digest.update(json.dumps(cli_params or {}, sort_keys=True).encode())
+        digest.update(source_data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return self._copy(plan)
+
+        plan = self._load(key)
+
+        with self._lock:
+            if plan is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, plan)
+        return self._copy(plan)
+
+    def put(self, key, graph_data):
+        plan = self._copy(graph_data)
+        with self._lock:
+            self._insert(key, plan)
+        self._store(key, plan)
+
+    def get_template(self, key):
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+            return template
+
+    def put_template(self, key, template):
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._templates.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._plans), "templates": len(self._templates)}
+
+    def _insert(self, key, plan):
+        self._plans[key] = plan
+        self._plans.move_to_end(key)
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+
+    @staticmethod
+    def _copy(graph_data):
+        return [{"COMMAND": line["COMMAND"], "ARGS": list(line["ARGS"])} for line in graph_data]
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self.cache_dir.joinpath(f"{key}.json")
+        try:
+            with open(path, 'r') as f:
+                plan = json.load(f)
+            os.utime(path)  # Recently used, pruned last
+            return plan
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, plan):
+        if not self.cache_dir:
+            return
+        target = self.cache_dir.joinpath(f"{key}.json")
+        tmp = target.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(plan, f)
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.warning(f'Persisting graph plan {key} failed: {e}')
+            return
+        self._prune()
+
+    def _prune(self):
+        # Removes the least recently used plan files beyond max_disk_entries
+        try:
+            files = [(entry.stat().st_mtime, entry) for entry in self.cache_dir.glob("*.json")]
+        except OSError as e:
+            logger.warning(f'Listing the plan cache {self.cache_dir} failed: {e}')
+            return
+        if len(files) <= self.max_disk_entries:
+            return
+
+        files.sort(key=lambda file: file[0])
+        for _, entry in files[:len(files) - self.max_disk_entries]:
+            try:
+                entry.unlink()
+            except OSError:  # Removed meanwhile (another server sharing cache_dir)
+                pass
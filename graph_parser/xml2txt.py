@@ -26,113 +26,144 @@ genesis_play_speeds = {'0': 'Full',
                        '8': '1'}
 
 
-def xml2txt(source_file_name: str,
-            target_file_name: str):
-    if pathlib.Path(source_file_name).exists():
-        with open(target_file_name, 'w') as target_f:
-            tree = xml_elem_tree.parse(source_file_name)
-            root = tree.getroot()
-
-            target_f.write('SetMemoryPool~1000~b\n\n')
-
-            target_f.write('###########################################################################\n'
-                           '###                         Create Filters                              ###\n'
-                           '###########################################################################\n')
-            graph_name = 'jeffGraph'
-            run_mode = None
-            play_speed_index = None
-            filters_list = []
-
-            for mvxpipeline_header in root.iter('mvxpipeline'):
-                run_mode = mvxpipeline_header.attrib['playmode']
-                play_speed_index = mvxpipeline_header.attrib['playspeed']
-
-            if genesis_play_speeds[play_speed_index] == 'Full':
-                play_speed_translated = None  # No speed limit
-            elif genesis_play_speeds[play_speed_index] == 'Original':
-                play_speed_translated = '-1'  # TODO: Is this correct? unable to find in code
-            else:
-                play_speed_translated = genesis_play_speeds[play_speed_index]
-
-            for mvx_filter in root.iter('filter'):
+def _banner(title: str):
+    yield '###########################################################################'
+    yield '###                         ' + title.ljust(44) + '###'
+    yield '###########################################################################'
+
+
+def xml2lines(source_file_name: str):
+    """Returns a generator of the TXT graph lines of a Genesis style XML file, without line endings"""
+    if not pathlib.Path(source_file_name).exists():
+        raise ValueError('Could not find file ' + source_file_name)
+
+    return _xml_lines(source_file_name)
+
+
+def _translate_play_speed(play_speed_index: str):
+    if genesis_play_speeds[play_speed_index] == 'Full':
+        return None  # No speed limit
+    elif genesis_play_speeds[play_speed_index] == 'Original':
+        return '-1'  # TODO: Is this correct? unable to find in code
+    else:
+        return genesis_play_speeds[play_speed_index]
+
+
+def _xml_lines(source_file_name: str):
+    # Streams the document with iterparse, each filter is emitted and dropped as soon as it is closed
+    yield 'SetMemoryPool~1000~b'
+    yield ''
+
+    yield from _banner('Create Filters')
+    graph_name = 'jeffGraph'
+    run_mode = None
+    play_speed_index = None
+    filters_list = []
+    filters_names = set()
+    next_suffix = {}
+    elements = []
+    filter_name = None
+
+    for event, elem in xml_elem_tree.iterparse(source_file_name, events=('start', 'end')):
+        if event == 'start':
+            elements.append(elem)
+
+            if elem.tag == 'mvxpipeline':
+                run_mode = elem.attrib['playmode']
+                play_speed_index = elem.attrib['playspeed']
+
+            elif elem.tag == 'filter':
                 ###################################################################################
                 #  If Genesis defines a different running speed than 'Full',                      #
                 #  We need to implement a #BlockFPS filter right after the source (first) filter  #
                 ###################################################################################
                 if len(filters_list) == 1:  # Source filter already defined
+                    play_speed_translated = _translate_play_speed(play_speed_index)
                     if play_speed_translated is not None:
-                        target_f.write('\n')
-                        target_f.write('createfilterbyname~#BlockFPS~blockfps~b\n')
-                        target_f.write('setParams~blockfps~Buffer size~1~b\n')
-                        target_f.write('setParams~blockfps~Framerate~' + play_speed_translated + '~b\n')
-                        target_f.write('setParams~blockfps~Drop frames when occupied~False~b\n')
+                        yield ''
+                        yield 'createfilterbyname~#BlockFPS~blockfps~b'
+                        yield 'setParams~blockfps~Buffer size~1~b'
+                        yield 'setParams~blockfps~Framerate~' + play_speed_translated + '~b'
+                        yield 'setParams~blockfps~Drop frames when occupied~False~b'
                         filters_list.append('blockfps')
+                        filters_names.add('blockfps')
 
                 # Adding a suffix number for support of multiple instances of same filter name
-                new_filter_name = mvx_filter.attrib['name'].lower() + '_1'
-
-                while new_filter_name in filters_list:  # Such a filter instance already exists
-                    split_filename = new_filter_name.split('_')
-                    split_filter_prefix = split_filename[0]
-                    split_filter_suffix = split_filename[1]
-                    new_suffix_int = int(split_filter_suffix) + 1
-                    new_filter_name = split_filter_prefix + '_' + str(new_suffix_int)
-
-                filters_list.append(new_filter_name)
-
-                target_f.write('\n')
-                target_f.write('createfilterbyname~' + mvx_filter.attrib['name'] + '~' + new_filter_name + '~b\n')
-
-                for mvx_parameter in mvx_filter.iter('parameter'):
-                    target_f.write('setParams~' +
-                                   new_filter_name + '~' +
-                                   mvx_parameter.attrib['name'] + '~' +
-                                   mvx_parameter.attrib['value'] + '~b\n')
-
-            target_f.write('\n'
-                           '###########################################################################\n'
-                           '###                         Create Graph                                ###\n'
-                           '###########################################################################\n'
-                           '\n')
-            target_f.write('createGraph~' + graph_name + '~b\n')
-
-            target_f.write('\n'
-                           '###########################################################################\n'
-                           '###                         Attach Filters                              ###\n'
-                           '###########################################################################\n'
-                           '\n')
-            for attach_filter_name in filters_list:
-                target_f.write('attachFilter~' + graph_name + '~' + attach_filter_name + '~b\n')
-
-            target_f.write('\n'
-                           '###########################################################################\n'
-                           '###                         Get Filter Params                           ###\n'
-                           '###########################################################################\n'
-                           '\n')
-            for get_filter_name in filters_list:
-                target_f.write('#getParams~' + graph_name + '~' + get_filter_name + '~b\n')
-
-            target_f.write('\n'
-                           '###########################################################################\n'
-                           '###                         Run Graph                                   ###\n'
-                           '###########################################################################\n'
-                           '\n')
-            target_f.write('runGraph~' + graph_name + '~' + run_mode + '~b\n')
-
-            target_f.write('\n'
-                           '###########################################################################\n'
-                           '###                         Stop Graph                                  ###\n'
-                           '###########################################################################\n'
-                           '#NOTE: stopGraph may abort your graph prematurely,\n'
-                           '#      commenting out cleanup code!\n'
-                           '\n')
-            target_f.write('#stopGraph~' + graph_name + '~b\n')
-            target_f.write('#deleteGraph~' + graph_name + '~b\n')
-
-            for delete_filter_name in filters_list:
-                target_f.write('#deleteFilter~' + delete_filter_name + '~b\n')
-    else:
-        raise ValueError('Could not find file ' + source_file_name)
+                base_name = elem.attrib['name'].lower()
+                suffix = next_suffix.get(base_name, 1)
+                filter_name = base_name + '_' + str(suffix)
+
+                while filter_name in filters_names:  # Such a filter instance already exists
+                    suffix += 1
+                    filter_name = base_name + '_' + str(suffix)
+
+                next_suffix[base_name] = suffix + 1
+                filters_list.append(filter_name)
+                filters_names.add(filter_name)
+
+                yield ''
+                yield 'createfilterbyname~' + elem.attrib['name'] + '~' + filter_name + '~b'
+            continue
+
+        elements.pop()
+
+        if elem.tag == 'parameter' and filter_name is not None:
+            yield ('setParams~' +
+                   filter_name + '~' +
+                   elem.attrib['name'] + '~' +
+                   elem.attrib['value'] + '~b')
+
+        elif elem.tag == 'filter':
+            filter_name = None
+            elem.clear()
+            if elements and len(elements[-1]) and elements[-1][-1] is elem:
+                del elements[-1][-1]
+
+    yield from _tail_lines(graph_name, run_mode, filters_list)
+
+
+def _tail_lines(graph_name: str, run_mode: str, filters_list: list):
+    yield ''
+    yield from _banner('Create Graph')
+    yield ''
+    yield 'createGraph~' + graph_name + '~b'
+
+    yield ''
+    yield from _banner('Attach Filters')
+    yield ''
+    for attach_filter_name in filters_list:
+        yield 'attachFilter~' + graph_name + '~' + attach_filter_name + '~b'
+
+    yield ''
+    yield from _banner('Get Filter Params')
+    yield ''
+    for get_filter_name in filters_list:
+        yield '#getParams~' + graph_name + '~' + get_filter_name + '~b'
+
+    yield ''
+    yield from _banner('Run Graph')
+    yield ''
+    yield 'runGraph~' + graph_name + '~' + run_mode + '~b'
+
+    yield ''
+    yield from _banner('Stop Graph')
+    yield '#NOTE: stopGraph may abort your graph prematurely,'
+    yield '#      commenting out cleanup code!'
+    yield ''
+    yield '#stopGraph~' + graph_name + '~b'
+    yield '#deleteGraph~' + graph_name + '~b'
+
+    for delete_filter_name in filters_list:
+        yield '#deleteFilter~' + delete_filter_name + '~b'
+
+
+def xml2txt(source_file_name: str,
+            target_file_name: str):
+    lines = xml2lines(source_file_name)
+
+    with open(target_file_name, 'w') as target_f:
+        for line in lines:
+            target_f.write(line + '\n')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,257 @@
+import os
+import re
+import time
+import logging
+import threading
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+WORKER_START_TIMEOUT = 60.0
+REQUEST_TIMEOUT      = 300.0
+
+# Graph ids name the graph's upload folder, nothing that could leave it
+_GRAPH_ID = re.compile(r'[A-Za-z0-9_][A-Za-z0-9_.-]*')
+
+# Routes a worker cannot serve through its test client: the event stream never ends, /shutdown is the parent server's
+UNFORWARDED_ROUTES = {'events', 'graph/events', 'shutdown'}
+
+
+class GraphPoolFull(Exception):
+    pass
+
+
+class GraphWorkerError(Exception):
+    pass
+
+
+def valid_graph_id(graph_id: str) -> bool:
+    return bool(_GRAPH_ID.fullmatch(graph_id))
+
+
+def _usage() -> dict:
+    usage = {"cpu_seconds": time.process_time(), "max_rss_kb": None}
+    if resource is not None:
+        usage["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def _graph_worker_main(conn, graph_id, mvgraphapi_plugins_path, memory_pool_frequency, runner_kwargs):
+    # Runs in the worker process, a complete NucRestRunner without an HTTP server of its own
+    from pathlib import Path
+    from mvpy_rest_server import NucRestRunner
+    try:
+        # An upload folder of its own, graphs uploading the same file name do not overwrite each other
+        runner = NucRestRunner(mvgraphapi_plugins_path, memory_pool_frequency, None, log_name=f'MVPY_GRAPH_{graph_id}',
+                               upload_folder=str(Path(NucRestRunner.UPLOAD_FOLDER).joinpath(graph_id)), **runner_kwargs)
+        runner._graph_core.ready.wait()
+        if runner._graph_core.init_error is not None:
+            raise runner._graph_core.init_error
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+
+    client = runner.app.test_client()
+    adapter = runner.app.url_map.bind('localhost')
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+
+        if message[0] == "stop":
+            runner.r_destroy_graph()
+            conn.send(("stopped", _usage()))
+            break
+
+        _, method, route, query_string, body, content_type, accept = message
+        # /graphs/<id>/build maps to /graph/build, routes outside /graph (set_cli_params, metrics...) keep their path
+        path = '/graph/' + route
+        try:
+            adapter.match(path, method)
+        except Exception:
+            path = '/' + route
+
+        response = client.open(path, method=method, query_string=query_string, data=body, content_type=content_type,
+                               headers={"Accept": accept} if accept else None)
+        conn.send(("response", response.status_code, [(k, v) for k, v in response.headers if k.lower() != 'content-length'],
+                   response.get_data(), _usage()))
+
+
+class _GraphWorker():
+    def __init__(self, graph_id, process, conn):
+        self.graph_id = graph_id
+        self.process = process
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.usage = {"cpu_seconds": 0.0, "max_rss_kb": None}
+
+    def stats(self) -> dict:
+        return {
+            "graph_id"     : self.graph_id,
+            "pid"          : self.process.pid,
+            "alive"        : self.process.is_alive(),
+            "uptime"       : time.time() - self.started,
+            "requests"     : self.requests,
+            "errors"       : self.errors,
+            "busy_seconds" : self.busy_seconds,
+            **self.usage,
+        }
+
+
+class GraphPool():
+    """
+    Runs every graph in a worker process of its own, each with its own MvxGraphCore instance.
+    Requests to the same graph are served in order, requests to different graphs run in parallel.
+    A worker not answering a request within request_timeout seconds (None waits forever) is killed, destroy() kills
+    a worker busy with a request right away instead of waiting for it.
+    A killed or exited worker is dropped from the pool with its graph, freeing its slot.
+    """
+    def __init__(self, mvgraphapi_plugins_path, memory_pool_frequency, max_graphs: int, runner_kwargs: dict = None,
+                 request_timeout: float = REQUEST_TIMEOUT):
+        self.build_path = mvgraphapi_plugins_path
+        self.mempool = memory_pool_frequency
+        self.max_graphs = max_graphs
+        self.request_timeout = request_timeout
+        self.runner_kwargs = runner_kwargs or {}
+        self._workers = {}
+        self._lock = threading.Lock()
+        # spawn everywhere, forking a process running server threads is not safe
+        self._context = multiprocessing.get_context('spawn')
+
+    def __contains__(self, graph_id):
+        return graph_id in self._workers
+
+    def create(self, graph_id: str) -> dict:
+        if not valid_graph_id(graph_id):
+            raise ValueError(f'Invalid graph id {graph_id}')
+        with self._lock:
+            exited = [worker for worker in self._workers.values() if worker is not None and not worker.process.is_alive()]
+        for worker in exited:
+            self._discard(worker)
+
+        with self._lock:
+            if graph_id in self._workers:
+                raise ValueError(f'Graph {graph_id} already exists')
+            if len(self._workers) >= self.max_graphs:
+                raise GraphPoolFull(f'Maximum of {self.max_graphs} concurrent graphs reached')
+            # Reserve the slot while the worker starts
+            self._workers[graph_id] = None
+
+        try:
+            parent_conn, child_conn = self._context.Pipe()
+            process = self._context.Process(target=_graph_worker_main, name=f'mvpy_graph_{graph_id}', daemon=True,
+                                            args=(child_conn, graph_id, self.build_path, self.mempool, self.runner_kwargs))
+            process.start()
+            child_conn.close()
+
+            if not parent_conn.poll(WORKER_START_TIMEOUT):
+                process.kill()
+                raise GraphWorkerError(f'Graph {graph_id} worker did not start in {WORKER_START_TIMEOUT} seconds')
+            status, detail = parent_conn.recv()
+            if status != "ready":
+                process.join()
+                raise GraphWorkerError(detail)
+        except BaseException:
+            with self._lock:
+                del self._workers[graph_id]
+            raise
+
+        worker = _GraphWorker(graph_id, process, parent_conn)
+        with self._lock:
+            self._workers[graph_id] = worker
+        logger.info(f'Graph {graph_id} worker started, pid {process.pid}')
+        return worker.stats()
+
+    def _get(self, graph_id) -> _GraphWorker:
+        worker = self._workers.get(graph_id)
+        if worker is None:
+            raise KeyError(graph_id)
+        return worker
+
+    def _discard(self, worker: _GraphWorker):
+        # Drops a killed or exited worker, later requests to its graph answer as for a graph never created
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        with self._lock:
+            if self._workers.get(worker.graph_id) is worker:
+                del self._workers[worker.graph_id]
+                logger.warning(f'Graph {worker.graph_id} worker exited (exit code {worker.process.exitcode}) and was removed')
+
+    def request(self, graph_id: str, method: str, route: str, query_string: bytes = b'', body: bytes = b'', content_type: str = None,
+                accept: str = None):
+        worker = self._get(graph_id)
+        with worker.lock:
+            started = time.perf_counter()
+            try:
+                if not worker.process.is_alive():
+                    raise EOFError
+                worker.conn.send(("request", method, route, query_string, body, content_type, accept))
+                if not worker.conn.poll(self.request_timeout):
+                    # Hung in a native call, its answer would arrive for the next request, so the worker cannot be reused
+                    worker.errors += 1
+                    self._discard(worker)
+                    raise GraphWorkerError(f'Graph {graph_id} worker did not answer in {self.request_timeout} seconds and was killed')
+                _, status, headers, response_body, worker.usage = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                worker.errors += 1
+                self._discard(worker)
+                raise GraphWorkerError(f'Graph {graph_id} worker exited (exit code {worker.process.exitcode})') from e
+            finally:
+                worker.requests += 1
+                worker.busy_seconds += time.perf_counter() - started
+
+        if status >= 500:
+            worker.errors += 1
+        return status, headers, response_body
+
+    def destroy(self, graph_id: str, timeout: float = 10.0) -> dict:
+        worker = self._get(graph_id)
+        if not worker.lock.acquire(blocking=False):
+            # Busy with a request (possibly hung in the core), the request fails once its worker is gone
+            worker.process.kill()
+            worker.process.join()
+        else:
+            try:
+                worker.conn.send(("stop",))
+                if worker.conn.poll(timeout):
+                    _, worker.usage = worker.conn.recv()
+            except (EOFError, OSError):
+                pass
+            finally:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+                worker.conn.close()
+                worker.lock.release()
+
+        with self._lock:
+            self._workers.pop(graph_id, None)
+        logger.info(f'Graph {graph_id} worker stopped')
+        return worker.stats()
+
+    def close(self):
+        for graph_id in [graph_id for graph_id, worker in list(self._workers.items()) if worker is not None]:
+            self.destroy(graph_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            workers = [worker for worker in self._workers.values() if worker is not None]
+        return {
+            "max_graphs" : self.max_graphs,
+            "graphs"     : {worker.graph_id: worker.stats() for worker in workers},
+        }
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the snapshot layout changes, older snapshots are not restored
+SNAPSHOT_VERSION = 1
+DEFAULT_SAVE_DELAY = 0.2
+
+
+class GraphSnapshot():
+    """
+    Persists the loaded graph (its parsed commands, cli_params, play mode and state) and the parameters set on it since,
+    so a restarted server can rebuild it without parsing the graph file again.
+    request_save() is cheap: a writer thread collects the state save_delay seconds later, once for any number of requests,
+    and only writes when it changed. Files are replaced atomically, a crash never leaves a partial snapshot behind.
+    """
+    def __init__(self, snapshot_file, get_state, save_delay: float = DEFAULT_SAVE_DELAY):
+        self.snapshot_file = Path(snapshot_file)
+        self.get_state = get_state
+        self.save_delay = save_delay
+        self.saves = 0
+        self.last_save_time = None
+        self._last_data = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._writer = None
+
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+
+    def request_save(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='mvpy_snapshot', daemon=True)
+            self._writer.start()
+        self._pending.set()
+
+    def _write_loop(self):
+        while True:
+            self._pending.wait()
+            time.sleep(self.save_delay)
+            self._pending.clear()
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f'Saving the graph snapshot failed: {e}')
+
+    def save(self) -> bool:
+        # Writes the current state now, False when it did not change since the last save
+        with self._lock:
+            data = json.dumps({"version": SNAPSHOT_VERSION, **self.get_state()}, separators=(",", ":")).encode()
+            if data == self._last_data:
+                return False
+
+            tmp = self.snapshot_file.with_suffix(f"{self.snapshot_file.suffix}.{os.getpid()}.tmp")
+            with open(tmp, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_file)
+
+            self._last_data = data
+            self.saves += 1
+            self.last_save_time = time.time()
+            return True
+
+    def load(self):
+        # The saved state, or None when there is no usable snapshot
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                data = f.read()
+            state = json.loads(data)
+        except OSError:
+            return None
+        except ValueError as e:
+            logger.error(f'Graph snapshot {self.snapshot_file} is not valid JSON: {e}')
+            return None
+
+        if state.pop("version", None) != SNAPSHOT_VERSION:
+            logger.warning(f'Graph snapshot {self.snapshot_file} has another version, not restored')
+            return None
+
+        with self._lock:
+            self._last_data = data
+        return state
+
+    def stats(self) -> dict:
+        return {
+            "file"           : str(self.snapshot_file),
+            "saves"          : self.saves,
+            "last_save_time" : self.last_save_time,
+            "size"           : len(self._last_data) if self._last_data else 0,
+        }
@@ -0,0 +1,127 @@
+import logging
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cached reads up to full graph builds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Histogram():
+    __slots__ = ('buckets', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics():
+    """
+    Request and native call metrics of a NucRestRunner, rendered in the Prometheus text exposition format.
+    Counters and histograms are updated by the server hooks, gauges are read from their callbacks on every render.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests = {}         # (route, method, status) -> count
+        self._request_errors = {}   # (route, method) -> count
+        self._request_latency = {}  # route -> _Histogram
+        self._native_calls = {}     # symbol -> count
+        self._native_failures = {}  # symbol -> count
+        self._native_latency = {}   # symbol -> _Histogram
+        self._gauges = []
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        with self._lock:
+            key = (route, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                self._request_errors[(route, method)] = self._request_errors.get((route, method), 0) + 1
+            self._observe(self._request_latency, route, seconds)
+
+    def observe_native(self, symbol: str, seconds: float, failed: bool = False):
+        with self._lock:
+            self._native_calls[symbol] = self._native_calls.get(symbol, 0) + 1
+            if failed:
+                self._native_failures[symbol] = self._native_failures.get(symbol, 0) + 1
+            self._observe(self._native_latency, symbol, seconds)
+
+    def gauge(self, name: str, description: str, callback, label: str = None, metric_type: str = 'gauge'):
+        # callback returns a number, or a {label_value: number} dict when label is given.
+        # metric_type 'counter' for totals kept by somebody else
+        self._gauges.append((name, description, callback, label, metric_type))
+
+    def _observe(self, histograms: dict, key: str, seconds: float):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(len(self.buckets))
+        index = bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            histogram.buckets[index] += 1
+        histogram.sum += seconds
+        histogram.count += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            self._render_counter(lines, 'mvpy_http_requests_total', 'Requests served by route, method and status.',
+                                 ('route', 'method', 'status'), self._requests)
+            self._render_counter(lines, 'mvpy_http_request_errors_total', 'Requests answered with a 5xx status.',
+                                 ('route', 'method'), self._request_errors)
+            self._render_histogram(lines, 'mvpy_http_request_duration_seconds', 'Request latency by route.',
+                                   'route', self._request_latency)
+            self._render_counter(lines, 'mvpy_native_calls_total', 'MvxGraphCore calls by wrapper method.',
+                                 ('symbol',), self._native_calls)
+            self._render_counter(lines, 'mvpy_native_call_failures_total', 'MvxGraphCore calls that raised.',
+                                 ('symbol',), self._native_failures)
+            self._render_histogram(lines, 'mvpy_native_call_duration_seconds', 'MvxGraphCore call latency, without dispatcher queue wait.',
+                                   'symbol', self._native_latency)
+
+        for name, description, callback, label, metric_type in self._gauges:
+            try:
+                value = callback()
+            except Exception as e:
+                logger.error(e)
+                continue
+
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            if label is None:
+                lines.append(f'{name} {self._number(value)}')
+            else:
+                lines.extend(f'{name}{{{label}="{self._escape(key)}"}} {self._number(v)}' for key, v in value.items())
+
+        return '\n'.join(lines) + '\n'
+
+    def _render_counter(self, lines: list, name: str, description: str, labels: tuple, values: dict):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f'{name}{self._labels(zip(labels, key))} {value}')
+
+    def _render_histogram(self, lines: list, name: str, description: str, label: str, histograms: dict):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{self._labels(((label, key), ("le", repr(bound))))} {cumulative}')
+            lines.append(f'{name}_bucket{self._labels(((label, key), ("le", "+Inf")))} {histogram.count}')
+            lines.append(f'{name}_sum{self._labels(((label, key),))} {self._number(histogram.sum)}')
+            lines.append(f'{name}_count{self._labels(((label, key),))} {histogram.count}')
+
+    @classmethod
+    def _labels(cls, pairs) -> str:
+        return '{' + ','.join(f'{name}="{cls._escape(value)}"' for name, value in pairs) + '}'
+
+    @staticmethod
+    def _escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def _number(value) -> str:
+        return repr(float(value)) if isinstance(value, float) else str(int(value))
@@ -0,0 +1,476 @@
+import json
+import time
+import uuid
+import asyncio
+import threading
+import http.client
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+DEFAULT_HOST    = "127.0.0.1"
+DEFAULT_PORT    = 7500
+DEFAULT_TIMEOUT = 30.0
+
+# Errors of a kept-alive connection the server closed meanwhile, the request is sent again on a new one
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError)
+# Only these are resent, the server may have run a POST (build_run, upload_run...) before the connection dropped
+IDEMPOTENT_METHODS = {"GET", "HEAD", "DELETE"}
+
+
+class MvpyError(Exception):
+    def __init__(self, status: int, message):
+        super().__init__(f'{status}: {message}')
+        self.status = status
+        self.message = message
+
+
+def encode_upload(file_name: str, file_data: bytes, fields: dict = None) -> tuple:
+    # multipart/form-data body of /graph/upload, returns (body, content_type)
+    boundary = uuid.uuid4().hex
+    fields = dict(fields or {}, filename=file_name)
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+             for name, value in fields.items()]
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n'.encode() + file_data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _decode(status: int, content_type: str, data: bytes):
+    if content_type and content_type.startswith('application/json'):
+        result = json.loads(data)
+    else:
+        result = data.decode(errors='replace')
+    if status >= 400:
+        raise MvpyError(status, result)
+    return result
+
+
+def _param_batches(params, batch_size: int):
+    # {unique_name: {param_name: value}} or [(unique_name, param_name, value), ...] in set_filter_params batches
+    if isinstance(params, dict):
+        params = [(unique_name, param_name, value) for unique_name, filter_params in params.items()
+                  for param_name, value in filter_params.items()]
+    params = [{"unique_name": unique_name, "param_name": param_name, "param_value": value} for unique_name, param_name, value in params]
+    return [params[index:index + batch_size] for index in range(0, len(params), batch_size)]
+
+
+def _state_name(state) -> str:
+    return getattr(state, 'name', state)
+
+
+class _Routes():
+    """
+    One method per NucRestRunner route. _call() is synchronous in MvpyClient and a coroutine in AsyncMvpyClient,
+    so every method returns the result, or an awaitable of it.
+    """
+    graph_id = None
+
+    def _path(self, path: str) -> str:
+        # Graph pool clients address /graphs/<id>/<route>
+        if self.graph_id is None:
+            return path
+        route = path[len('/graph/'):] if path.startswith('/graph/') else path[1:]
+        return f'/graphs/{quote(self.graph_id, safe="")}/{route}'
+
+    def request(self, method: str, path: str, payload=None, body: bytes = None, content_type: str = None):
+        # Any route, payload is sent as JSON
+        return self._call(method, path, payload, body, content_type)
+
+    def _upload(self, path: str, graph, cli_params: dict = None):
+        graph = Path(graph)
+        body, content_type = encode_upload(graph.name, graph.read_bytes(), cli_params)
+        return self._call("POST", path, body=body, content_type=content_type)
+
+    def hello(self):
+        return self._call("GET", "/")
+
+    def server_status(self):
+        return self._call("GET", "/server_status")
+
+    def ready(self):
+        # Raises MvpyError 503 while the startup graph preloads, 500 when it failed
+        return self._call("GET", "/ready")
+
+    def get_cli_params(self):
+        return self._call("GET", "/get_cli_params")
+
+    def set_cli_params(self, cli_params: dict):
+        return self._call("POST", "/set_cli_params", {"cli_params": cli_params})
+
+    def upload(self, graph, cli_params: dict = None):
+        return self._upload("/graph/upload", graph, cli_params)
+
+    def upload_run(self, graph, cli_params: dict = None):
+        return self._upload("/graph/upload_run", graph, cli_params)
+
+    def set_params(self, params_graph, cli_params: dict = None):
+        return self._upload("/graph/set_params", params_graph, cli_params)
+
+    def build(self):
+        return self._call("POST", "/graph/build")
+
+    def build_run(self):
+        return self._call("POST", "/graph/build_run")
+
+    def build_remote(self, remote_graph: str, cli_params: dict = None):
+        return self._call("POST", "/graph/build_remote", {"remote_graph": str(remote_graph), "cli_params": cli_params})
+
+    def build_run_remote(self, remote_graph: str, cli_params: dict = None):
+        return self._call("POST", "/graph/build_run_remote", {"remote_graph": str(remote_graph), "cli_params": cli_params})
+
+    def run(self):
+        return self._call("POST", "/graph/run")
+
+    def stop(self):
+        return self._call("POST", "/graph/stop")
+
+    def pause(self):
+        return self._call("POST", "/graph/pause")
+
+    def resume(self):
+        return self._call("POST", "/graph/resume")
+
+    def terminate(self):
+        return self._call("POST", "/graph/terminate")
+
+    def get_state(self):
+        return self._call("GET", "/graph/get_state")
+
+    def get_source(self):
+        return self._call("GET", "/graph/source")
+
+    def get_filters(self):
+        return self._call("GET", "/graph/get_filters")
+
+    def get_play_mode(self):
+        return self._call("GET", "/graph/get_play_mode")
+
+    def set_play_mode(self, play_mode):
+        return self._call("POST", "/graph/set_play_mode", {"play_mode": str(play_mode)})
+
+    def get_filter_param(self, unique_name: str, param_name: str):
+        return self._call("GET", "/graph/get_filter_param", {"unique_name": unique_name, "param_name": param_name})
+
+    def set_filter_param(self, unique_name: str, param_name: str, param_value):
+        return self._call("POST", "/graph/set_filter_param", {"unique_name": unique_name, "param_name": param_name, "param_value": param_value})
+
+    def set_filter_params(self, params: list, read_back: bool = True):
+        return self._call("POST", "/graph/set_filter_params", {"params": params, "read_back": read_back})
+
+    def get_params(self, unique_name: str):
+        return self._call("GET", "/graph/get_params", {"unique_name": unique_name})
+
+    def get_all_params(self):
+        return self._call("GET", "/graph/get_all_params")
+
+    def get_param_cache(self):
+        return self._call("GET", "/graph/param_cache")
+
+    def set_volatile_params(self, volatile_params: dict):
+        return self._call("POST", "/graph/param_cache", {"volatile_params": volatile_params})
+
+    def get_plan_cache(self):
+        return self._call("GET", "/graph/plan_cache")
+
+    def get_snapshot(self):
+        return self._call("GET", "/graph/snapshot")
+
+    def get_filter_catalog(self, name: str = None, guid: str = None):
+        # The whole catalog, or the {"name", "guid"} of one filter
+        query = {key: value for key, value in (("name", name), ("guid", guid)) if value is not None}
+        return self._call("GET", f"/filters?{urlencode(query)}" if query else "/filters")
+
+    def refresh_filter_catalog(self):
+        return self._call("POST", "/filters/refresh")
+
+    def get_native_dispatcher(self):
+        return self._call("GET", "/native/dispatcher")
+
+    def get_native_core(self):
+        return self._call("GET", "/native/core")
+
+    def get_metrics(self):
+        return self._call("GET", "/metrics")
+
+    def get_trace(self):
+        return self._call("GET", "/debug/trace")
+
+    def clear_trace(self):
+        return self._call("DELETE", "/debug/trace")
+
+    def get_log_sampling(self):
+        return self._call("GET", "/log_sampling")
+
+    def set_log_sampling(self, default_rate: float = None, max_body: int = None, route_rates: dict = None):
+        payload = {"default_rate": default_rate, "max_body": max_body, "route_rates": route_rates}
+        return self._call("POST", "/log_sampling", {name: value for name, value in payload.items() if value is not None})
+
+    def list_graphs(self):
+        return self._call("GET", "/graphs")
+
+    def create_graph(self, graph_id: str):
+        return self._call("POST", f'/graphs/{quote(graph_id, safe="")}')
+
+    def delete_graph(self, graph_id: str):
+        return self._call("DELETE", f'/graphs/{quote(graph_id, safe="")}')
+
+    def shutdown(self):
+        return self._call("POST", "/shutdown")
+
+
+class MvpyClient(_Routes):
+    """
+    Synchronous client over one keep-alive connection, safe to share between threads (calls are serialized).
+    Only a server started with --serve asyncio keeps it open, the flask server closes it after every response.
+        client = MvpyClient("nuc01")
+        client.build_run_remote(r"C:\\graphs\\preview.xml", {"NUM": "1"})
+        client.wait_for_state("PLAYING")
+    """
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = DEFAULT_TIMEOUT, graph_id: str = None):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.graph_id = graph_id
+        self._connection = None
+        self._lock = threading.Lock()
+        self._parent = None
+
+    def graph(self, graph_id: str) -> 'MvpyClient':
+        # Client of a graph pool graph, sharing this client's connection
+        client = MvpyClient(self.host, self.port, self.timeout, graph_id)
+        client._parent = self._parent or self
+        client._lock = client._parent._lock
+        return client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._parent is not None:
+            return self._parent._close()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _send(self, method, path, body, headers):
+        if self._parent is not None:
+            return self._parent._send(method, path, body, headers)
+
+        reused = self._connection is not None
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self._connection.request(method, path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except STALE_CONNECTION_ERRORS:
+            self._close()
+            if not reused or method not in IDEMPOTENT_METHODS:
+                raise
+            return self._send(method, path, body, headers)
+        except Exception:
+            self._close()
+            raise
+
+        if response.will_close:
+            self._close()
+        return response.status, response.getheader('Content-Type', ''), data
+
+    def _call(self, method, path, payload=None, body=None, content_type=None):
+        if payload is not None:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        headers = {"Content-Type": content_type} if content_type else {}
+        with self._lock:
+            status, response_type, data = self._send(method, self._path(path), body, headers)
+        return _decode(status, response_type, data)
+
+    def set_params_batch(self, params, read_back: bool = True, batch_size: int = 256) -> list:
+        # {unique_name: {param_name: value}} or [(unique_name, param_name, value), ...], batch_size entries per request
+        results = []
+        for batch in _param_batches(params, batch_size):
+            results += self.set_filter_params(batch, read_back)
+        return results
+
+    def wait_for_state(self, *states, timeout: float = 30.0, interval: float = 0.1) -> str:
+        # Polls get_state until it is one of states, returns it
+        states = {_state_name(state) for state in states}
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.get_state()
+            if state in states:
+                return state
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f'Graph state is {state}, not {" or ".join(sorted(states))} after {timeout} seconds')
+            time.sleep(interval)
+
+    def wait_until_ready(self, timeout: float = 60.0, interval: float = 0.1) -> dict:
+        # Polls /ready while it answers 503, a failed preload (500) is raised right away
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.ready()
+            except MvpyError as e:
+                if e.status != 503 or time.monotonic() >= deadline:
+                    raise
+            time.sleep(interval)
+
+    def events(self, timeout: float = None):
+        # Yields (event, data) from /graph/events, on a connection of its own
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        try:
+            connection.request("GET", self._path("/graph/events"))
+            response = connection.getresponse()
+            if response.status >= 400:
+                raise MvpyError(response.status, response.read().decode(errors='replace'))
+
+            event = None
+            while True:
+                line = response.fp.readline()
+                if not line:
+                    return
+                line = line.decode().rstrip('\r\n')
+                if line.startswith('event: '):
+                    event = line[len('event: '):]
+                elif line.startswith('data: '):
+                    yield event, json.loads(line[len('data: '):])
+        finally:
+            connection.close()
+
+
+class AsyncMvpyClient(_Routes):
+    """
+    asyncio client over one keep-alive connection, every route method is a coroutine.
+    Only a server started with --serve asyncio keeps it open, the flask server closes it after every response.
+        async with AsyncMvpyClient("nuc01") as client:
+            await client.build_run_remote(r"C:\\graphs\\preview.xml", {"NUM": "1"})
+            await client.wait_for_state("PLAYING")
+    """
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = DEFAULT_TIMEOUT, graph_id: str = None):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.graph_id = graph_id
+        self._streams = None
+        self._lock = None
+        self._parent = None
+
+    def graph(self, graph_id: str) -> 'AsyncMvpyClient':
+        client = AsyncMvpyClient(self.host, self.port, self.timeout, graph_id)
+        client._parent = self._parent or self
+        return client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._parent is not None:
+            return await self._parent.close()
+        if self._streams is not None:
+            self._streams[1].close()
+            self._streams = None
+
+    async def _send(self, method, path, body, headers):
+        if self._parent is not None:
+            return await self._parent._send(method, path, body, headers)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            reused = self._streams is not None
+            try:
+                return await asyncio.wait_for(self._exchange(method, path, body, headers), self.timeout)
+            except STALE_CONNECTION_ERRORS:
+                await self.close()
+                if not reused or method not in IDEMPOTENT_METHODS:
+                    raise
+                return await asyncio.wait_for(self._exchange(method, path, body, headers), self.timeout)
+            except BaseException:
+                await self.close()
+                raise
+
+    async def _exchange(self, method, path, body, headers):
+        if self._streams is None:
+            self._streams = await asyncio.open_connection(self.host, self.port)
+        reader, writer = self._streams
+
+        body = body or b''
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        head += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+        response_headers = {}
+        while True:
+            line = (await reader.readuntil(b'\r\n')).decode('latin-1').rstrip('\r\n')
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = b''
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                data += chunk[:-2]
+        else:
+            data = await reader.read()
+            response_headers['connection'] = 'close'
+
+        connection = response_headers.get('connection', '').lower()
+        if connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive'):
+            writer.close()
+            self._streams = None
+        return int(status), response_headers.get('content-type', ''), data
+
+    async def _call(self, method, path, payload=None, body=None, content_type=None):
+        if payload is not None:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        headers = {"Content-Type": content_type} if content_type else {}
+        status, response_type, data = await self._send(method, self._path(path), body, headers)
+        return _decode(status, response_type, data)
+
+    async def set_params_batch(self, params, read_back: bool = True, batch_size: int = 256) -> list:
+        results = []
+        for batch in _param_batches(params, batch_size):
+            results += await self.set_filter_params(batch, read_back)
+        return results
+
+    async def wait_for_state(self, *states, timeout: float = 30.0, interval: float = 0.1) -> str:
+        states = {_state_name(state) for state in states}
+        deadline = time.monotonic() + timeout
+        while True:
+            state = await self.get_state()
+            if state in states:
+                return state
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f'Graph state is {state}, not {" or ".join(sorted(states))} after {timeout} seconds')
+            await asyncio.sleep(interval)
+
+    async def wait_until_ready(self, timeout: float = 60.0, interval: float = 0.1) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return await self.ready()
+            except MvpyError as e:
+                if e.status != 503 or time.monotonic() >= deadline:
+                    raise
+            await asyncio.sleep(interval)
@@ -0,0 +1,211 @@
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from mvpy_client import MvpyClient, MvpyError, encode_upload
+
+DEFAULT_PORT     = 7500
+DEFAULT_PARALLEL = 16
+DEFAULT_TIMEOUT  = 10.0
+
+class Fleet():
+    """
+    Runs the same REST operation on many mvpy servers at once, at most `parallel` hosts at a time.
+    Every host keeps one keep-alive MvpyClient across requests and operations (reused with --serve asyncio servers),
+    every request has a `timeout`.
+    """
+    def __init__(self, hosts: list, parallel: int = DEFAULT_PARALLEL, timeout: float = DEFAULT_TIMEOUT):
+        self.hosts = list(dict.fromkeys(self.parse_host(host) for host in hosts))
+        self.parallel = parallel
+        self.timeout = timeout
+        self._clients = {host: MvpyClient(*host, timeout=timeout) for host in self.hosts}
+
+    @staticmethod
+    def parse_host(host: str) -> tuple:
+        name, _, port = host.strip().rpartition(':') if ':' in host else (host.strip(), None, None)
+        return name, int(port) if port else DEFAULT_PORT
+
+    def close(self):
+        for client in self._clients.values():
+            client.close()
+
+    def client(self, host: tuple) -> MvpyClient:
+        return self._clients[host]
+
+    def run(self, operation, *args, **kwargs) -> dict:
+        # operation(client, *args, **kwargs) -> result of one host, see the op_* functions
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.parallel, len(self.hosts)))) as executor:
+            results = list(executor.map(lambda host: self._run_host(operation, host, args, kwargs), self.hosts))
+        return self.report(results, time.perf_counter() - started)
+
+    def _run_host(self, operation, host, args, kwargs) -> dict:
+        started = time.perf_counter()
+        result = {"host": f"{host[0]}:{host[1]}", "ok": True, "skipped": False, "result": None, "error": None}
+        try:
+            value = operation(self.client(host), *args, **kwargs)
+            if isinstance(value, Skipped):
+                result["skipped"], value = True, value.result
+            result["result"] = value
+        except Exception as e:
+            result["ok"], result["error"] = False, str(e) or type(e).__name__
+        result["latency_ms"] = (time.perf_counter() - started) * 1e3
+        return result
+
+    @staticmethod
+    def report(results: list, wall_time: float) -> dict:
+        latencies = sorted(result["latency_ms"] for result in results)
+        return {
+            "hosts"      : len(results),
+            "ok"         : sum(result["ok"] for result in results),
+            "failed"     : sum(not result["ok"] for result in results),
+            "skipped"    : sum(result["skipped"] for result in results),
+            "wall_ms"    : wall_time * 1e3,
+            "latency_ms" : {
+                "min" : latencies[0] if latencies else 0.0,
+                "p50" : statistics.median(latencies) if latencies else 0.0,
+                "p95" : latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else 0.0,
+                "max" : latencies[-1] if latencies else 0.0,
+            },
+            "results"    : results,
+        }
+
+
+class Skipped():
+    # Returned by an operation that found nothing to do on a host
+    def __init__(self, result):
+        self.result = result
+
+
+def graph_upload(graph: str, cli_params: dict = None) -> dict:
+    # Encodes a graph file upload once for every host
+    graph_data = Path(graph).read_bytes()
+    body, content_type = encode_upload(Path(graph).name, graph_data, cli_params)
+    return {
+        "sha256"       : hashlib.sha256(graph_data).hexdigest(),
+        "cli_params"   : dict(cli_params or {}),
+        "body"         : body,
+        "content_type" : content_type,
+    }
+
+
+def op_get_state(client):
+    return client.get_state()
+
+
+def op_terminate(client):
+    try:
+        return client.terminate()
+    except MvpyError as e:
+        if e.status == 404:  # Nothing loaded
+            return Skipped(e.message)
+        raise
+
+
+def op_set_filter_param(client, unique_name, param_name, param_value):
+    return client.set_filter_param(unique_name, param_name, param_value)
+
+
+def op_upload_run(client, upload: dict):
+    # Skips the upload when the host already loaded the same graph file with the same cli_params
+    try:
+        source = client.get_source()
+    except MvpyError as e:
+        if e.status != 404:
+            raise
+        source = None
+
+    if source is not None and source["sha256"] == upload["sha256"] and source["cli_params"] == upload["cli_params"]:
+        state = client.get_state()
+        if state == "PLAYING":
+            return Skipped(state)
+        client.build_run() if state == "NOT_BUILT" else client.run()
+        return Skipped(client.get_state())
+
+    client.request("POST", "/graph/upload_run", body=upload["body"], content_type=upload["content_type"])
+    return client.get_state()
+
+
+def op_call(client, method, route, payload=None):
+    return client.request(method, route, payload)
+
+
+def print_report(report: dict):
+    for result in report["results"]:
+        outcome = "skipped" if result["skipped"] else "ok" if result["ok"] else "FAILED"
+        detail = json.dumps(result["result"]) if result["ok"] else result["error"]
+        print(f'{result["host"]:<24} {outcome:<8} {result["latency_ms"]:9.1f} ms  {detail}')
+
+    latency = report["latency_ms"]
+    print(f'{report["ok"]}/{report["hosts"]} ok, {report["failed"]} failed, {report["skipped"]} skipped | '
+          f'latency min {latency["min"]:.1f} p50 {latency["p50"]:.1f} p95 {latency["p95"]:.1f} max {latency["max"]:.1f} ms | '
+          f'wall {report["wall_ms"]:.1f} ms')
+
+
+def read_hosts(hosts: str, hosts_file: str) -> list:
+    result = [host for host in (hosts or '').split(',') if host.strip()]
+    if hosts_file:
+        for line in Path(hosts_file).read_text().splitlines():
+            line = line.split('#', 1)[0].strip()
+            if line:
+                result.append(line)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run one mvpy REST operation on many servers at once')
+    parser.add_argument('--hosts', help=f'Comma separated host[:port] list (default port: {DEFAULT_PORT})')
+    parser.add_argument('--hosts-file', help='File with one host[:port] per line, # starts a comment')
+    parser.add_argument('--parallel', help=f'Hosts served at the same time (default: {DEFAULT_PARALLEL})', type=int, default=DEFAULT_PARALLEL)
+    parser.add_argument('--timeout', help=f'Per host request timeout in seconds (default: {DEFAULT_TIMEOUT})', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--json', help='Print the report as JSON', action='store_true')
+    operations = parser.add_subparsers(dest='operation', required=True)
+
+    operations.add_parser('get_state', help='Graph state of every host')
+    operations.add_parser('terminate', help='Terminate the graph of every host')
+
+    upload_run = operations.add_parser('upload_run', help='Upload and run a graph, skipped on hosts that run the same graph already')
+    upload_run.add_argument('graph', help='Graph file, either in XML, JSON or TXT format')
+    upload_run.add_argument('params', nargs='*', help='cli_params of the graph (example: NUM=1 PORT=5555)')
+
+    set_filter_param = operations.add_parser('set_filter_param', help='Set a filter parameter on every host')
+    set_filter_param.add_argument('unique_name')
+    set_filter_param.add_argument('param_name')
+    set_filter_param.add_argument('param_value')
+
+    call = operations.add_parser('call', help='Any other REST route')
+    call.add_argument('method', choices=['GET', 'POST', 'DELETE'])
+    call.add_argument('route', help='e.g. /graph/get_filters')
+    call.add_argument('--body', help='JSON request body')
+
+    arguments = parser.parse_args()
+    hosts = read_hosts(arguments.hosts, arguments.hosts_file)
+    if not hosts:
+        print("No hosts given, use --hosts or --hosts-file")
+        sys.exit(1)
+
+    fleet = Fleet(hosts, arguments.parallel, arguments.timeout)
+    if arguments.operation == 'upload_run':
+        try:
+            cli_params = dict(param.split('=', 1) for param in arguments.params)
+        except ValueError:
+            raise argparse.ArgumentTypeError("Parsing CLI parameters failed (example usage: \"NUM=1 PORT=5555\")")
+        report = fleet.run(op_upload_run, graph_upload(arguments.graph, cli_params))
+    elif arguments.operation == 'set_filter_param':
+        report = fleet.run(op_set_filter_param, arguments.unique_name, arguments.param_name, arguments.param_value)
+    elif arguments.operation == 'call':
+        report = fleet.run(op_call, arguments.method, arguments.route, json.loads(arguments.body) if arguments.body else None)
+    else:
+        report = fleet.run({'get_state': op_get_state, 'terminate': op_terminate}[arguments.operation])
+    fleet.close()
+
+    if arguments.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    sys.exit(0 if report["failed"] == 0 else 1)
@@ -1,27 +1,44 @@
+import time
+STARTED = time.perf_counter()  # Before any other import, for --startup-profile
+
 import sys
+import hashlib
 import signal
 import threading
 import argparse
 import logging
 import MvxGraph
-from datetime import datetime
+from param_cache import ParamCache
+from filter_catalog import FilterCatalog
+from graph_events import GraphEvents
+from metrics import Metrics
+from native_trace import NativeTrace
+from contextlib import nullcontext
+from native_dispatcher import NativeDispatcher
+from server_logging import setup_logging, RequestLogSampler
+from startup_profile import StartupProfile
+from response_encoding import NegotiatingJSONProvider, ResponseCompressor, is_binary, DEFAULT_MIN_SIZE
 from typing import List
 from pathlib import Path
-from flask import Flask, request, abort, jsonify
+from flask import Flask, Response, request, abort, jsonify, g
 
 sys.path.append(r".")
-from graph_parser.graph_parser import GraphParser
+from graph_parser.plan_cache import PlanCache
 
 
 DEFAULT_LIB_PATH = str(Path.cwd())
 DEFAULT_MEMPOOL  = 1000
 DEFAULT_PORT     = "7500"
 
+logger = logging.getLogger('mvpy_rest_server')
+
 
 class NucRestRunner():
     UPLOAD_FOLDER = r'C:\RingTeam\openmv4d\mvpy\uploads'
     LOGS_FOLDER   = r"./mvpy_logs/"
     ALLOWED_EXTENSIONS = {'txt', 'xml', 'json'}
+    PRELOAD_OPEN_ROUTES = {'/graph/events', '/graph/get_state'}  # Answered while the graph preloads
+    PRELOAD_GATED_ROUTES = {'/set_cli_params'}  # Change the loaded graph outside /graph/, answer 503 while it preloads
 
     api_name_lut = {
         "setagent"           : "empty",
@@ -42,54 +59,126 @@ class NucRestRunner():
         "cleanall"           : "destroy_graph"
     }
 
-    def __init__(self, mvgraphapi_plugins_path, memory_pool_frequency, port, local_graph=None, cli_params={}):
+    def __init__(self, mvgraphapi_plugins_path, memory_pool_frequency, port, local_graph=None, cli_params={}, plan_cache_dir=None, trace_capacity=0,
+                 log_level=logging.DEBUG, log_sample_rate=1.0, log_max_bytes=10 * 1024 * 1024, log_name='MVPY_REST_SERVER', max_graphs=0,
+                 isolate_core=False, core_call_timeout=None, compress_min_size=DEFAULT_MIN_SIZE, snapshot_file=None, restore_snapshot=False,
+                 startup_profile=None, graph_timeout=None, upload_folder=None):
+        # Modules only some options need (multiprocessing, asyncio, the graph parsers) are imported where they are used,
+        # and the native library is loaded on the dispatcher thread, so the port is bound without waiting for either
+        self.startup_profile    = startup_profile
         self.app = Flask(__name__)
         self.app.secret_key               = 'super secret key'
-        self.app.config['UPLOAD_FOLDER']  = self.UPLOAD_FOLDER
+        self.app.config['UPLOAD_FOLDER']  = upload_folder or self.UPLOAD_FOLDER
+        self.app.json           = NegotiatingJSONProvider(self.app)
         self.app.json.sort_keys = False
         self.app_port           = port
 
+        with self.startup_phase('logging'):
+            Path(self.LOGS_FOLDER).mkdir(parents=True, exist_ok=True)
+            setup_logging(Path(self.LOGS_FOLDER).joinpath(f'{log_name}.log'), level=log_level, max_bytes=log_max_bytes)
+        self.log_sampler        = RequestLogSampler(default_rate=log_sample_rate)
+        self.log_name           = log_name
+
         self.build_path         = mvgraphapi_plugins_path
         self.mempool            = memory_pool_frequency
-        self._graph_core        = MvxGraph.MvxGraphCoreWrapper(self.build_path, self.mempool)
+        self.metrics            = Metrics()
+        self.native_trace       = NativeTrace(trace_capacity) if trace_capacity and not isolate_core else None
+        self.isolate_core       = isolate_core
+        self.core_call_timeout  = core_call_timeout
+        self.core_process       = None
+        self._graph_core        = NativeDispatcher(None, observer=self.metrics.observe_native, init=self.init_core)
         self.graph_commands     = {}
         self.filters_dict       = {}
         self.attached_filters   = {}
         self.play_mode          = None
         self.current_graph      = None
+        self.graph_source_hash  = None
+        self.graph_template     = None
         self.local_graph        = local_graph
         self.cli_params         = cli_params
+        self.param_cache        = ParamCache()
+        self.filter_catalog     = FilterCatalog(self._graph_core)
+        self.param_overrides    = {}
+        self.plan_cache         = PlanCache(cache_dir=plan_cache_dir)
+        self.graph_events       = GraphEvents(self._graph_core.get_graph_state)
+        self.graph_snapshot     = None
+        self.graph_pool         = None
+
+        if snapshot_file:
+            from graph_snapshot import GraphSnapshot
+            self.graph_snapshot = GraphSnapshot(snapshot_file, self.snapshot_state)
+        if max_graphs:
+            from graph_pool import GraphPool, REQUEST_TIMEOUT
+            self.graph_pool = GraphPool(self.build_path, self.mempool, max_graphs,
+                                        runner_kwargs={"plan_cache_dir": plan_cache_dir, "trace_capacity": trace_capacity,
+                                                       "log_level": log_level, "log_sample_rate": log_sample_rate,
+                                                       "log_max_bytes": log_max_bytes, "compress_min_size": compress_min_size},
+                                        request_timeout=REQUEST_TIMEOUT if graph_timeout is None else (graph_timeout or None))
+
+        self.metrics.gauge('mvpy_graph_state', 'Current graph state, 1 for the active one.', self.graph_state_gauge, label='state')
+        self.metrics.gauge('mvpy_graph_filters', 'Filters created for the loaded graph.', lambda: len(self.filters_dict))
+        self.metrics.gauge('mvpy_graph_attached_filters', 'Filters attached to the graph.', lambda: len(self.attached_filters))
+
+        if isolate_core:
+            if trace_capacity:
+                logger.warning('Native tracing is not available with an isolated core')
+            self.metrics.gauge('mvpy_core_restarts_total', 'Restarts of the isolated MvxGraphCore process.',
+                               lambda: self.core_process.restarts if self.core_process else 0, metric_type='counter')
+            self.metrics.gauge('mvpy_core_recovery_seconds', 'Time from the last core process failure until its graph was restored.',
+                               lambda: (self.core_process.last_recovery_time if self.core_process else None) or 0.0)
 
-        Path(self.UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
-        Path(self.LOGS_FOLDER).mkdir(parents=True, exist_ok=True)
-        log_file = Path(self.LOGS_FOLDER).joinpath(rf'MVPY_REST_SERVER_{datetime.now().strftime("%d-%m-%Y_%I-%M-%S%p")}.log')
-        logging.basicConfig(filename=str(log_file), level=logging.DEBUG)
         signal.signal(signal.SIGINT, self.signal_handler)
 
-        if local_graph and Path(local_graph).exists():
-            self.current_graph = Path(local_graph)
-            try:
-                self.graph_commands = self.load_graph_from_file(self.current_graph, self.cli_params)
-                self.invoke_graph_commands(self.graph_commands)
-                self._graph_core.build_graph()
-            except Exception as e:
-                print(str(e) + '  build_current_graph failed')
-                sys.exit(1)
+        # The filter catalog and --restore / --graph are built on a thread of their own, graph routes answer 503 until it is done
+        self.graph_ready        = threading.Event()
+        self.preload_error      = None
+        self.preload_time       = None
+        if not local_graph and not (restore_snapshot and self.graph_snapshot is not None):
+            self.graph_ready.set()
+        threading.Thread(target=self.preload_graph, args=(local_graph, restore_snapshot), name='mvpy_graph_preload', daemon=True).start()
 
 ################# REST API Functions ####################################
 #########################################################################
 
+        # Registered first, after_request functions run in reverse order so the body is compressed last
+        self.app.after_request(ResponseCompressor(min_size=compress_min_size))
+
+        @self.app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter()
+
+        @self.app.before_request
+        def wait_for_preload():
+            if self.graph_ready.is_set() or request.path in self.PRELOAD_OPEN_ROUTES:
+                return None
+            if request.path.startswith('/graph/') or request.path in self.PRELOAD_GATED_ROUTES:
+                response = jsonify("The graph is still being preloaded, see /ready")
+                response.headers['Retry-After'] = '1'
+                return response, 503
+
         @self.app.after_request
-        def response_processor(response):
-            if request.form:
-                logging.log(logging.DEBUG, 'Request Body: %s', request.form)
-            else:
-                logging.log(logging.DEBUG, 'Request Body: %s', request.get_data(as_text=True))
+        def observe_request(response):
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            self.metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - g.request_started)
+            return response
 
-            @response.call_on_close
-            def process_after_request():
-                logging.log(logging.DEBUG, 'Response Body: %s', response.get_data(as_text=True))
+        @self.app.after_request
+        def save_snapshot(response):
+            if self.graph_snapshot is not None and request.method != "GET" and response.status_code < 400:
+                self.graph_snapshot.request_save()
+            return response
 
+        @self.app.after_request
+        def response_processor(response):
+            route = request.url_rule.rule if request.url_rule else request.path
+            if response.is_streamed or not logger.isEnabledFor(logging.DEBUG) or not self.log_sampler.sample(route):
+                return response
+
+            request_body = request.form if request.form else request.get_data(as_text=True)
+            response_body = f'<{response.content_length} bytes {response.mimetype}>' if is_binary(response) \
+                else response.get_data(as_text=True).rstrip("\n")
+            logger.debug('%s %s %s Request Body: %s Response Body: %s', request.method, request.path, response.status_code,
+                         self.log_sampler.cap(str(request_body)), self.log_sampler.cap(response_body))
             return response
 
         @self.app.route('/')
@@ -100,6 +189,11 @@ class NucRestRunner():
         def get_server_status():
             return jsonify('OK'), 200
 
+        @self.app.route('/ready', methods=["GET"])
+        def get_ready():
+            readiness, status = self.readiness()
+            return jsonify(readiness), status
+
         @self.app.route('/get_cli_params', methods=["GET"])
         def get_cli_params():
             return jsonify(self.cli_params), 200
@@ -110,6 +204,17 @@ class NucRestRunner():
                 abort(500, description="Request not in the right Format")
 
             req = request.get_json()
+            if 'cli_params' not in req:
+                abort(500, description="Request not in the right Format")
+
+            if self.graph_commands and self.current_graph:  # Re-render the loaded graph with the new cli_params
+                try:
+                    self.graph_commands = self.render_loaded_graph(req['cli_params'])
+                except KeyError as e:  # A placeholder of the graph without a value
+                    return jsonify(str(e.args[0]) + '  set_cli_params failed'), 400
+                except Exception as e:
+                    abort(500, description=str(e) + '  set_cli_params failed')
+
             self.cli_params = req['cli_params']
             return jsonify(self.cli_params), 200
 
@@ -148,14 +253,24 @@ class NucRestRunner():
         @self.app.route('/graph/upload_run', methods=["POST"])
         def upload_run():
             try:
-                if not self.r_destroy_graph():
-                    raise ValueError
+                previous_commands = self.graph_commands if self.is_graph_running() else None
                 upload_graph()
-                build_run_graph()
+
+                update_path = "incremental" if self.update_graph(previous_commands) else "rebuild"
+                if update_path == "rebuild":
+                    graph_commands = self.graph_commands
+                    if not self.r_destroy_graph():
+                        raise ValueError
+                    self.graph_commands = graph_commands
+                    build_run_graph()
+                elif self.get_state() != MvxGraph.GraphState.PLAYING:
+                    run_current_graph()
             except Exception as e:
                 abort(500, description=str(e) + '  upload_graph_run failed')
 
-            return jsonify(self.filters_dict), 200
+            response = jsonify(self.filters_dict)
+            response.headers['X-Graph-Update'] = update_path
+            return response, 200
 
         @self.app.route('/graph/build_run', methods=["POST"])
         def build_run_graph():
@@ -169,8 +284,7 @@ class NucRestRunner():
 
             return jsonify(self.filters_dict), 200
 
-        @self.app.route('/graph/build_remote', methods=["POST"])
-        def build_remote_graph():
+        def load_remote_graph():
             if not request.is_json:
                 abort(500, description="Request not in the right Format")
 
@@ -186,6 +300,10 @@ class NucRestRunner():
             except Exception as e:
                 abort(500, description=str(e) + '  build_remote_graph failed')
 
+        @self.app.route('/graph/build_remote', methods=["POST"])
+        def build_remote_graph():
+            load_remote_graph()
+
             try:
                 if not build_current_graph():
                     raise ValueError
@@ -196,29 +314,41 @@ class NucRestRunner():
 
         @self.app.route('/graph/build_run_remote', methods=["POST"])
         def build_run_remote():
-            if not self.r_destroy_graph():
-                raise ValueError
-
-            build_remote_graph()
+            previous_commands = self.graph_commands if self.is_graph_running() else None
+            load_remote_graph()
 
             try:
-                if not run_current_graph():
+                update_path = "incremental" if self.update_graph(previous_commands) else "rebuild"
+                if update_path == "rebuild":
+                    graph_commands = self.graph_commands
+                    if not self.r_destroy_graph():
+                        raise ValueError
+                    self.graph_commands = graph_commands
+                    if not build_current_graph():
+                        raise ValueError
+                if self.get_state() != MvxGraph.GraphState.PLAYING and not run_current_graph():
                     raise ValueError
             except Exception as e:
                 abort(500, description=str(e) + '  build_run_remote failed')
 
-            return jsonify(self.filters_dict), 200
+            response = jsonify(self.filters_dict)
+            response.headers['X-Graph-Update'] = update_path
+            return response, 200
 
         @self.app.route('/graph/build', methods=["POST"])
         def build_current_graph():
             if not self.graph_commands:
                 return jsonify("No graph is loaded"), 404
+            self.param_overrides = {}
             try:
                 self.invoke_graph_commands(self.graph_commands)
                 self._graph_core.build_graph()
             except Exception as e:
                 abort(500, description=str(e) + '  build_current_graph failed')
 
+            self.preload_error = None  # A graph built since replaces the one that failed to preload
+            self.graph_events.publish("build", self.filters_dict)
+
             return jsonify(self.filters_dict), 200
 
         @self.app.route('/graph/stop', methods=["POST"])
@@ -254,13 +384,22 @@ class NucRestRunner():
                 return jsonify("No graph is build"), 400
 
             try:
-                threading.Thread(target=self._graph_core.play_graph, args=[int(self.play_mode), ]).start()
+                if self.isolate_core:  # The core process answers one call at a time anyway
+                    self._graph_core.submit('play_graph', int(self.play_mode))
+                else:  # play_graph can block, queued calls (get_state, stop) are answered meanwhile
+                    threading.Thread(target=self._graph_core.call_unqueued, args=['play_graph', int(self.play_mode), ]).start()
 
             except Exception as e:
                 abort(500, description=str(e) + '  run_graph failed')
 
             return jsonify("Graph is now running"), 200
 
+        @self.app.route('/graph/source', methods=["GET"])
+        def get_graph_source():
+            if not self.graph_commands or self.current_graph is None:
+                return jsonify("No graph is loaded!"), 404
+            return jsonify({"file": Path(self.current_graph).name, "sha256": self.graph_source_hash, "cli_params": self.cli_params}), 200
+
         @self.app.route('/graph/get_state', methods=["GET"])
         def get_graph_state():
             return jsonify(self._graph_core.get_graph_state().name)
@@ -285,6 +424,7 @@ class NucRestRunner():
             if request.is_json:
                 req = request.get_json()
                 self.play_mode = req['play_mode']
+                self.graph_events.publish("play_mode", self.play_mode)
             else:
                 abort(500, description="Request not in the right Format")
             return jsonify(self.play_mode), 200
@@ -316,8 +456,10 @@ class NucRestRunner():
                 return jsonify(f"No Filter '{req['unique_name']}' was found!"), 404
 
             try:
-                filter_id = self.filters_dict[req['unique_name']]
-                return jsonify(self._graph_core.get_filter_parameter(filter_id, str(req['param_name']))), 200
+                filter_id  = self.filters_dict[req['unique_name']]
+                param_name = str(req['param_name'])
+                return jsonify(self.param_cache.get(filter_id, param_name,
+                                                    lambda: self._graph_core.get_filter_parameter(filter_id, param_name))), 200
             except Exception as e:
                 return abort(500, description=str(e) + '  get_parameter failed')
 
@@ -335,19 +477,50 @@ class NucRestRunner():
                 abort(500, description="Request not in the right Format")
 
             try:
-                filter_id = self.filters_dict[req['unique_name']]
-                self._graph_core.set_filter_parameter(filter_id, req['param_name'], req['param_value'])
-                return jsonify(self._graph_core.get_filter_parameter(filter_id, str(req['param_name']))), 200
+                filter_id  = self.filters_dict[req['unique_name']]
+                param_name = str(req['param_name'])
+                self._graph_core.set_filter_parameter(filter_id, param_name, req['param_value'])
+                self.param_cache.invalidate(filter_id, param_name)
+                self.record_override(req['unique_name'], param_name, req['param_value'])
+                param_value = self._graph_core.get_filter_parameter(filter_id, param_name)
+                self.param_cache.update(filter_id, param_name, param_value)
+                return jsonify(param_value), 200
             except Exception as e:
                 return abort(500, description=str(e) + '  get_parameter failed')
 
+        @self.app.route('/graph/set_filter_params', methods=["POST"])
+        def set_filter_params():
+            if not request.is_json:
+                abort(500, description="Request not in the right Format")
+
+            req = request.get_json()
+
+            if not isinstance(req.get('params', None), list):
+                abort(500, description="Request not in the right Format")
+
+            if not self.is_graph_running():
+                return jsonify("No graph is loaded!"), 404
+
+            try:
+                return jsonify(self.r_set_filter_parameters(req['params'], bool(req.get('read_back', True)))), 200
+            except Exception as e:
+                return abort(500, description=str(e) + '  set_filter_params failed')
+
         @self.app.route('/graph/set_params', methods=["POST"])
         def set_params():
             if not self.is_graph_running():
                 return jsonify("No graph is loaded!"), 404
 
-            upload_graph()
-            self.invoke_graph_commands(self.graph_commands, mode="SET")
+            # The parameters file replaces the loaded graph only while it is applied
+            loaded_graph = self.current_graph, self.graph_commands, self.cli_params, self.graph_source_hash, self.graph_template
+            try:
+                upload_graph()
+                self.invoke_graph_commands(self.graph_commands, mode="SET")
+                for line in self.graph_commands:
+                    if str(line['COMMAND']).lower() == "setparams":
+                        self.record_override(*line['ARGS'][:3])
+            finally:
+                self.current_graph, self.graph_commands, self.cli_params, self.graph_source_hash, self.graph_template = loaded_graph
 
             return jsonify("Set params successfully"), 200
 
@@ -367,10 +540,177 @@ class NucRestRunner():
             if not req['unique_name'] in self.filters_dict:
                 return jsonify(f"No Filter '{req['unique_name']}' was found!"), 404
             try:
-                return jsonify(self._graph_core.get_filter_parameters(self.filters_dict[req['unique_name']])), 200
+                filter_id = self.filters_dict[req['unique_name']]
+                return jsonify(self.param_cache.get(filter_id, None,
+                                                    lambda: self._graph_core.get_filter_parameters(filter_id))), 200
             except Exception as e:
                 return abort(500, description=str(e) + '  get_params failed')
 
+        @self.app.route('/graph/get_all_params', methods=["GET"])
+        def get_all_params():
+            if not self.is_graph_running():
+                return jsonify("No graph is loaded!"), 404
+
+            return jsonify(self.r_get_all_parameters()), 200
+
+        @self.app.route('/graph/param_cache', methods=["GET"])
+        def get_param_cache():
+            return jsonify(self.param_cache.stats()), 200
+
+        @self.app.route('/graph/param_cache', methods=["POST"])
+        def set_param_cache():
+            if not request.is_json:
+                abort(500, description="Request not in the right Format")
+
+            req = request.get_json()
+
+            if not isinstance(req.get('volatile_params', None), dict):
+                abort(500, description="Request not in the right Format")
+
+            try:
+                self.param_cache.set_volatile_params({str(k): float(v) for k, v in req['volatile_params'].items()})
+            except (TypeError, ValueError):
+                abort(500, description="Request not in the right Format")
+
+            return jsonify(self.param_cache.stats()), 200
+
+        @self.app.route('/graph/plan_cache', methods=["GET"])
+        def get_plan_cache():
+            return jsonify(self.plan_cache.stats()), 200
+
+        @self.app.route('/graph/snapshot', methods=["GET"])
+        def get_graph_snapshot():
+            if self.graph_snapshot is None:
+                return jsonify("Snapshots are disabled, start the server with --snapshot"), 404
+            return jsonify(self.graph_snapshot.stats()), 200
+
+        @self.app.route('/filters', methods=["GET"])
+        def get_filters():
+            # ?name= or ?guid= resolves a single filter, through the catalog
+            if 'name' in request.args or 'guid' in request.args:
+                if 'name' in request.args:
+                    name, guid = request.args['name'], self.filter_catalog.guid_of(request.args['name'])
+                else:
+                    name, guid = self.filter_catalog.name_of(request.args['guid']), request.args['guid']
+                if name is None or guid is None:
+                    return jsonify("Unknown filter"), 404
+                return jsonify({"name": name, "guid": guid}), 200
+            return jsonify({"filters": self.filter_catalog.filters(), **self.filter_catalog.stats()}), 200
+
+        @self.app.route('/filters/refresh', methods=["POST"])
+        def refresh_filters():
+            try:
+                filters = self.r_get_available_filters()
+            except Exception as e:
+                abort(500, description=str(e) + '  refresh_filters failed')
+            return jsonify({"filters": filters, **self.filter_catalog.stats()}), 200
+
+        @self.app.route('/native/dispatcher', methods=["GET"])
+        def get_native_dispatcher():
+            return jsonify(self._graph_core.stats()), 200
+
+        @self.app.route('/native/core', methods=["GET"])
+        def get_native_core():
+            if self.core_process is None:
+                return jsonify("The core is not isolated, start the server with --isolate-core"), 404
+            return jsonify(self.core_process.stats()), 200
+
+        @self.app.route('/graph/events', methods=["GET"])
+        def get_graph_events():
+            return Response(self.graph_events.stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+        @self.app.route('/metrics', methods=["GET"])
+        def get_metrics():
+            return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+        @self.app.route('/debug/trace', methods=["GET"])
+        def get_trace():
+            if self.native_trace is None:
+                return jsonify("Tracing is disabled, start the server with --trace"), 404
+            return jsonify(self.native_trace.export()), 200
+
+        @self.app.route('/debug/trace', methods=["DELETE"])
+        def clear_trace():
+            if self.native_trace is None:
+                return jsonify("Tracing is disabled, start the server with --trace"), 404
+            self.native_trace.clear()
+            return jsonify("Trace cleared"), 200
+
+        @self.app.route('/log_sampling', methods=["GET"])
+        def get_log_sampling():
+            return jsonify(self.log_sampler.stats()), 200
+
+        @self.app.route('/log_sampling', methods=["POST"])
+        def set_log_sampling():
+            if not request.is_json:
+                abort(500, description="Request not in the right Format")
+
+            req = request.get_json()
+            try:
+                if 'default_rate' in req:
+                    self.log_sampler.default_rate = float(req['default_rate'])
+                if 'max_body' in req:
+                    self.log_sampler.max_body = int(req['max_body'])
+                self.log_sampler.set_rates(req.get('route_rates', {}))
+            except Exception as e:
+                abort(500, description=str(e) + '  set_log_sampling failed')
+
+            return jsonify(self.log_sampler.stats()), 200
+
+        @self.app.route('/graphs', methods=["GET"])
+        def get_graphs():
+            if self.graph_pool is None:
+                return jsonify("Graph pool is disabled, start the server with --max-graphs"), 404
+            return jsonify(self.graph_pool.stats()), 200
+
+        @self.app.route('/graphs/<graph_id>', methods=["POST"])
+        def create_graph(graph_id):
+            if self.graph_pool is None:
+                return jsonify("Graph pool is disabled, start the server with --max-graphs"), 404
+
+            from graph_pool import GraphPoolFull, valid_graph_id
+            if not valid_graph_id(graph_id):
+                return jsonify(f"Invalid graph id {graph_id}, use letters, digits, '_', '-' and '.'"), 400
+            try:
+                worker_stats = self.graph_pool.create(graph_id)
+            except ValueError as e:
+                return jsonify(str(e)), 409
+            except GraphPoolFull as e:
+                return jsonify(str(e)), 503
+            except Exception as e:
+                abort(500, description=str(e) + '  create_graph failed')
+
+            return jsonify(worker_stats), 200
+
+        @self.app.route('/graphs/<graph_id>', methods=["DELETE"])
+        def delete_graph(graph_id):
+            if self.graph_pool is None or graph_id not in self.graph_pool:
+                return jsonify(f"No graph {graph_id}"), 404
+            try:
+                worker_stats = self.graph_pool.destroy(graph_id)
+            except KeyError:
+                return jsonify(f"No graph {graph_id}"), 404
+
+            return jsonify(worker_stats), 200
+
+        @self.app.route('/graphs/<graph_id>/<path:route>', methods=["GET", "POST", "DELETE"])
+        def graph_request(graph_id, route):
+            if self.graph_pool is None or graph_id not in self.graph_pool:
+                return jsonify(f"No graph {graph_id}"), 404
+
+            from graph_pool import GraphWorkerError, UNFORWARDED_ROUTES
+            if route.strip('/') in UNFORWARDED_ROUTES:
+                return jsonify(f"/{route} is not served for pool graphs"), 404
+            try:
+                status, headers, body = self.graph_pool.request(graph_id, request.method, route, request.query_string,
+                                                                request.get_data(), request.content_type, request.headers.get('Accept'))
+            except KeyError:
+                return jsonify(f"No graph {graph_id}"), 404
+            except GraphWorkerError as e:
+                abort(500, description=str(e))
+
+            return Response(body, status=status, headers=headers)
+
         @self.app.route('/shutdown', methods=["POST"])
         def shutdown():
             self.shutdown_server()
@@ -393,35 +733,268 @@ class NucRestRunner():
             return False
 
     def load_graph_from_file(self, graph, cli_params):
-        name    = Path(graph).stem
         suffix  = Path(graph).suffix[1:]
 
-        return GraphParser(str(graph), str(Path(graph).with_name(f"{name}_from_{suffix}.txt")), cli_params)()
+        with open(graph, 'rb') as f:
+            source_data = f.read()
+        self.graph_source_hash = hashlib.sha256(source_data).hexdigest()
 
-    def invoke_graph_commands(self, graph_commands, mode="BUILD"):
-        for line in graph_commands:
-            command = str(line['COMMAND']).lower()
+        plan_key = PlanCache.key(source_data, suffix, cli_params)
+        template_key = PlanCache.key(source_data, suffix)
+        graph_commands = self.plan_cache.get(plan_key)
+        # Kept for render_loaded_graph(), None after a cached plan whose template was not compiled in this process
+        self.graph_template = self.plan_cache.get_template(template_key)
 
-            if command == "setmemorypool" or command == "setagent":  # Currently not supported
-                continue
+        if graph_commands is None:
+            if self.graph_template is None:
+                from graph_parser.graph_parser import GraphTemplate
+                self.graph_template = GraphTemplate.from_file(str(graph))
+                self.plan_cache.put_template(template_key, self.graph_template)
 
-            if command == "rungraph":  # only extract play_mode
-                self.play_mode = line['ARGS'][1]
-                continue
+            graph_commands = self.graph_template.render(cli_params)
+            self.plan_cache.put(plan_key, graph_commands)
+
+        return graph_commands
 
-            if mode == "SET":
-                if command != "setparams":
+    def render_loaded_graph(self, cli_params):
+        # The loaded graph's commands for other cli_params, rendered from its template without reading the file again.
+        # Raises KeyError when a placeholder of the graph has no value in cli_params
+        if self.graph_template is None:
+            from graph_parser.graph_parser import GraphTemplate
+            self.graph_template = GraphTemplate.from_file(str(self.current_graph))
+        return self.graph_template.render(cli_params)
+
+    def invoke_graph_commands(self, graph_commands, mode="BUILD"):
+        if mode == "BUILD":
+            # Fails before any filter is created, instead of midway through the build
+            errors = self.filter_catalog.validate(graph_commands, self.api_name_lut)
+            if errors:
+                raise ValueError('Invalid graph: ' + '; '.join(errors))
+            self.param_cache.clear()
+
+        with self.trace_span("invoke_graph_commands", mode=mode, commands=len(graph_commands)):
+            for line in graph_commands:
+                command = str(line['COMMAND']).lower()
+
+                if command == "setmemorypool" or command == "setagent":  # Currently not supported
+                    continue
+
+                if command == "rungraph":  # only extract play_mode
+                    if self.play_mode != line['ARGS'][1]:
+                        self.play_mode = line['ARGS'][1]
+                        self.graph_events.publish("play_mode", self.play_mode)
                     continue
 
-            # Run each TXT command line by line
-            method_to_call = getattr(self, f"r_{self.api_name_lut[command]}")
-            method_to_call(line['ARGS'])
+                if mode == "SET":
+                    if command != "setparams":
+                        continue
+
+                # Run each TXT command line by line
+                method_to_call = getattr(self, f"r_{self.api_name_lut[command]}")
+                with self.trace_span(line['COMMAND'], args=line['ARGS']):
+                    method_to_call(line['ARGS'])
+
+    def trace_span(self, name, **args):
+        if self.native_trace is None:
+            return nullcontext()
+        return self.native_trace.span(name, **args)
+
+    def startup_phase(self, name):
+        if self.startup_profile is None:
+            return nullcontext()
+        return self.startup_profile.phase(name)
+
+    def init_core(self):
+        # Runs first on the dispatcher thread, native calls queue behind it
+        with self.startup_phase('native init'):
+            if not self.isolate_core:
+                return MvxGraph.MvxGraphCoreWrapper(self.build_path, self.mempool, tracer=self.native_trace)
+
+            from core_process import CoreProcess
+            self.core_process = CoreProcess(self.build_path, self.mempool, call_timeout=self.core_call_timeout,
+                                            log_file=Path(self.LOGS_FOLDER).joinpath(f'{self.log_name}_CORE.log'),
+                                            on_restart=self.restore_graph)
+            # Restart (and the graph replay) runs on the dispatcher thread, in order with every other native call
+            self.core_process.on_crash = lambda: self._graph_core.submit('restart')
+            return self.core_process
+
+    @staticmethod
+    def diff_graph_commands(previous_commands, graph_commands):
+        """
+        Returns the setParams commands of graph_commands that differ from previous_commands,
+        or None when anything else changed (filters, attachments, play mode or removed parameters).
+        """
+        def split(commands):
+            topology = []
+            params = {}
+            for line in commands:
+                command = str(line['COMMAND']).lower()
+                if command == "setparams":
+                    params[tuple(line['ARGS'][:2])] = line
+                elif command not in ("setmemorypool", "setagent", "getparams"):
+                    topology.append((command, list(line['ARGS'])))
+            return topology, params
+
+        previous_topology, previous_params = split(previous_commands)
+        topology, params = split(graph_commands)
+
+        if topology != previous_topology or not previous_params.keys() <= params.keys():
+            return None
+
+        return [line for key, line in params.items()
+                if key not in previous_params or line['ARGS'] != previous_params[key]['ARGS']]
+
+    def update_graph(self, previous_commands) -> bool:
+        # Apply only the parameters that changed against the running graph, False when a rebuild is needed
+        if not previous_commands:
+            return False
+
+        changed_params = self.diff_graph_commands(previous_commands, self.graph_commands)
+        if changed_params is None:
+            return False
+
+        # Parameters set at runtime go back to the file's value as a rebuild would, the ones the file does not set need one
+        file_params = {(str(line['ARGS'][0]), str(line['ARGS'][1])): line for line in self.graph_commands
+                       if str(line['COMMAND']).lower() == "setparams" and len(line['ARGS']) >= 2}
+        overridden = {(unique_name, param_name) for unique_name, params in self.param_overrides.items() for param_name in params}
+        if not overridden <= file_params.keys():
+            return False
+        changed_keys = {(str(line['ARGS'][0]), str(line['ARGS'][1])) for line in changed_params}
+        changed_params += [file_params[key] for key in sorted(overridden - changed_keys)]
+
+        for line in changed_params:
+            if not self.r_set_filter_parameter(line['ARGS']):
+                return False
+            self.param_overrides.get(str(line['ARGS'][0]), {}).pop(str(line['ARGS'][1]), None)
+
+        logger.info(f'Graph updated in place, {len(changed_params)} parameters changed')
+        self.graph_events.publish("update", [line['ARGS'] for line in changed_params])
+        return True
+
+    def restore_graph(self, graph_state: MvxGraph.GraphState, graph_commands=None, play_mode=None, param_overrides=None):
+        # Rebuilds the graph in graph_state with the parameters set since it was loaded, called on the dispatcher thread
+        # once the isolated core process restarted, or at startup from a snapshot (which passes the saved graph instead)
+        graph_commands  = self.graph_commands if graph_commands is None else graph_commands
+        play_mode       = self.play_mode if play_mode is None else play_mode
+        param_overrides = self.param_overrides if param_overrides is None else param_overrides
+        if graph_state == MvxGraph.GraphState.NOT_BUILT or not graph_commands:
+            return
+
+        self.filters_dict     = {}
+        self.attached_filters = {}
+        self.invoke_graph_commands(graph_commands)
+        self.play_mode = play_mode
+        self._graph_core.build_graph()
+
+        for unique_name, params in param_overrides.items():
+            for param_name, param_value in params.items():
+                self.r_set_filter_parameter([unique_name, param_name, param_value])
+
+        if graph_state in (MvxGraph.GraphState.PLAYING, MvxGraph.GraphState.PAUSED):
+            self._graph_core.play_graph(int(self.play_mode))
+        if graph_state == MvxGraph.GraphState.PAUSED:
+            self._graph_core.pause_graph()
+
+        self.graph_events.publish("restore", graph_state.name)
+
+    def record_override(self, unique_name: str, param_name: str, param_value):
+        # Parameters set on the running graph, re-applied whenever it is restored
+        self.param_overrides.setdefault(str(unique_name), {})[str(param_name)] = str(param_value)
+
+    def snapshot_state(self) -> dict:
+        return {
+            "graph"           : str(self.current_graph) if self.current_graph is not None else None,
+            "sha256"          : self.graph_source_hash,
+            "cli_params"      : self.cli_params,
+            "play_mode"       : self.play_mode,
+            "graph_state"     : self.get_state().name,
+            "graph_commands"  : list(self.graph_commands or []),
+            "param_overrides" : self.param_overrides,
+        }
+
+    def preload_graph(self, local_graph, restore_snapshot):
+        # Failures are reported by /ready (and logged), the server keeps serving so a fixed graph can be uploaded
+        # The catalog resolves filters on first use as well, a failed refresh does not keep the graph from loading
+        try:
+            with self.startup_phase('filter catalog'):
+                self.filter_catalog.refresh()
+        except Exception as e:
+            logger.error(str(e) + '  filter catalog refresh failed')
+
+        started = time.perf_counter()
+        try:
+            with self.startup_phase('graph preload'):
+                if restore_snapshot and self.graph_snapshot is not None:
+                    try:
+                        if self.restore_from_snapshot():
+                            return
+                    except Exception as e:
+                        if not local_graph:
+                            raise
+                        logger.warning(f'{e}  restoring the snapshot failed, loading {local_graph} instead')
+                if not local_graph:
+                    return
+                if not Path(local_graph).exists():
+                    raise ValueError(f'Graph file {local_graph} does not exist')
+
+                self.current_graph = Path(local_graph)
+                self.graph_commands = self.load_graph_from_file(self.current_graph, self.cli_params)
+                self.invoke_graph_commands(self.graph_commands)
+                self._graph_core.build_graph()
+                self.graph_events.publish("build", self.filters_dict)
+        except Exception as e:
+            self.preload_error = str(e) + '  preload_graph failed'
+            logger.error(self.preload_error)
+        finally:
+            self.preload_time = time.perf_counter() - started
+            self.graph_ready.set()
+
+    def readiness(self) -> tuple:
+        if self._graph_core.init_error is not None:
+            return {"ready": False, "error": str(self._graph_core.init_error) + '  native init failed'}, 500
+        if not self._graph_core.ready.is_set():
+            return {"ready": False, "waiting_for": "native init"}, 503
+        if not self.graph_ready.is_set():
+            return {"ready": False, "waiting_for": "graph preload"}, 503
+        if self.preload_error is not None:
+            return {"ready": False, "error": self.preload_error}, 500
+        return {"ready": True, "graph": str(self.current_graph) if self.current_graph else None, "preload_time": self.preload_time}, 200
+
+    def restore_from_snapshot(self) -> bool:
+        # Rebuilds the graph saved in the snapshot without parsing its file, False when there is none to restore.
+        # The runner only takes the saved graph over once it is built, a failed restore raises and leaves no graph loaded
+        state = self.graph_snapshot.load()
+        if not state or not state["graph_commands"]:
+            return False
+
+        started = time.perf_counter()
+        try:
+            self.restore_graph(MvxGraph.GraphState[state["graph_state"]], state["graph_commands"], state["play_mode"], state["param_overrides"])
+        except Exception as e:
+            logger.error(str(e) + '  restore_from_snapshot failed')
+            self.r_destroy_graph()
+            raise
+
+        self.current_graph     = state["graph"]
+        self.graph_source_hash = state["sha256"]
+        self.graph_template    = None
+        self.cli_params        = state["cli_params"]
+        self.play_mode         = state["play_mode"]
+        self.graph_commands    = state["graph_commands"]
+        self.param_overrides   = state["param_overrides"]
+        logger.info(f'Graph restored from {self.graph_snapshot.snapshot_file} in {time.perf_counter() - started:.3f} seconds')
+        return True
 
     def get_state(self) -> MvxGraph.GraphState:
         state_enum = self._graph_core.get_graph_state()
         return MvxGraph.GraphState(state_enum)
 
+    def graph_state_gauge(self) -> dict:
+        current_state = self.get_state()
+        return {state.name: int(state == current_state) for state in MvxGraph.GraphState}
+
     def save_graph_locally(self, file_data):
+        Path(self.current_graph).parent.mkdir(parents=True, exist_ok=True)
         if type(file_data).__name__ == "FileStorage":
             file_data.save(self.current_graph)
 
@@ -434,14 +1007,27 @@ class NucRestRunner():
         return True
 
     def signal_handler(self, sig, frame):
-        print('You pressed Ctrl+C!')
+        logger.info('You pressed Ctrl+C!')
         if self.is_graph_running():
             self.r_destroy_graph(None)
+        if self.graph_pool is not None:
+            self.graph_pool.close()
+        if self.core_process is not None:
+            self.core_process.close()
 
         sys.exit(-1)
 
-    def run_server(self):
-        self.app.run(host="0.0.0.0", port=int(self.app_port), debug=False)
+    def run_server(self, serve_mode="flask"):
+        if serve_mode == "asyncio":
+            from async_server import AsyncRestServer
+            server = AsyncRestServer(self.app, "0.0.0.0", self.app_port)
+            if self.startup_profile is not None:
+                self.startup_profile.mark_when(server.started, 'listening')
+            server.run()
+        else:
+            if self.startup_profile is not None:
+                self.startup_profile.mark('listening')
+            self.app.run(host="0.0.0.0", port=int(self.app_port), debug=False)
 
     def shutdown_server(self):
         func = request.environ.get('werkzeug.server.shutdown')
@@ -455,15 +1041,15 @@ class NucRestRunner():
     def empty(self, args: List[str] = None):
         pass
 
-    def r_get_available_filters(self, args: List[str] = None):
-        self._graph_core.get_available_filters()
+    def r_get_available_filters(self, args: List[str] = None) -> dict:
+        return self.filter_catalog.refresh()
 
     def r_create_filter_from_name(self, args: List[str]) -> bool:
         try:
             id = self._graph_core.create_filter_from_name(args[0])
             self.filters_dict[args[1]] = id
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
         return True
@@ -473,7 +1059,7 @@ class NucRestRunner():
             id = self._graph_core.create_filter_from_guid(args[0], args[1])
             self.filters_dict[args[1]] = id
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
         return True
@@ -482,7 +1068,7 @@ class NucRestRunner():
         try:
             self._graph_core.create_graph()
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
         return True
@@ -491,9 +1077,9 @@ class NucRestRunner():
         try:
             self._graph_core.stop_graph()
 
-            print('Graph is stopped')
+            logger.info('Graph is stopped')
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
         return True
@@ -502,9 +1088,9 @@ class NucRestRunner():
         try:
             self._graph_core.pause_graph()
 
-            print('Graph is paused')
+            logger.info('Graph is paused')
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
         return True
@@ -513,18 +1099,20 @@ class NucRestRunner():
         try:
             self._graph_core.resume_graph()
 
-            print('Graph is resused')
+            logger.info('Graph is resused')
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
         return True
 
     def r_destroy_graph(self, args: List[str] = None) -> bool:
         try:
-            self.filters_dict   = {}
-            self.graph_commands = {}
-            self.play_mode      = None
+            self.filters_dict    = {}
+            self.graph_commands  = {}
+            self.play_mode       = None
+            self.param_overrides = {}
+            self.param_cache.clear()
 
             if self._graph_core.get_graph_state() == MvxGraph.GraphState.NOT_BUILT:
                 return True
@@ -532,16 +1120,19 @@ class NucRestRunner():
             self._graph_core.stop_graph()
             self._graph_core.destroy_graph()
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
 
+        self.graph_events.publish("teardown")
+
         return True
 
     def r_destroy_filter(self, args: List[str]) -> int:
         try:
+            self.param_cache.clear()
             ret_code = self._graph_core.destroy_filter(args[0])
         except Exception as e:
-            print(e)
+            logger.error(e)
             return -1
 
         return ret_code
@@ -549,17 +1140,67 @@ class NucRestRunner():
     def r_set_filter_parameter(self, args: List[str]):
         try:
             self._graph_core.set_filter_parameter(self.filters_dict[args[0]], args[1], args[2])
+            self.param_cache.invalidate(self.filters_dict[args[0]], args[1])
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
         return True
 
+    def r_set_filter_parameters(self, params: List, read_back: bool = True) -> List[dict]:
+        results = [None] * len(params)
+        entries = []
+        indices = []
+
+        for n, param in enumerate(params):
+            if isinstance(param, dict):
+                param = [param.get('unique_name'), param.get('param_name'), param.get('param_value')]
+
+            if not isinstance(param, (list, tuple)) or len(param) != 3 or None in param:
+                results[n] = {"error": "Entry not in the right Format"}
+                continue
+
+            unique_name, param_name, param_value = param
+            results[n] = {"unique_name": unique_name, "param_name": param_name}
+
+            if unique_name not in self.filters_dict:
+                results[n]["error"] = f"No Filter '{unique_name}' was found!"
+                continue
+
+            entries.append((self.filters_dict[unique_name], str(param_name), param_value))
+            indices.append(n)
+
+        for n, entry, (value, error) in zip(indices, entries, self._graph_core.set_filter_parameters(entries, read_back)):
+            if error is None:
+                self.record_override(results[n]["unique_name"], entry[1], entry[2])
+
+            if error is None and read_back:
+                self.param_cache.update(entry[0], entry[1], value)
+            else:
+                self.param_cache.invalidate(entry[0], entry[1])
+
+            if error is None:
+                results[n]["param_value"] = value
+            else:
+                results[n]["error"] = error
+
+        return results
+
+    def r_get_all_parameters(self) -> dict:
+        # {unique_name: {param_name: typed value}} of every filter, a failing filter reports {"error": ...}
+        results = {}
+        for unique_name, filter_id in list(self.filters_dict.items()):
+            try:
+                results[unique_name] = self.param_cache.get_parsed(filter_id, lambda: self._graph_core.get_filter_parameters(filter_id))
+            except Exception as e:
+                results[unique_name] = {"error": str(e)}
+        return results
+
     def r_get_filter_parameter(self, args: List[str]) -> str:
         try:
 
             res = self._graph_core.get_filter_parameter(self.filters_dict[args[0]], args[1])
         except Exception as e:
-            print(e)
+            logger.error(e)
             return ""
 
         return res
@@ -569,13 +1210,14 @@ class NucRestRunner():
             self._graph_core.add_filter_to_graph(self.filters_dict[args[1]])
             self.attached_filters[args[1]] = self.filters_dict[args[1]]
         except Exception as e:
-            print(e)
+            logger.error(e)
             return False
         return True
 
 
 if __name__ == "__main__":
     global args
+    imported = time.perf_counter()
     parser = argparse.ArgumentParser(
         description='MvxGraph demo',
         epilog='This demo loads and runs a simple XML graph in forward once mode,and waits until completion'
@@ -608,6 +1250,97 @@ if __name__ == "__main__":
         type=int,
         required=False
     )
+    parser.add_argument(
+        '--plan-cache',
+        help='Directory to persist parsed graph plans in, reused across restarts (default: in memory only)',
+        required=False
+    )
+    parser.add_argument(
+        '--serve',
+        help='Serving mode, the Flask development server or the asyncio server (default: flask)',
+        choices=['flask', 'asyncio'],
+        default='flask',
+        required=False
+    )
+    parser.add_argument(
+        '--trace',
+        help='Record the last TRACE native calls for /debug/trace (default: 0, disabled)',
+        type=int,
+        default=0,
+        required=False
+    )
+    parser.add_argument(
+        '--log-level',
+        help='Level of the log file, DEBUG logs request/response bodies (default: DEBUG)',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+        default='DEBUG',
+        required=False
+    )
+    parser.add_argument(
+        '--log-sample',
+        help='Share of requests whose bodies are logged at DEBUG, for routes without their own rate (default: 1.0)',
+        type=float,
+        default=1.0,
+        required=False
+    )
+    parser.add_argument(
+        '--log-max-size',
+        help='Size in MB at which the log file is rotated, 5 backups are kept (default: 10)',
+        type=int,
+        default=10,
+        required=False
+    )
+    parser.add_argument(
+        '--max-graphs',
+        help='Allow up to N more graphs, each in a worker process of its own, under /graphs/<id>/ (default: 0, disabled)',
+        type=int,
+        default=0,
+        required=False
+    )
+    parser.add_argument(
+        '--graph-timeout',
+        help='With --max-graphs, kill a graph worker that does not answer a request in this many seconds, 0 waits forever (default: 300)',
+        type=float,
+        default=None,
+        required=False
+    )
+    parser.add_argument(
+        '--isolate-core',
+        help='Run MvxGraphCore in a supervised child process, restarted (and its graph rebuilt) when it crashes',
+        action='store_true',
+        required=False
+    )
+    parser.add_argument(
+        '--core-timeout',
+        help='With --isolate-core, restart the core process when a native call takes longer than this many seconds (default: no limit)',
+        type=float,
+        default=None,
+        required=False
+    )
+    parser.add_argument(
+        '--compress-min-size',
+        help=f'Smallest response body in bytes compressed for clients sending Accept-Encoding gzip or deflate (default: {DEFAULT_MIN_SIZE})',
+        type=int,
+        default=DEFAULT_MIN_SIZE,
+        required=False
+    )
+    parser.add_argument(
+        '--snapshot',
+        help='File to save the loaded graph and its parameter changes to, after every change',
+        required=False
+    )
+    parser.add_argument(
+        '--restore',
+        help='At startup, rebuild the graph saved in --snapshot (without parsing its file) instead of --graph',
+        action='store_true',
+        required=False
+    )
+    parser.add_argument(
+        '--startup-profile',
+        help='Print how long each startup phase took, once the server listens and the native library is loaded',
+        action='store_true',
+        required=False
+    )
     parser.add_argument('params', nargs='*')
     args = parser.parse_args()
     arguments = vars(args)
@@ -622,6 +1355,10 @@ if __name__ == "__main__":
             print("Graph file not in the right format [xml | json | txt]")
             sys.exit(1)
 
+    if arguments['restore'] and not arguments['snapshot']:
+        print("--restore requires --snapshot")
+        sys.exit(1)
+
     if arguments['lib']:
         lib_path = arguments['lib']
         if not Path(lib_path).exists() or Path(lib_path).stat().st_size == 0:
@@ -646,5 +1383,17 @@ if __name__ == "__main__":
         except Exception:
             raise argparse.ArgumentTypeError("Parsing CLI parameters failed (example usage: \"NUM=1 PORT=5555\")")
 
-    nrg = NucRestRunner(lib_path, mempool, port, arguments['graph'], cli_params)
-    nrg.run_server()
+    startup_profile = None
+    if arguments['startup_profile']:
+        startup_profile = StartupProfile(STARTED)
+        startup_profile.record('imports', STARTED, imported - STARTED)
+
+    with startup_profile.phase('server init') if startup_profile is not None else nullcontext():
+        nrg = NucRestRunner(lib_path, mempool, port, arguments['graph'], cli_params, arguments['plan_cache'], arguments['trace'],
+                            getattr(logging, arguments['log_level']), arguments['log_sample'], arguments['log_max_size'] * 1024 * 1024,
+                            max_graphs=arguments['max_graphs'], isolate_core=arguments['isolate_core'], core_call_timeout=arguments['core_timeout'],
+                            compress_min_size=arguments['compress_min_size'], snapshot_file=arguments['snapshot'],
+                            restore_snapshot=arguments['restore'], startup_profile=startup_profile, graph_timeout=arguments['graph_timeout'])
+    if startup_profile is not None:
+        startup_profile.report_when_done(nrg._graph_core.ready, nrg.graph_ready)
+    nrg.run_server(arguments['serve'])
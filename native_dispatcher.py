@@ -0,0 +1,182 @@
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Calls without side effects, identical ones waiting in the queue together share a single native call
+READ_ONLY_CALLS = {
+    'get_available_filters',
+    'get_filter_guid_by_name',
+    'get_filter_name_by_guid',
+    'get_last_error',
+    'get_graph_state',
+    'get_filter_parameter',
+    'get_filter_parameters',
+    'graph_source_info',
+}
+
+
+class _NativeCall():
+    __slots__ = ('name', 'args', 'kwargs', 'key', 'detached', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, name, args, kwargs, key, detached=False):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.detached = detached
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class NativeDispatcher():
+    """
+    Serializes every call into the (process wide singleton) MvxGraphCore on one dispatcher thread.
+    Exposes the MvxGraphCoreWrapper methods unchanged, a call blocks until the dispatcher ran it.
+    observer(name, seconds, failed) is told about every call once it ran.
+    With graph_core=None, init() creates it on the dispatcher thread before any call runs, so the caller does not wait
+    for the native library to load. Calls queue up meanwhile, if init() fails every call raises its error.
+    """
+    def __init__(self, graph_core, observer=None, init=None):
+        self._graph_core    = graph_core
+        self._observer      = observer
+        self._init          = init
+        self.init_error     = None
+        self.init_time      = None
+        self.ready          = threading.Event()
+        self._queue         = deque()
+        self._pending       = {}
+        self._cond          = threading.Condition()
+        self.calls          = 0
+        self.coalesced      = 0
+        self.max_queue_depth = 0
+        self.total_wait     = 0.0
+        self.max_wait       = 0.0
+
+        if graph_core is not None:
+            self.ready.set()
+        self._thread = threading.Thread(target=self._run, name='mvpy_native_dispatcher', daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._graph_core is not None:
+            attribute = getattr(self._graph_core, name)
+            if not callable(attribute):
+                return attribute
+
+        def dispatch(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        return dispatch
+
+    def call(self, name, *args, **kwargs):
+        if threading.current_thread() is self._thread:
+            return self._invoke(name, args, kwargs)
+
+        native_call = self._enqueue(name, args, kwargs)
+        native_call.done.wait()
+
+        if native_call.error is not None:
+            raise native_call.error
+        return native_call.result
+
+    def submit(self, name, *args, **kwargs):
+        # Queue a call without waiting for it, failures are only printed
+        self._enqueue(name, args, kwargs, detached=True)
+
+    def call_unqueued(self, name, *args, **kwargs):
+        # Run a call on the calling thread, next to the queued ones, for calls that block (play_graph)
+        # and must not hold every other call behind them. Only for a core that takes concurrent calls
+        self.ready.wait()
+        return self._invoke(name, args, kwargs)
+
+    def _enqueue(self, name, args, kwargs, detached=False):
+        key = None
+        if not detached and name in READ_ONLY_CALLS:
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                key = None
+
+        with self._cond:
+            native_call = self._pending.get(key) if key is not None else None
+            if native_call is not None:
+                self.coalesced += 1
+                return native_call
+
+            native_call = _NativeCall(name, args, kwargs, key, detached)
+            self._queue.append(native_call)
+            if key is not None:
+                self._pending[key] = native_call
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify()
+            return native_call
+
+    def _run(self):
+        if self._init is not None:
+            started = time.perf_counter()
+            try:
+                self._graph_core = self._init()
+            except Exception as e:
+                self.init_error = e
+                logger.error(e)
+            finally:
+                self.init_time = time.perf_counter() - started
+                self.ready.set()
+
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                native_call = self._queue.popleft()
+                if native_call.key is not None:
+                    del self._pending[native_call.key]
+
+                wait = time.monotonic() - native_call.enqueued
+                self.calls += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+            try:
+                native_call.result = self._invoke(native_call.name, native_call.args, native_call.kwargs)
+            except Exception as e:
+                native_call.error = e
+                if native_call.detached:
+                    logger.error(e)
+            finally:
+                native_call.done.set()
+
+    def _invoke(self, name, args, kwargs):
+        if self.init_error is not None:
+            raise self.init_error
+        if self._observer is None:
+            return getattr(self._graph_core, name)(*args, **kwargs)
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = getattr(self._graph_core, name)(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._observer(name, time.perf_counter() - started, failed)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue_depth"     : len(self._queue),
+                "max_queue_depth" : self.max_queue_depth,
+                "calls"           : self.calls,
+                "coalesced"       : self.coalesced,
+                "avg_wait_ms"     : (self.total_wait / self.calls * 1e3) if self.calls else 0.0,
+                "max_wait_ms"     : self.max_wait * 1e3,
+                "ready"           : self.ready.is_set(),
+                "init_ms"         : self.init_time * 1e3 if self.init_time is not None else None,
+                "init_error"      : str(self.init_error) if self.init_error is not None else None,
+            }
@@ -0,0 +1,89 @@
+import os
+import time
+import threading
+from collections import deque
+
+
+class NativeTrace():
+    """
+    Bounded ring buffer of native MvxGraphCore calls (and optional server spans), exported as Chrome trace-event JSON.
+    Load the export in chrome://tracing or https://ui.perfetto.dev to see where a build spends its time.
+    """
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._events = deque(maxlen=capacity)
+        self._thread_names = {}
+        self._pid = os.getpid()
+
+    def wrap(self, symbol_name: str, ctypes_wrapper):
+        # Returns a callable recording every call of ctypes_wrapper as a complete ("X") event
+        record = self._record
+
+        def traced(*args):
+            begin = time.perf_counter_ns()
+            rc = None
+            try:
+                rc = ctypes_wrapper(*args)
+                return rc
+            finally:
+                record(symbol_name, 'native', begin, time.perf_counter_ns(), args, rc)
+        return traced
+
+    def span(self, name: str, **args):
+        return _Span(self, name, args)
+
+    def _record(self, name, category, begin, end, args, result=None):
+        thread_id = threading.get_native_id()
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        # Buffers and pointers are mutated or freed after the call, only keep plain values
+        args = tuple(arg if isinstance(arg, (int, float, str)) else
+                     arg.decode('ascii', 'replace') if isinstance(arg, bytes) else
+                     type(arg).__name__ for arg in args)
+        self._events.append((name, category, begin, end, thread_id, args, result))
+
+    def clear(self):
+        self._events.clear()
+
+    def __len__(self):
+        return len(self._events)
+
+    def export(self) -> dict:
+        events = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": thread_id, "args": {"name": thread_name}}
+                  for thread_id, thread_name in list(self._thread_names.items())]
+
+        for name, category, begin, end, thread_id, args, result in list(self._events):
+            event_args = {f"arg{index}": arg for index, arg in enumerate(args)}
+            if result is not None:
+                event_args["rc"] = result
+            events.append({
+                "name" : name,
+                "cat"  : category,
+                "ph"   : "X",
+                "ts"   : begin / 1e3,
+                "dur"  : (end - begin) / 1e3,
+                "pid"  : self._pid,
+                "tid"  : thread_id,
+                "args" : event_args,
+            })
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class _Span():
+    __slots__ = ('_trace', '_name', '_args', '_begin')
+
+    def __init__(self, trace, name, args):
+        self._trace = trace
+        self._name = name
+        self._args = args
+        self._begin = None
+
+    def __enter__(self):
+        self._begin = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._trace._record(self._name, 'server', self._begin, time.perf_counter_ns(),
+                            tuple(f'{key}={value}' for key, value in self._args.items()))
+        return False
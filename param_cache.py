@@ -0,0 +1,131 @@
+import re
+import threading
+import time
+
+_PARAM_SEPARATORS = re.compile(r'[;\r\n]+')
+_INT_VALUE        = re.compile(r'[+-]?\d+')
+_FLOAT_VALUE      = re.compile(r'[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?')
+
+
+def parse_param_value(value: str):
+    # "True"/"False" to bool, integers and decimals to numbers, anything else stays a string
+    if value in ('True', 'False'):
+        return value == 'True'
+    if _INT_VALUE.fullmatch(value):
+        return int(value)
+    if _FLOAT_VALUE.fullmatch(value):
+        return float(value)
+    return value
+
+
+def parse_filter_parameters(dump: str) -> dict:
+    # GetFilterParameters dump ("name=value;name=value") to {name: typed value}
+    params = {}
+    for entry in _PARAM_SEPARATORS.split(dump or ''):
+        name, separator, value = entry.partition('=')
+        if separator and name.strip():
+            params[name.strip()] = parse_param_value(value.strip())
+    return params
+
+
+class ParamCache:
+    """
+    Filter parameter values keyed by (filter instance id, parameter name).
+    A parameter name of None holds the whole GetFilterParameters dump of a filter.
+
+    get_parsed() memoizes the parsed dump of each filter until the dump changes.
+
+    volatile_params maps names of parameters the core changes at runtime to a TTL in seconds,
+    a TTL of 0 never caches the parameter. Any other parameter is kept until written or cleared.
+    A value loaded while the same parameter was written (or the cache cleared) is returned but not kept.
+    """
+    def __init__(self, volatile_params: dict = None):
+        self._lock            = threading.Lock()
+        self._values          = {}
+        self._parsed          = {}
+        self._generations     = {}
+        self._epoch           = 0
+        self.volatile_params  = dict(volatile_params or {})
+        self.hits             = 0
+        self.misses           = 0
+        self.parses           = 0
+
+    def _ttl(self, param_name):
+        if param_name is None:  # A dump holds the volatile parameters as well
+            return min(self.volatile_params.values(), default=None)
+        return self.volatile_params.get(param_name, None)
+
+    def get(self, filter_id: int, param_name, loader):
+        key = (filter_id, param_name)
+        ttl = self._ttl(param_name)
+
+        with self._lock:
+            entry = self._values.get(key) if ttl != 0 else None
+            if entry is not None and (ttl is None or time.monotonic() - entry[1] < ttl):
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(key, 0))
+
+        value = loader()
+
+        if ttl != 0:
+            with self._lock:
+                # Written (or cleared) while loading, the loaded value may predate the write
+                if generation == (self._epoch, self._generations.get(key, 0)):
+                    self._values[key] = (value, time.monotonic())
+        return value
+
+    def get_parsed(self, filter_id: int, loader) -> dict:
+        dump = self.get(filter_id, None, loader)
+
+        with self._lock:
+            entry = self._parsed.get(filter_id)
+            if entry is not None and entry[0] == dump:
+                return entry[1]
+
+        parsed = parse_filter_parameters(dump)
+        with self._lock:
+            self._parsed[filter_id] = (dump, parsed)
+            self.parses += 1
+        return parsed
+
+    def _bump(self, filter_id: int, param_name: str):
+        for key in ((filter_id, None), (filter_id, param_name)):
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def update(self, filter_id: int, param_name: str, value: str):
+        with self._lock:
+            self._bump(filter_id, param_name)
+            self._values.pop((filter_id, None), None)
+            if self._ttl(param_name) != 0:
+                self._values[(filter_id, param_name)] = (value, time.monotonic())
+
+    def invalidate(self, filter_id: int, param_name: str):
+        with self._lock:
+            self._bump(filter_id, param_name)
+            self._values.pop((filter_id, None), None)
+            self._values.pop((filter_id, param_name), None)
+
+    def clear(self):
+        with self._lock:
+            self._values      = {}
+            self._parsed      = {}
+            self._generations = {}
+            self._epoch      += 1
+
+    def set_volatile_params(self, volatile_params: dict):
+        with self._lock:
+            self.volatile_params = dict(volatile_params)
+            self._values = {}
+            self._epoch += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits"            : self.hits,
+                "misses"          : self.misses,
+                "parses"          : self.parses,
+                "size"            : len(self._values),
+                "volatile_params" : self.volatile_params
+            }
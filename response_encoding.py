@@ -0,0 +1,93 @@
+import zlib
+import gzip
+from flask import request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import msgpack
+except ImportError:  # Optional, MessagePack is not offered
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # Optional, CBOR is not offered
+    cbor2 = None
+
+JSON_MIMETYPE          = 'application/json'
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_MIN_SIZE       = 1024
+
+
+def _msgpack_dumps(obj, default) -> bytes:
+    return msgpack.packb(obj, default=default, use_bin_type=True)
+
+
+def _cbor_dumps(obj, default) -> bytes:
+    return cbor2.dumps(obj, default=lambda encoder, value: encoder.encode(default(value)))
+
+
+# mimetype -> dumps(obj, default), only the installed encoders are negotiated
+BINARY_ENCODERS = {}
+if msgpack is not None:
+    BINARY_ENCODERS['application/msgpack'] = _msgpack_dumps
+    BINARY_ENCODERS['application/x-msgpack'] = _msgpack_dumps
+if cbor2 is not None:
+    BINARY_ENCODERS['application/cbor'] = _cbor_dumps
+
+COMPRESSORS = {
+    'gzip'    : lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+    'deflate' : lambda data, level: zlib.compress(data, level),
+}
+
+
+def binary_mimetype():
+    # Binary encoding the current request prefers over JSON, or None
+    if not BINARY_ENCODERS or not has_request_context():
+        return None
+    mimetype = request.accept_mimetypes.best_match([JSON_MIMETYPE, *BINARY_ENCODERS])
+    return mimetype if mimetype in BINARY_ENCODERS else None
+
+
+def is_binary(response) -> bool:
+    return response.mimetype in BINARY_ENCODERS or 'Content-Encoding' in response.headers
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() answers with MessagePack or CBOR when the request Accept header prefers it over JSON.
+    The same objects are encoded (unsupported types go through the JSON provider default), JSON stays the default.
+    """
+    def response(self, *args, **kwargs):
+        mimetype = binary_mimetype()
+        if mimetype is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(BINARY_ENCODERS[mimetype](obj, self.default), mimetype=mimetype)
+
+
+class ResponseCompressor():
+    """
+    Compresses response bodies of at least min_size bytes with gzip or deflate, as chosen by Accept-Encoding.
+    Streamed responses (server sent events) are never compressed.
+    """
+    def __init__(self, min_size: int = DEFAULT_MIN_SIZE, level: int = DEFAULT_COMPRESS_LEVEL):
+        self.min_size = min_size
+        self.level = level
+
+    def __call__(self, response):
+        if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(list(COMPRESSORS))
+        if encoding is None or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(COMPRESSORS[encoding](data, self.level))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,93 @@
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(threadName)s: %(message)s'
+
+# High frequency routes, only this share of their requests have their bodies logged by default
+DEFAULT_ROUTE_SAMPLE_RATES = {
+    '/graph/get_state'        : 0.01,
+    '/graph/get_filter_param' : 0.01,
+    '/graph/set_filter_param' : 0.01,
+    '/graph/set_filter_params': 0.01,
+    '/graph/get_params'       : 0.01,
+    '/graph/set_params'       : 0.01,
+    '/metrics'                : 0.0,
+}
+
+_listener = None
+_queue_handler = None
+
+
+def stop_logging():
+    # Flushes the records still queued and closes the log file
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def setup_logging(log_file, level=logging.DEBUG, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                  console_level=logging.INFO):
+    """
+    Routes every log record through a queue to a background thread, which writes them to a size rotated
+    log_file (and console_level and above to the console), so logging never blocks a request on disk I/O.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(min(level, console_level))
+    file_handler.setLevel(level)
+    return _listener
+
+
+class RequestLogSampler():
+    """
+    Decides which requests get their bodies logged, per route, and caps the logged body size.
+    """
+    def __init__(self, default_rate: float = 1.0, route_rates: dict = None, max_body: int = 2048):
+        self.default_rate = default_rate
+        self.route_rates = dict(DEFAULT_ROUTE_SAMPLE_RATES if route_rates is None else route_rates)
+        self.max_body = max_body
+
+    def set_rates(self, route_rates: dict):
+        for route, rate in route_rates.items():
+            self.route_rates[route] = min(max(float(rate), 0.0), 1.0)
+
+    def sample(self, route: str) -> bool:
+        rate = self.route_rates.get(route, self.default_rate)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def cap(self, body) -> str:
+        if body is None:
+            return ''
+        if len(body) > self.max_body:
+            return f'{body[:self.max_body]}... ({len(body)} characters)'
+        return body
+
+    def stats(self) -> dict:
+        return {"default_rate": self.default_rate, "route_rates": self.route_rates, "max_body": self.max_body}
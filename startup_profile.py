@@ -0,0 +1,67 @@
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StartupProfile():
+    """
+    Wall clock breakdown of the server startup, phases may run on other threads (native init runs on the dispatcher thread).
+    Offsets are relative to `started`, pass the time.perf_counter() taken first thing in the process.
+    report_when_done() prints the breakdown once the server listens and every phase (and event) it waits for has ended.
+    """
+    def __init__(self, started: float = None):
+        self.started = started if started is not None else time.perf_counter()
+        self._phases = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        with self._cond:
+            self._open += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._phases.append((name, threading.current_thread().name, started - self.started, time.perf_counter() - started))
+                self._open -= 1
+                self._cond.notify_all()
+
+    def mark(self, name: str):
+        # A point in time rather than a phase, e.g. the port is bound
+        self.record(name, time.perf_counter(), 0.0)
+
+    def record(self, name: str, started: float, seconds: float):
+        with self._cond:
+            self._phases.append((name, threading.current_thread().name, started - self.started, seconds))
+            self._cond.notify_all()
+
+    def mark_when(self, event: threading.Event, name: str):
+        def wait_and_mark():
+            event.wait()
+            self.mark(name)
+        threading.Thread(target=wait_and_mark, name='mvpy_startup_profile', daemon=True).start()
+
+    def phases(self) -> list:
+        with self._cond:
+            return sorted(self._phases, key=lambda phase: phase[2])
+
+    def report(self) -> str:
+        lines = [f"{'phase':<24}{'thread':<26}{'start [ms]':>12}{'took [ms]':>12}"]
+        for name, thread, offset, seconds in self.phases():
+            lines.append(f"{name:<24}{thread:<26}{offset * 1e3:>12.1f}{seconds * 1e3:>12.1f}")
+        return '\n'.join(lines)
+
+    def report_when_done(self, *events, until: str = 'listening', timeout: float = 300.0, stream=None):
+        def wait_and_print():
+            deadline = time.monotonic() + timeout
+            for event in events:
+                event.wait(max(0.0, deadline - time.monotonic()))
+            with self._cond:
+                while (self._open or not any(phase[0] == until for phase in self._phases)) and time.monotonic() < deadline:
+                    self._cond.wait(0.5)
+            print(self.report(), file=stream or sys.stderr, flush=True)
+
+        threading.Thread(target=wait_and_print, name='mvpy_startup_profile', daemon=True).start()
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+sys.path.append(r".")
+from graph_parser.graph_parser import GraphParser, GraphTemplate # noqa
+from graph_parser.xml2txt import xml2txt # noqa
+
+
+def test_graph_parser_in_memory(tmp_path):
+    txt_graph = tmp_path.joinpath("devices_only.txt")
+    xml2txt(str(Path(r"./tests/devices_only.xml")), str(txt_graph))
+
+    commands = GraphParser(str(Path(r"./tests/devices_only.xml")), cli_params={"PORT": "5555"})()
+    assert(commands)
+    assert(commands == GraphParser(str(txt_graph), cli_params={"PORT": "5555"})())
+
+
+def test_graph_parser_output_file(tmp_path):
+    output_file = tmp_path.joinpath("lord_rtmesh_from_json.txt")
+    commands = GraphParser(str(Path(r"./tests/lord_rtmesh.json")), str(output_file), {"PORT": "5555", "LORDIP": "192.168.77.112", "NUM": "1"})()
+
+    assert(commands)
+    assert(output_file.read_text() == Path(r"./tests/lord_rtmesh_from_json.txt").read_text())
+
+
+def test_xml2lines_instance_suffix(tmp_path):
+    xml_graph = tmp_path.joinpath("same_filters.xml")
+    xml_graph.write_text('<genesis version="1.0"><mvxpipeline playmode="3" playspeed="2">' +
+                         '<filter name="FPSAnalyzer"/>' * 3 +
+                         '</mvxpipeline></genesis>')
+
+    commands = GraphParser(str(xml_graph))()
+    created = [line['ARGS'][1] for line in commands if line['COMMAND'] == 'createfilterbyname']
+
+    assert(created == ['fpsanalyzer_1', 'blockfps', 'fpsanalyzer_2', 'fpsanalyzer_3'])
+
+
+def test_graph_template_render():
+    template = GraphTemplate.from_file(str(Path(r"./tests/lord_rtmesh.json")))
+    assert(template.params == {"PORT", "LORDIP", "NUM"})
+
+    for num in ("1", "2"):
+        cli_params = {"PORT": "5555", "LORDIP": "192.168.77.112", "NUM": num}
+        assert(template.render(cli_params) == GraphParser(str(Path(r"./tests/lord_rtmesh.json")), cli_params=cli_params)())
+
+    try:
+        template.render({"PORT": "5555"})
+        assert(False)
+    except KeyError as e:
+        assert("is not specified" in str(e))
@@ -0,0 +1,101 @@
+import sys
+import asyncio
+import pytest
+import threading
+from pathlib import Path
+
+sys.path.append(r".")
+from mvpy_rest_server import NucRestRunner # noqa
+from async_server import AsyncRestServer # noqa
+from mvpy_client import MvpyClient, AsyncMvpyClient, MvpyError # noqa
+
+DEFAULT_LIB_PATH = r".\libc"
+DEFAULT_MEMPOOL  = 1000
+DEFAULT_PORT     = "7500"
+
+GRAPH = str(Path(r"./tests/read_decomp_write.xml").resolve())
+
+
+@pytest.fixture
+def server(pytestconfig):
+    lib = pytestconfig.getoption("lib") or DEFAULT_LIB_PATH
+    nuc_rest_runner = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT)
+    server = AsyncRestServer(nuc_rest_runner.app, "127.0.0.1", 0)
+    threading.Thread(target=server.run, daemon=True).start()
+    assert(server.started.wait(5))
+    yield server
+    nuc_rest_runner.r_destroy_graph()
+
+
+def test_mvpy_client(server):
+    with MvpyClient("127.0.0.1", server.port, timeout=10) as client:
+        assert(client.wait_until_ready(timeout=5)["ready"])
+        assert(client.get_state() == "NOT_BUILT")
+        with pytest.raises(MvpyError) as error:
+            client.terminate()
+        assert(error.value.status == 404)
+
+        client.build_run_remote(GRAPH, {"INPUT": "client.mvx"})
+        assert(client.wait_for_state("PLAYING", timeout=5) == "PLAYING")
+        assert(client.get_cli_params() == {"INPUT": "client.mvx"})
+        assert(client.get_filter_catalog(name="MVX2FileWriter")["name"] == "MVX2FileWriter")
+        assert(list(client.get_filters()) == ["mvx2filereader_1", "#autodecompressor_1", "mvx2filewriter_1"])
+
+        # Same connection for every request
+        connection = client._connection
+        results = client.set_params_batch({"mvx2filewriter_1": {"Write XML": "False", "Enable Recording": "False"}}, batch_size=1)
+        assert([result["param_value"] for result in results] == ["False", "False"])
+        assert(client._connection is connection)
+
+        client.terminate()
+        assert(client.wait_for_state("NOT_BUILT", timeout=5) == "NOT_BUILT")
+
+
+def test_async_mvpy_client(server):
+    async def scenario():
+        async with AsyncMvpyClient("127.0.0.1", server.port, timeout=10) as client:
+            await client.build_run_remote(GRAPH, {"INPUT": "client.mvx"})
+            assert(await client.wait_for_state("PLAYING", timeout=5) == "PLAYING")
+
+            states = await asyncio.gather(*[client.get_state() for _ in range(4)])
+            assert(states == ["PLAYING"] * 4)
+
+            results = await client.set_params_batch([("mvx2filewriter_1", "Write XML", "False")])
+            assert(results[0]["param_value"] == "False")
+            assert("mvpy_http_requests_total" in await client.get_metrics())
+
+            await client.terminate()
+            return await client.get_state()
+
+    assert(asyncio.run(scenario()) == "NOT_BUILT")
+
+
+def test_mvpy_client_retries_idempotent_only():
+    # Answers the first request on every connection, then closes it without answering the next one
+    import socket
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    received = []
+
+    def serve():
+        while True:
+            connection, _ = listener.accept()
+            with connection:
+                for answer in (True, False):
+                    data = connection.recv(65536)
+                    if not data:
+                        break
+                    received.append(data.split(b' ', 1)[0].decode())
+                    if answer:
+                        connection.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 4\r\n\r\n"OK"')
+
+    threading.Thread(target=serve, daemon=True).start()
+    with MvpyClient("127.0.0.1", listener.getsockname()[1], timeout=5) as client:
+        assert(client.server_status() == "OK")
+        assert(client.server_status() == "OK")  # Resent on a new connection
+        assert(received == ["GET", "GET", "GET"])
+        with pytest.raises(ConnectionError):
+            client.build_run()  # Never resent, it may already have run
+        assert(received == ["GET", "GET", "GET", "POST"])
+    listener.close()
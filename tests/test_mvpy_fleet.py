@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import socket
+import pytest
+import subprocess
+from pathlib import Path
+
+sys.path.append(r".")
+from mvpy_fleet import Fleet, graph_upload, op_get_state, op_upload_run, op_terminate # noqa
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def servers(pytestconfig, tmp_path):
+    lib = pytestconfig.getoption("lib") or str(Path.cwd())
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    ports = [free_port(), free_port()]
+    processes = [subprocess.Popen([sys.executable, str(REPO_ROOT.joinpath('mvpy_rest_server.py')), '--lib', lib, '--port', str(port),
+                                   '--serve', serve_mode], cwd=str(tmp_path), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for port, serve_mode in zip(ports, ('asyncio', 'flask'))]
+
+    hosts = [f"127.0.0.1:{port}" for port in ports]
+    fleet = Fleet(hosts, timeout=5)
+    for _ in range(100):
+        if fleet.run(op_get_state)["ok"] == len(hosts):
+            break
+        time.sleep(0.1)
+
+    yield hosts
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_fleet_upload_run(servers):
+    fleet = Fleet(servers, parallel=2, timeout=10)
+    upload = graph_upload(str(REPO_ROOT.joinpath('tests', 'read_decomp_write.xml')), {"INPUT": "fleet.mvx"})
+
+    report = fleet.run(op_upload_run, upload)
+    assert(report["ok"] == 2 and report["skipped"] == 0)
+    assert([result["result"] for result in report["results"]] == ["PLAYING", "PLAYING"])
+
+    report = fleet.run(op_upload_run, upload)
+    assert(report["ok"] == 2 and report["skipped"] == 2)
+
+    report = fleet.run(op_terminate)
+    assert(report["ok"] == 2 and report["skipped"] == 0)
+    assert(fleet.run(op_get_state)["results"][0]["result"] == "NOT_BUILT")
+    fleet.close()
@@ -1,11 +1,26 @@
 
+import os
+import gzip
+import json
 import sys
+import time
+import shutil
+import socket
 import pytest
 import platform
+import threading
+import http.client
 from pathlib import Path
 
 sys.path.append(r".")
 from mvpy_rest_server import NucRestRunner # noqa
+from async_server import AsyncRestServer # noqa
+from native_dispatcher import NativeDispatcher # noqa
+from metrics import Metrics # noqa
+from startup_profile import StartupProfile # noqa
+from param_cache import ParamCache, parse_filter_parameters # noqa
+from filter_catalog import FilterCatalog # noqa
+from graph_parser.plan_cache import PlanCache # noqa
 import MvxGraph # noqa
 
 DEFAULT_LIB_PATH = r".\libc"
@@ -35,6 +50,11 @@ def runner(nuc_rest_runner):
     return nuc_rest_runner.app.test_cli_runner()
 
 
+def stub_core_loaded(core) -> bool:
+    # True with benchmarks/stub_mvx_graph_core.c, whose values some tests check, False with the real MvxGraphCore
+    return hasattr(core._library, "IsStubCore")
+
+
 def test_nuc_rest_runner_init(nuc_rest_runner):
     assert(nuc_rest_runner._graph_core)
 
@@ -66,6 +86,420 @@ def test_nuc_rest_runner_init(nuc_rest_runner):
 #     assert(nuc_rest_runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
 
 
+def test_nuc_rest_runner_plan_cache(nuc_rest_runner):
+    cli_params = {"INPUT": f"{str(Path.cwd())}\\tests\\morning.mvx"}
+
+    commands = nuc_rest_runner.load_graph_from_file(str(Path(r"./tests/read_decomp_write.xml")), cli_params)
+    assert(nuc_rest_runner.plan_cache.stats()["misses"] == 1)
+
+    assert(nuc_rest_runner.load_graph_from_file(str(Path(r"./tests/read_decomp_write.xml")), cli_params) == commands)
+    assert(nuc_rest_runner.plan_cache.stats()["hits"] == 1)
+
+    nuc_rest_runner.load_graph_from_file(str(Path(r"./tests/read_decomp_write.xml")), {"INPUT": "other.mvx"})
+    assert(nuc_rest_runner.plan_cache.stats()["misses"] == 2)
+
+
+def test_plan_cache_disk_eviction(tmp_path):
+    cache = PlanCache(cache_dir=tmp_path, max_disk_entries=2)
+    plan = [{"COMMAND": "createGraph", "ARGS": ["jeffGraph", "b"]}]
+    for n, key in enumerate(["first", "second"]):
+        cache.put(key, plan)
+        os.utime(tmp_path.joinpath(f"{key}.json"), (1000 + n, 1000 + n))
+
+    cache.put("third", plan)  # The least recently used file goes
+    assert(sorted(path.name for path in tmp_path.glob("*.json")) == ["second.json", "third.json"])
+
+
+def test_nuc_rest_runner_set_cli_params(nuc_rest_runner, client, tmp_path):
+    nuc_rest_runner.current_graph = tmp_path.joinpath("read_decomp_write.xml")
+    nuc_rest_runner.current_graph.write_bytes(Path(r"./tests/read_decomp_write.xml").read_bytes())
+    nuc_rest_runner.graph_commands = nuc_rest_runner.load_graph_from_file(nuc_rest_runner.current_graph, {"INPUT": "first.mvx"})
+    nuc_rest_runner.current_graph.unlink()  # Rendered from the kept template, the file is not read again
+
+    response = client.post("/set_cli_params", json={"cli_params": {"INPUT": "second.mvx"}})
+
+    assert(response.status_code == 200)
+    assert(["mvx2filereader_1", "MVX File Path", "second.mvx", "b"] in [line["ARGS"] for line in nuc_rest_runner.graph_commands])
+
+    response = client.post("/set_cli_params", json={"cli_params": {"OUTPUT": "second.mvx"}})
+    assert(response.status_code == 400 and "INPUT" in response.get_data(as_text=True))
+    assert(nuc_rest_runner.cli_params == {"INPUT": "second.mvx"})
+
+
+def test_nuc_rest_runner_incremental_update(nuc_rest_runner, client):
+    nuc_rest_runner.r_destroy_graph()
+    assert(nuc_rest_runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
+
+    graph = str(Path(r"./tests/read_decomp_write.xml"))
+    response = client.post("/graph/build_run_remote", json={"remote_graph": graph, "cli_params": {"INPUT": "first.mvx"}})
+    assert(response.headers["X-Graph-Update"] == "rebuild")
+
+    response = client.post("/graph/build_run_remote", json={"remote_graph": graph, "cli_params": {"INPUT": "second.mvx"}})
+    assert(response.headers["X-Graph-Update"] == "incremental")
+    assert(response.json == nuc_rest_runner.filters_dict)
+
+    # A parameter set at runtime goes back to the file's value when the same graph is uploaded again
+    writer = next(line['ARGS'][0] for line in nuc_rest_runner.graph_commands
+                  if str(line['COMMAND']).lower() == "setparams" and line['ARGS'][1] == "Write XML")
+    response = client.post("/graph/set_filter_param", json={"unique_name": writer, "param_name": "Write XML", "param_value": "False"})
+    assert(response.status_code == 200)
+    assert(nuc_rest_runner.param_overrides == {writer: {"Write XML": "False"}})
+    response = client.post("/graph/build_run_remote", json={"remote_graph": graph, "cli_params": {"INPUT": "second.mvx"}})
+    assert(response.headers["X-Graph-Update"] == "incremental")
+    assert(nuc_rest_runner.param_overrides == {writer: {}})
+
+    changed = nuc_rest_runner.diff_graph_commands(nuc_rest_runner.graph_commands, nuc_rest_runner.graph_commands[:-1])
+    assert(changed is None)
+    nuc_rest_runner.r_destroy_graph()
+
+
+def test_nuc_rest_runner_async_server(nuc_rest_runner):
+    server = AsyncRestServer(nuc_rest_runner.app, "127.0.0.1", 0, max_body_size=1024)
+    threading.Thread(target=server.run, daemon=True).start()
+    assert(server.started.wait(5))
+
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    for path in ("/server_status", "/graph/get_state"):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        assert(response.status == 200)
+        response.read()
+
+    connection.request("POST", "/graph/set_play_mode", body='{"play_mode": "255"}', headers={"Content-Type": "application/json"})
+    assert(connection.getresponse().read() == b'"255"\n')
+
+    # Oversized and malformed bodies are refused before they are read
+    for content_length, status in (("4096", b"413"), ("-5", b"400"), ("abc", b"400"), ("²", b"400"), ("5\r\nContent-Length: 6", b"400")):
+        with socket.create_connection(("127.0.0.1", server.port), timeout=5) as raw:
+            raw.sendall(f"POST /graph/set_play_mode HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode("latin-1"))
+            assert(raw.recv(1024).split(b" ")[1] == status)
+    assert(AsyncRestServer._parse_head(b"GET / HTTP/1.1\r\nX-Tag: a\r\nX-Tag: b\r\n\r\n")[3] == {"x-tag": "a, b"})
+
+    connection.request("POST", "/shutdown")
+    assert(connection.getresponse().status == 200)
+
+
+def test_nuc_rest_runner_graph_events(nuc_rest_runner):
+    server = AsyncRestServer(nuc_rest_runner.app, "127.0.0.1", 0)
+    threading.Thread(target=server.run, daemon=True).start()
+    assert(server.started.wait(5))
+
+    events = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    events.request("GET", "/graph/events")
+    stream = events.getresponse()
+    assert(stream.getheader("Content-Type").startswith("text/event-stream"))
+
+    def read_event():
+        lines = []
+        while not lines or lines[-1]:
+            lines.append(stream.fp.readline().decode().rstrip("\n"))
+        return lines[:-1]
+
+    assert(read_event()[0] == "event: state")
+
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    connection.request("POST", "/graph/set_play_mode", body='{"play_mode": "128"}', headers={"Content-Type": "application/json"})
+    connection.getresponse().read()
+    assert(read_event() == ["event: play_mode", 'data: "128"'])
+    events.close()
+
+    connection.request("POST", "/shutdown")
+    assert(connection.getresponse().status == 200)
+
+
+def test_nuc_rest_runner_metrics(client):
+    client.get("/graph/get_state")
+    client.post("/graph/build")
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert('mvpy_http_requests_total{route="/graph/get_state",method="GET",status="200"} 1' in metrics)
+    assert('mvpy_http_requests_total{route="/graph/build",method="POST",status="404"} 1' in metrics)
+    assert('mvpy_http_request_duration_seconds_count{route="/graph/get_state"} 1' in metrics)
+    assert('mvpy_native_calls_total{symbol="get_graph_state"}' in metrics)
+    assert('mvpy_graph_state{state="NOT_BUILT"} 1' in metrics)
+    assert('mvpy_graph_filters 0' in metrics)
+
+    class FailingCore():
+        def build_graph(self):
+            raise ValueError("no graph")
+
+    metrics = Metrics()
+    dispatcher = NativeDispatcher(FailingCore(), observer=metrics.observe_native)
+    with pytest.raises(ValueError):
+        dispatcher.build_graph()
+    assert('mvpy_native_call_failures_total{symbol="build_graph"} 1' in metrics.render())
+
+
+def test_nuc_rest_runner_trace(pytestconfig):
+    runner = NucRestRunner(pytestconfig.getoption("lib") or DEFAULT_LIB_PATH, DEFAULT_MEMPOOL, DEFAULT_PORT, trace_capacity=1000)
+    client = runner.app.test_client()
+
+    assert(client.delete("/debug/trace").status_code == 200)
+    client.post("/graph/build_remote", json={"remote_graph": str(Path(r"./tests/read_decomp_write.xml")), "cli_params": {"INPUT": "first.mvx"}})
+
+    events = client.get("/debug/trace").json["traceEvents"]
+    names = [event["name"] for event in events if event["ph"] == "X"]
+    assert("invoke_graph_commands" in names)
+    assert("CreateFilterFromName" in names)
+    assert("BuildGraph" in names)
+    runner.r_destroy_graph()
+
+
+def test_nuc_rest_runner_log_sampling(nuc_rest_runner, client):
+    response = client.post("/log_sampling", json={"route_rates": {"/graph/get_state": 0, "/server_status": 1}, "max_body": 8})
+    assert(response.json["route_rates"]["/graph/get_state"] == 0.0)
+
+    sampler = nuc_rest_runner.log_sampler
+    assert(not sampler.sample("/graph/get_state"))
+    assert(sampler.sample("/server_status"))
+    assert(sampler.cap("0123456789") == "01234567... (10 characters)")
+
+
+def test_nuc_rest_runner_response_encoding(pytestconfig):
+    msgpack = pytest.importorskip("msgpack")
+    runner = NucRestRunner(pytestconfig.getoption("lib") or DEFAULT_LIB_PATH, DEFAULT_MEMPOOL, DEFAULT_PORT, compress_min_size=64)
+    client = runner.app.test_client()
+    graph = {"remote_graph": str(Path(r"./tests/read_decomp_write.xml")), "cli_params": {"INPUT": "first.mvx"}}
+
+    response = client.post("/graph/build_remote", json=graph, headers={"Accept": "application/msgpack"})
+    assert(response.mimetype == "application/msgpack")
+    filters_dict = msgpack.unpackb(response.data)
+    assert(filters_dict == runner.filters_dict)
+
+    # JSON stays the default, small bodies are not compressed
+    assert(client.get("/graph/get_state", headers={"Accept": "*/*", "Accept-Encoding": "gzip"}).json == "STOPPED")
+    assert("Content-Encoding" not in client.get("/graph/get_state", headers={"Accept-Encoding": "gzip"}).headers)
+
+    response = client.get("/graph/get_filters", headers={"Accept-Encoding": "gzip, deflate;q=0.5"})
+    assert(response.headers["Content-Encoding"] == "gzip")
+    assert(json.loads(gzip.decompress(response.data)) == filters_dict)
+    assert(response.headers["Vary"] == "Accept-Encoding")
+    runner.r_destroy_graph()
+
+
+def test_nuc_rest_runner_graph_pool(pytestconfig):
+    runner = NucRestRunner(pytestconfig.getoption("lib") or DEFAULT_LIB_PATH, DEFAULT_MEMPOOL, DEFAULT_PORT, max_graphs=1)
+    client = runner.app.test_client()
+
+    assert(client.post("/graphs/first").status_code == 200)
+    assert(client.post("/graphs/second").status_code == 503)
+
+    graph = str(Path(r"./tests/read_decomp_write.xml"))
+    response = client.post("/graphs/first/build_remote", json={"remote_graph": graph, "cli_params": {"INPUT": "first.mvx"}})
+    assert(response.status_code == 200)
+    assert(client.get("/graphs/first/get_state").json == "STOPPED")
+    assert(client.get("/graphs/first/get_cli_params").json == {"INPUT": "first.mvx"})
+    assert(runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
+
+    stats = client.get("/graphs").json["graphs"]["first"]
+    assert(stats["alive"] and stats["requests"] == 3)
+
+    # Uploads land in the graph's own folder
+    source = Path(r"./tests/read_decomp_write.xml").read_text()
+    assert(client.post("/graphs/first/upload", data={"filename": "pool_upload.xml", "file": source, "INPUT": "first.mvx"}).status_code == 200)
+    upload = Path(NucRestRunner.UPLOAD_FOLDER).joinpath("first", "pool_upload.xml")
+    assert(upload.exists())
+    shutil.rmtree(upload.parent)
+    assert(client.post("/graphs/.first").status_code == 400)
+
+    # Not served through a worker, the event stream would never end and /shutdown is this server's
+    for route in ("events", "graph/events", "shutdown"):
+        assert(client.open(f"/graphs/first/{route}", method="POST" if route == "shutdown" else "GET").status_code == 404)
+
+    assert(client.delete("/graphs/first").status_code == 200)
+    assert(client.get("/graphs/first/get_state").status_code == 404)
+
+    # A worker not answering in time is killed and frees its slot, one busy with a request is destroyed without waiting for it
+    assert(client.post("/graphs/first").status_code == 200)
+    runner.graph_pool.request_timeout = 1e-6
+    assert(client.get("/graphs/first/get_state").status_code == 500)
+    assert("first" not in client.get("/graphs").json["graphs"])
+    assert(client.get("/graphs/first/get_state").status_code == 404)
+    runner.graph_pool.request_timeout = 10.0
+
+    assert(client.post("/graphs/first").status_code == 200)
+    runner.graph_pool._get("first").process.kill()  # Exited on its own, found on the next request
+    assert(client.get("/graphs/first/get_state").status_code == 500)
+    assert(client.post("/graphs/second").status_code == 200)
+    assert(client.delete("/graphs/second").status_code == 200)
+
+    assert(client.post("/graphs/first").status_code == 200)
+    worker = runner.graph_pool._get("first")
+    with worker.lock:
+        assert(client.delete("/graphs/first").status_code == 200)
+    assert(not worker.process.is_alive())
+
+
+def test_nuc_rest_runner_isolated_core_restart(pytestconfig):
+    runner = NucRestRunner(pytestconfig.getoption("lib") or DEFAULT_LIB_PATH, DEFAULT_MEMPOOL, DEFAULT_PORT, isolate_core=True)
+    client = runner.app.test_client()
+
+    graph = str(Path(r"./tests/read_decomp_write.xml"))
+    assert(client.post("/graph/build_run_remote", json={"remote_graph": graph, "cli_params": {"INPUT": "first.mvx"}}).status_code == 200)
+    assert(runner.get_state() == MvxGraph.GraphState.PLAYING)
+    crashed_pid = runner.core_process.pid
+
+    runner.core_process._process.kill()  # TerminateProcess on Windows, SIGKILL elsewhere
+    deadline = time.time() + 30
+    while runner.core_process.last_recovery_time is None and time.time() < deadline:
+        time.sleep(0.05)
+
+    stats = client.get("/native/core").json
+    assert(stats["restarts"] == 1 and stats["pid"] != crashed_pid)
+    assert(runner.get_state() == MvxGraph.GraphState.PLAYING)
+    assert("mvpy_core_restarts_total 1" in client.get("/metrics").get_data(as_text=True))
+    runner.r_destroy_graph()
+    runner.core_process.close()
+
+
+def test_nuc_rest_runner_snapshot_restore(pytestconfig, tmp_path):
+    lib = pytestconfig.getoption("lib") or DEFAULT_LIB_PATH
+    runner = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT, snapshot_file=tmp_path.joinpath("graph.json"))
+    client = runner.app.test_client()
+
+    graph = str(Path(r"./tests/read_decomp_write.xml"))
+    client.post("/graph/build_run_remote", json={"remote_graph": graph, "cli_params": {"INPUT": "first.mvx"}})
+    client.post("/graph/set_filter_param", json={"unique_name": "mvx2filewriter_1", "param_name": "Write XML", "param_value": "False"})
+    runner.graph_snapshot.save()
+    assert(not runner.graph_snapshot.save())  # Unchanged
+    snapshot = tmp_path.joinpath("restored.json")
+    snapshot.write_bytes(tmp_path.joinpath("graph.json").read_bytes())
+    runner.r_destroy_graph()
+
+    restored = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT, snapshot_file=snapshot, restore_snapshot=True)
+    assert(restored.graph_ready.wait(10))
+    assert(restored.get_state() == MvxGraph.GraphState.PLAYING)
+    assert(restored.plan_cache.stats()["misses"] == 0)
+    assert(restored.cli_params == {"INPUT": "first.mvx"})
+    assert(restored.param_overrides == {"mvx2filewriter_1": {"Write XML": "False"}})
+    assert(restored.app.test_client().get("/graph/snapshot").status_code == 200)
+    restored.r_destroy_graph()
+
+    # A graph that cannot be rebuilt is not taken over
+    state = json.loads(snapshot.read_bytes())
+    state["graph_commands"].append({"COMMAND": "attachFilter", "ARGS": ["jeffGraph", "missing_1", "b"]})
+    snapshot.write_text(json.dumps(state))
+    broken = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT, snapshot_file=snapshot, restore_snapshot=True)
+    assert(broken.graph_ready.wait(10))
+    assert(broken.preload_error and "missing_1" in broken.preload_error)
+    assert(not broken.graph_commands and broken.current_graph is None and broken.cli_params == {})
+    assert(broken.app.test_client().get("/ready").status_code == 500)
+
+    # With --graph as well, that graph is loaded instead
+    fallback = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT, graph, {"INPUT": "first.mvx"}, snapshot_file=snapshot, restore_snapshot=True)
+    assert(fallback.graph_ready.wait(10))
+    assert(fallback.app.test_client().get("/ready").status_code == 200)
+    assert(list(fallback.filters_dict) == ["mvx2filereader_1", "#autodecompressor_1", "mvx2filewriter_1"])
+    fallback.r_destroy_graph()
+
+
+def test_nuc_rest_runner_graph_preload(pytestconfig, tmp_path, monkeypatch):
+    lib = pytestconfig.getoption("lib") or DEFAULT_LIB_PATH
+    graph = str(Path(r"./tests/read_decomp_write.xml"))
+    release = threading.Event()
+    load_graph_from_file = NucRestRunner.load_graph_from_file
+    monkeypatch.setattr(NucRestRunner, "load_graph_from_file", lambda *args: release.wait() and load_graph_from_file(*args))
+    runner = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT, graph, {"INPUT": "first.mvx"})
+    client = runner.app.test_client()
+
+    assert(client.get("/ready").json["ready"] is False)
+    response = client.get("/graph/get_filters")
+    assert(response.status_code == 503 and response.headers["Retry-After"] == "1")
+    assert(client.post("/set_cli_params", json={"cli_params": {"INPUT": "second.mvx"}}).status_code == 503)
+    assert(client.get("/server_status").status_code == 200)
+    release.set()
+
+    assert(runner.graph_ready.wait(10))
+    response = client.get("/ready")
+    assert(response.status_code == 200 and response.json["ready"])
+    assert(client.get("/graph/get_filters").json == runner.filters_dict)
+    assert(list(runner.filters_dict) == ["mvx2filereader_1", "#autodecompressor_1", "mvx2filewriter_1"])
+    runner.r_destroy_graph()
+
+    # A failed preload is reported instead of exiting, the server keeps serving
+    failed = NucRestRunner(lib, DEFAULT_MEMPOOL, DEFAULT_PORT, str(tmp_path.joinpath("missing.xml")))
+    assert(failed.graph_ready.wait(10))
+    response = failed.app.test_client().get("/ready")
+    assert(response.status_code == 500 and "does not exist" in response.json["error"])
+    assert(failed.app.test_client().get("/graph/get_filters").status_code == 404)
+
+
+def test_native_dispatcher_coalescing():
+    class SlowCore():
+        def __init__(self):
+            self.release = threading.Event()
+            self.state_calls = 0
+
+        def build_graph(self):
+            self.release.wait(5)
+
+        def get_graph_state(self):
+            self.state_calls += 1
+            return MvxGraph.GraphState.STOPPED
+
+    core = SlowCore()
+    dispatcher = NativeDispatcher(core)
+    dispatcher.submit('build_graph')
+
+    results = []
+    pollers = [threading.Thread(target=lambda: results.append(dispatcher.get_graph_state())) for _ in range(5)]
+    for poller in pollers:
+        poller.start()
+    while dispatcher.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+
+    core.release.set()
+    for poller in pollers:
+        poller.join()
+
+    assert(results == [MvxGraph.GraphState.STOPPED] * 5)
+    assert(core.state_calls == 1)
+
+
+def test_native_dispatcher_unqueued_call():
+    class BlockingCore():
+        def __init__(self):
+            self.release = threading.Event()
+
+        def play_graph(self, mode):
+            self.release.wait(5)
+
+        def get_graph_state(self):
+            return MvxGraph.GraphState.PLAYING
+
+    core = BlockingCore()
+    dispatcher = NativeDispatcher(core)
+    player = threading.Thread(target=dispatcher.call_unqueued, args=['play_graph', 3])
+    player.start()
+
+    # Answered while play_graph blocks, it does not hold the queue
+    assert(dispatcher.get_graph_state() == MvxGraph.GraphState.PLAYING and player.is_alive())
+    core.release.set()
+    player.join()
+
+
+def test_native_dispatcher_deferred_init(pytestconfig):
+    release = threading.Event()
+
+    def failing_init():
+        release.wait(5)
+        raise ValueError("Failed to init MvxGraphCore")
+
+    dispatcher = NativeDispatcher(None, init=failing_init)
+    assert(not dispatcher.stats()["ready"])
+    release.set()
+    with pytest.raises(ValueError):
+        dispatcher.get_graph_state()
+    assert(dispatcher.stats()["init_error"] == "Failed to init MvxGraphCore")
+
+    profile = StartupProfile()
+    runner = NucRestRunner(pytestconfig.getoption("lib") or DEFAULT_LIB_PATH, DEFAULT_MEMPOOL, DEFAULT_PORT, startup_profile=profile)
+    assert(runner.app.test_client().get("/server_status").status_code == 200)
+    assert(runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
+    assert(runner.app.test_client().get("/ready").json["ready"])
+    assert({"logging", "native init"} <= {phase[0] for phase in profile.phases()})
+
+
 # def test_nuc_rest_runner_run(nuc_rest_runner):
 #     nuc_rest_runner.r_destroy_graph()
 #     assert(nuc_rest_runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
@@ -158,6 +592,173 @@ def test_nuc_rest_runner_set_filter_param(nuc_rest_runner, client):
     assert b"False" in response.data
 
 
+def test_nuc_rest_runner_set_filter_params(nuc_rest_runner, client):
+    nuc_rest_runner.r_destroy_graph()
+    assert(nuc_rest_runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
+
+    nuc_rest_runner.graph_commands = nuc_rest_runner.load_graph_from_file(str(Path(r"./tests/read_decomp_write.xml")), {"INPUT": f"{str(Path.cwd())}\\tests\\morning.mvx"})
+    nuc_rest_runner.invoke_graph_commands(nuc_rest_runner.graph_commands)
+    nuc_rest_runner._graph_core.build_graph()
+
+    response = client.post("/graph/set_filter_params", json={"params": [{"unique_name": "mvx2filewriter_1", "param_name": "Write XML", "param_value": "False"},
+                                                                        ["no_such_filter", "Write XML", "False"]]})
+
+    assert(response.json[0]["param_value"] == "False")
+    assert("error" in response.json[1])
+
+
+def test_nuc_rest_runner_param_cache(nuc_rest_runner, client):
+    nuc_rest_runner.r_destroy_graph()
+    assert(nuc_rest_runner.get_state() == MvxGraph.GraphState.NOT_BUILT)
+
+    nuc_rest_runner.graph_commands = nuc_rest_runner.load_graph_from_file(str(Path(r"./tests/read_decomp_write.xml")), {"INPUT": f"{str(Path.cwd())}\\tests\\morning.mvx"})
+    nuc_rest_runner.invoke_graph_commands(nuc_rest_runner.graph_commands)
+    nuc_rest_runner._graph_core.build_graph()
+
+    client.post("/graph/set_filter_param", json={"unique_name": "mvx2filewriter_1", "param_name": "Write XML", "param_value": "False"})
+    for _ in range(3):
+        response = client.get("/graph/get_filter_param", json={"unique_name": "mvx2filewriter_1", "param_name": "Write XML"})
+        assert b"False" in response.data
+
+    stats = client.get("/graph/param_cache").json
+    assert(stats["hits"] == 3 and stats["misses"] == 0)
+
+    client.post("/graph/param_cache", json={"volatile_params": {"Write XML": 0}})
+    client.get("/graph/get_filter_param", json={"unique_name": "mvx2filewriter_1", "param_name": "Write XML"})
+    assert(client.get("/graph/param_cache").json["size"] == 0)
+
+    nuc_rest_runner.r_destroy_graph()
+    assert(nuc_rest_runner.param_cache.stats()["size"] == 0)
+
+
+def test_mvx_graph_core_return_buffer(nuc_rest_runner):
+    core = MvxGraph.MvxGraphCoreWrapper(current_dir)
+    if not stub_core_loaded(core):
+        pytest.skip("needs the stub core's \"Large Value\" parameter")
+    assert(core.get_filter_parameter(1, "Write XML") == "False")
+
+    # Longer than the 8 KiB first try, returned whole after the buffer grew, the thread keeps at most a 64 KiB one
+    assert(core.get_filter_parameter(1, "Large Value") == "x" * 100000)
+    assert(len(core._return_buffers.ret_str) == core._max_retained_buff_len)
+    assert(core.get_filter_parameter(1, "Write XML") == "False")
+
+
+def test_param_cache_write_during_load():
+    cache = ParamCache()
+
+    def load_then_write():  # A set_filter_parameter lands while the read is in the core
+        cache.update(1, "Write XML", "True")
+        return "False"
+
+    assert(cache.get(1, "Write XML", load_then_write) == "False")
+    assert(cache.get(1, "Write XML", lambda: "unexpected") == "True")
+
+    def load_then_clear():
+        cache.clear()
+        return "False"
+
+    assert(cache.get(1, "Enable Recording", load_then_clear) == "False")
+    assert(cache.get(1, "Enable Recording", lambda: "True") == "True")
+
+
+def test_nuc_rest_runner_get_all_params(nuc_rest_runner, client, monkeypatch):
+    nuc_rest_runner.r_destroy_graph()
+    assert(client.get("/graph/get_all_params").status_code == 404)
+
+    client.post("/graph/build_remote", json={"remote_graph": str(Path(r"./tests/read_decomp_write.xml")), "cli_params": {"INPUT": "first.mvx"}})
+    response = client.get("/graph/get_all_params")
+    assert(list(response.json) == list(nuc_rest_runner.filters_dict))
+    for params in response.json.values():
+        assert(isinstance(params, dict) and "error" not in params)
+        for value in params.values():  # Booleans and numbers come back typed, not as the dump's strings
+            assert(not isinstance(value, str) or parse_filter_parameters(f"p={value}")["p"] == value)
+
+    # Parsed once per filter, a reloaded dump is parsed again only when it changed
+    client.get("/graph/get_all_params")
+    parses = nuc_rest_runner.param_cache.stats()["parses"]
+    assert(parses == len(nuc_rest_runner.filters_dict))
+    unique_name = next(line['ARGS'][0] for line in nuc_rest_runner.graph_commands
+                       if str(line['COMMAND']).lower() == "setparams" and line['ARGS'][1] == "Write XML")
+    client.post("/graph/set_filter_param", json={"unique_name": unique_name, "param_name": "Write XML", "param_value": "True"})
+    client.get("/graph/get_all_params")
+    assert(nuc_rest_runner.param_cache.stats()["parses"] <= parses + 1)
+
+    # A filter whose parameters cannot be read is reported, the others still are
+    get_filter_parameters = nuc_rest_runner._graph_core.get_filter_parameters
+    unreadable_id = nuc_rest_runner.filters_dict[unique_name]
+
+    def failing_get_filter_parameters(filter_id):
+        if filter_id == unreadable_id:
+            raise ValueError("Failed to get filter parameters")
+        return get_filter_parameters(filter_id)
+
+    nuc_rest_runner.param_cache.clear()
+    monkeypatch.setattr(nuc_rest_runner._graph_core, "get_filter_parameters", failing_get_filter_parameters)
+    response = client.get("/graph/get_all_params")
+    assert(response.json[unique_name] == {"error": "Failed to get filter parameters"})
+    assert(all("error" not in params for name, params in response.json.items() if name != unique_name))
+
+    assert(parse_filter_parameters("Label=testF;Interval=10\nScale=0.5;Path=C:/a=b") == {"Label": "testF", "Interval": 10, "Scale": 0.5, "Path": "C:/a=b"})
+    nuc_rest_runner.r_destroy_graph()
+
+
+def test_nuc_rest_runner_filter_catalog(nuc_rest_runner, client, tmp_path, monkeypatch):
+    nuc_rest_runner.r_destroy_graph()
+    client.post("/graph/build_remote", json={"remote_graph": str(Path(r"./tests/read_decomp_write.xml")), "cli_params": {"INPUT": "first.mvx"}})
+    created = {line['ARGS'][0] for line in nuc_rest_runner.graph_commands if str(line['COMMAND']).lower() == "createfilterbyname"}
+    filters = client.get("/filters").json["filters"]
+    assert(created <= set(filters) and all(isinstance(guid, str) and guid for guid in filters.values()))
+    lookups = nuc_rest_runner.filter_catalog.lookups
+    response = client.get("/filters", query_string={"name": "MVX2FileWriter"})
+    assert(response.json["name"] == "MVX2FileWriter" and response.json["guid"] == filters["MVX2FileWriter"])
+    assert(nuc_rest_runner.filter_catalog.lookups == lookups)
+    nuc_rest_runner.r_destroy_graph()
+
+    # Refers to a filter it never creates, rejected before any filter is created
+    graph = tmp_path.joinpath("dangling.txt")
+    graph.write_text("createfilterbyname~MVX2FileReader~reader~b\ncreateGraph~g~b\nattachFilter~g~writer~b\n")
+    response = client.post("/graph/build_remote", json={"remote_graph": str(graph), "cli_params": {}})
+    assert(response.status_code == 500 and "writer" in response.get_data(as_text=True))
+    assert(nuc_rest_runner.filters_dict == {})
+    response = client.post("/filters/refresh")
+    assert(response.status_code == 200 and response.json["refreshes"] >= 2)
+
+    class Core():
+        def get_available_filters(self):
+            pass
+
+        def get_filter_guid_by_name(self, name):
+            if name == "MVX2FileReader":
+                return "B74863F3-13cf-47a0-9f90-07718fc52ab6"
+            if name == "MVX2FileRedaer":
+                return ""
+            raise ValueError("Failed to get GUID for MVX filter")
+
+        def get_filter_name_by_guid(self, guid):
+            raise ValueError("Unknown filter")
+
+    catalog = FilterCatalog(Core())
+    commands = [{"COMMAND": "createfilterbyname", "ARGS": ["MVX2FileRedaer", "reader", "b"]}] * 2
+    assert(catalog.validate(commands) == ["command 0: unknown filter MVX2FileRedaer", "command 1: unknown filter MVX2FileRedaer",
+                                          "command 1: filter reader is created twice"])
+    assert(catalog.stats()["lookups"] == 1)
+    assert(catalog.guid_of("MVX2FileReader") and catalog.name_of("b74863f3-13CF-47a0-9f90-07718fc52ab6") == "MVX2FileReader")
+
+    # A failed lookup is not kept as unknown, the filter is resolved again the next time
+    assert(catalog.guid_of("MVX2FileWriter") is None and catalog.guid_of("MVX2FileWriter") is None)
+    assert(catalog.stats()["lookups"] == 4 and catalog.stats()["unknown"] == 1)
+
+    # A failed refresh at startup is only logged, the graph still preloads
+    def failing_refresh(self):
+        raise ValueError("Failed to retrieve available filters")
+
+    monkeypatch.setattr(FilterCatalog, "refresh", failing_refresh)
+    runner = NucRestRunner(current_dir, DEFAULT_MEMPOOL, DEFAULT_PORT, str(Path(r"./tests/read_decomp_write.xml")), {"INPUT": "first.mvx"})
+    assert(runner.graph_ready.wait(10))
+    assert(runner.app.test_client().get("/ready").status_code == 200)
+    runner.r_destroy_graph()
+
+
 def test_nuc_rest_runner_set_params(nuc_rest_runner, client):
     nuc_rest_runner.r_destroy_graph()
     assert(nuc_rest_runner.get_state() == MvxGraph.GraphState.NOT_BUILT)